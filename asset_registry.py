@@ -0,0 +1,94 @@
+"""Per-process registry of decoded assets and document templates used by the exporters."""
+import copy
+import io
+import os
+import threading
+
+# python-docx, python-pptx and fpdf are imported by the helpers that need them,
+# so importing this module does not load every document library.
+
+
+# Function to get the path of a library's bundled default template
+def _template_path(package, file_name):
+    return os.path.join(os.path.dirname(package.__file__), "templates", file_name)
+
+
+def _read_bytes(path):
+    with open(path, "rb") as asset_file:
+        return asset_file.read()
+
+
+def _parse_pdf_image(path):
+    from fpdf import FPDF
+
+    # FPDF's parsers don't depend on document state, so one throwaway instance will do
+    parsers = {".png": FPDF._parsepng, ".gif": FPDF._parsegif}
+    parser = parsers.get(os.path.splitext(path)[1].lower(), FPDF._parsejpg)
+    return parser(FPDF(), path)
+
+
+class AssetRegistry:
+    """Loads each asset once per process and reloads it when its mtime changes.
+
+    Decoded values are shared between callers, so the public helpers hand
+    out copies (or immutable bytes) that exporters can safely modify.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind, path, loader):
+        """Return ``loader(path)``, cached until the file's mtime changes, or None if missing."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        key = (kind, path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == mtime:
+                return entry[1]
+        value = loader(path)
+        with self._lock:
+            self._entries[key] = (mtime, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+asset_registry = AssetRegistry()
+
+
+# Function to get the raw bytes of an image, e.g. for python-docx's add_picture
+def image_bytes(path):
+    return asset_registry.get("bytes", path, _read_bytes)
+
+
+# Function to register a pre-parsed image on an FPDF document so pdf.image() skips parsing
+def add_pdf_image(pdf, path):
+    info = asset_registry.get("fpdf", path, _parse_pdf_image)
+    if info is not None and path not in pdf.images:
+        pdf.images[path] = dict(info, i=len(pdf.images) + 1)
+
+
+# Function to get a fresh python-docx Document copied from the decoded default template
+def new_document():
+    import docx
+
+    return copy.deepcopy(asset_registry.get("docx", _template_path(docx, "default.docx"), docx.Document))
+
+
+# Function to get a fresh python-pptx Presentation copied from the decoded default template
+def new_presentation():
+    import pptx
+
+    return copy.deepcopy(asset_registry.get("pptx", _template_path(pptx, "default.pptx"), pptx.Presentation))
+
+
+# Function to get an in-memory stream of an image, or None if the file is missing
+def image_stream(path):
+    data = image_bytes(path)
+    return io.BytesIO(data) if data is not None else None
@@ -0,0 +1,336 @@
+"""Headless batch generation driven by a JSONL file of jobs.
+
+Each line of the input is a job such as::
+
+    {"id": "cardio-01", "kind": "content", "domain": "Medical",
+     "query": "Explain heart failure staging", "formats": ["scorm_pdf", "docx"]}
+
+``kind`` is one of ``content``, ``csv``, ``ppt``, ``pdf-qa`` (which also
+needs ``"pdf": "path/to/file.pdf"``) or ``dataset`` (a large sharded CSV
+dataset of ``"rows": N`` rows). ``formats`` names any export format
+from ``exports.EXPORT_FORMATS`` plus ``txt`` (the raw response), ``csv``
+for CSV jobs, ``pptx`` for PPT jobs and ``csv``, ``parquet`` or ``arrow``
+for dataset jobs. Artifacts are written to
+``<out-dir>/<job id>/`` and one result line per job is appended to the
+results file as it finishes. Jobs already recorded as ``ok`` there are
+skipped, so an interrupted run can simply be started again.
+
+Jobs with a ``"course": "Course title"`` are also lessons of that course
+(with an optional ``"title"`` and ``"module"`` to group lessons under).
+Once every job of a course has completed, the course is packaged as one
+multi-SCO SCORM zip in ``<out-dir>/courses/``, lessons in job order.
+
+Usage::
+
+    OPENAI_API_KEY=... python batch.py requests.jsonl --out-dir batch_output --concurrency 8
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cache import make_key
+from course_builder import build_course_package, course_item, csv_preview, slug
+from dataset_builder import build_dataset
+from exports import EXPORT_FORMATS, export_artifacts
+from generation import (
+    answer_index,
+    fetch_gpt_response,
+    fetch_gpt_response_content_gen,
+    fetch_gpt_response_pdf,
+    pdf_prompt,
+    summarize_large_pdf,
+)
+import metrics
+from pdf_tools import extract_text_from_pdf_cached
+from ppt_builder import build_presentation, deck_text
+from retrieval import retrieve_context
+from summarize import is_summary_request, needs_map_reduce
+
+logger = logging.getLogger("batch")
+
+DEFAULT_FORMATS = {
+    "content": ["scorm_pdf", "scorm_word"],
+    "csv": ["csv", "scorm_csv"],
+    "ppt": ["pptx"],
+    "pdf-qa": ["scorm_pdf", "scorm_word"],
+    "dataset": ["csv", "parquet"],
+}
+DATASET_FILES = {"csv": "data.csv", "parquet": "data.parquet", "arrow": "data.arrow"}
+# Formats course jobs always keep, as the sources of their lessons
+COURSE_FORMATS = {
+    "content": ["txt"],
+    "pdf-qa": ["txt"],
+    "csv": ["csv"],
+    "ppt": ["txt", "pptx"],
+    "dataset": ["csv"],
+}
+
+
+class JobError(Exception):
+    """A job that cannot be completed; recorded in the results file and retried on the next run."""
+
+
+# Function to give every job a stable id, derived from its content when none is set
+def job_id(job):
+    return str(job.get("id") or make_key(job.get("kind"), job.get("domain"), job.get("query"), job.get("pdf"))[:16])
+
+
+# Function to read the ids of jobs that already completed in an earlier run
+def completed_job_ids(results_path):
+    done = set()
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path, encoding="utf-8") as results_file:
+        for line in results_file:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            if result.get("status") == "ok":
+                done.add(result["id"])
+    return done
+
+
+def _write_artifact(path, data):
+    # Write to a temporary name first so a crash never leaves a truncated artifact behind
+    temporary_path = path + ".part"
+    with open(temporary_path, "wb") as artifact_file:
+        artifact_file.write(data)
+    os.replace(temporary_path, path)
+
+
+# Function to build a dataset job, streaming each format straight to its file in the job directory
+def _run_dataset_job(job, job_dir, formats):
+    unsupported = [export_format for export_format in formats if export_format not in DATASET_FILES]
+    if unsupported:
+        raise JobError(f"unsupported format {unsupported[0]!r} for dataset jobs")
+    if not job.get("rows"):
+        raise JobError("dataset jobs need a 'rows' count")
+
+    os.makedirs(job_dir, exist_ok=True)
+    paths = {export_format: os.path.join(job_dir, DATASET_FILES[export_format]) for export_format in formats}
+    files = {}
+    generated = False
+    try:
+        for export_format, path in paths.items():
+            files[export_format] = open(path + ".part", "wb")
+        summary = build_dataset(
+            job.get("domain", ""), job.get("query", ""), job["rows"],
+            files.get("csv"), files.get("parquet"), files.get("arrow"),
+        )
+        generated = bool(summary["rows"])
+    finally:
+        for artifact_file in files.values():
+            artifact_file.close()
+        # A failed job leaves no partial files behind for its retries to pile up on
+        if not generated:
+            for artifact_file in files.values():
+                os.remove(artifact_file.name)
+    if not generated:
+        raise JobError("no valid rows were generated")
+    for path in paths.values():
+        os.replace(path + ".part", path)
+    return list(paths.values())
+
+
+def _generate(job):
+    kind = job.get("kind")
+    domain = job.get("domain", "")
+    query = job.get("query", "")
+    if kind == "content":
+        return fetch_gpt_response_content_gen(domain, query)
+    if kind == "csv":
+        return fetch_gpt_response(domain, query)
+    if kind == "pdf-qa":
+        if not job.get("pdf"):
+            raise JobError("pdf-qa jobs need a 'pdf' path")
+        with open(job["pdf"], "rb") as pdf_file:
+            text = extract_text_from_pdf_cached(pdf_file.read())
+        if needs_map_reduce(text, query):
+            return summarize_large_pdf(text, query)
+        # A summary needs the whole document; other questions only the most relevant chunks
+        context = text if is_summary_request(query) else retrieve_context(text, query)
+        return fetch_gpt_response_pdf(pdf_prompt(context, query))
+    raise JobError(f"unknown job kind: {kind!r}")
+
+
+# Function to run one job and write its artifacts
+def run_job(job, out_dir):
+    kind = job.get("kind")
+    domain = job.get("domain", "")
+    query = job.get("query", "")
+    formats = list(job.get("formats") or DEFAULT_FORMATS.get(kind, []))
+    if job.get("course"):
+        formats += [export_format for export_format in COURSE_FORMATS.get(kind, []) if export_format not in formats]
+    metrics.set_section(f"batch:{kind}")
+    if kind == "dataset":
+        return _run_dataset_job(job, os.path.join(out_dir, job_id(job)), formats)
+
+    deck = None
+    if kind == "ppt":
+        deck, slides = build_presentation(domain, query)
+        failed = [slide["title"] for slide in slides if slide["error"]]
+        if failed:
+            raise JobError(f"slides failed: {', '.join(failed)}")
+        response = deck_text(slides)
+    else:
+        response = _generate(job)
+    if not response or response.startswith("Error:"):
+        raise JobError(response or "empty response")
+
+    files = {}
+    export_formats = [export_format for export_format in formats if export_format in EXPORT_FORMATS]
+    for export_format, data in export_artifacts(response, export_formats, domain, query).items():
+        files[EXPORT_FORMATS[export_format][1]] = data
+    for export_format in formats:
+        if export_format == "txt":
+            files["response.txt"] = response.encode("utf-8")
+        elif export_format == "csv" and kind == "csv":
+            files["data.csv"] = response.encode("utf-8")
+        elif export_format == "pptx" and kind == "ppt":
+            files["presentation.pptx"] = deck
+        elif export_format not in EXPORT_FORMATS:
+            raise JobError(f"unsupported format {export_format!r} for {kind} jobs")
+
+    job_dir = os.path.join(out_dir, job_id(job))
+    os.makedirs(job_dir, exist_ok=True)
+    paths = []
+    for file_name, data in files.items():
+        path = os.path.join(job_dir, file_name)
+        _write_artifact(path, data)
+        paths.append(path)
+    return paths
+
+
+def _read_artifact(job_dir, file_name):
+    with open(os.path.join(job_dir, file_name), "rb") as artifact_file:
+        return artifact_file.read()
+
+
+# Function to make the course lesson of a completed job from the artifacts it wrote
+def _course_item_for_job(job, out_dir):
+    kind = job.get("kind")
+    job_dir = os.path.join(out_dir, job_id(job))
+    attachments = {}
+    if kind == "dataset":
+        attachments["data.csv"] = _read_artifact(job_dir, "data.csv")
+        text = csv_preview(attachments["data.csv"])
+    elif kind == "csv":
+        text = _read_artifact(job_dir, "data.csv").decode("utf-8")
+    else:
+        text = _read_artifact(job_dir, "response.txt").decode("utf-8")
+        if kind == "ppt":
+            attachments["presentation.pptx"] = _read_artifact(job_dir, "presentation.pptx")
+    title = job.get("title") or job.get("query") or job_id(job)
+    return course_item(kind, title, text, job.get("domain", ""), job.get("query", ""), job.get("module", ""), attachments)
+
+
+# Function to package each course whose jobs have all completed
+def build_courses(jobs, out_dir, results_path):
+    courses = {}
+    for job in jobs:
+        if job.get("course"):
+            courses.setdefault(job["course"], []).append(job)
+    if not courses:
+        return []
+    done = completed_job_ids(results_path)
+    course_dir = os.path.join(out_dir, "courses")
+    os.makedirs(course_dir, exist_ok=True)
+    paths = []
+    for title, course_jobs in courses.items():
+        pending = [job_id(job) for job in course_jobs if job_id(job) not in done]
+        if pending:
+            logger.warning("Course %r not packaged: %d of its %d jobs have not completed", title, len(pending), len(course_jobs))
+            continue
+        metrics.set_section("batch:course")
+        try:
+            package = build_course_package(title, [_course_item_for_job(job, out_dir) for job in course_jobs])
+        except Exception as e:
+            logger.error("Course %r could not be packaged: %s", title, e)
+            continue
+        path = os.path.join(course_dir, f"{slug(title)}.zip")
+        _write_artifact(path, package)
+        paths.append(path)
+        logger.info("Course %r packaged with %d lessons: %s", title, len(course_jobs), path)
+    return paths
+
+
+# Function to run one job in a pool worker, timed from when the worker starts it rather than from submission
+def _timed_run_job(job, out_dir):
+    started = time.perf_counter()
+    try:
+        result = {"status": "ok", "artifacts": run_job(job, out_dir)}
+    except Exception as e:
+        result = {"status": "error", "error": str(e)}
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+# Function to run every pending job with bounded concurrency, appending results as they finish
+def run_batch(jobs_path, out_dir, results_path=None, concurrency=4):
+    results_path = results_path or os.path.join(out_dir, "results.jsonl")
+    os.makedirs(out_dir, exist_ok=True)
+    done = completed_job_ids(results_path)
+
+    all_jobs = []
+    jobs = []
+    with open(jobs_path, encoding="utf-8") as jobs_file:
+        for line_number, line in enumerate(jobs_file, 1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                logger.error("Skipping line %d of %s: %s", line_number, jobs_path, e)
+                continue
+            all_jobs.append(job)
+            if job_id(job) in done:
+                continue
+            jobs.append(job)
+    logger.info("%d jobs pending, %d already completed", len(jobs), len(done))
+
+    counts = {"ok": 0, "error": 0}
+    write_lock = threading.Lock()
+    with open(results_path, "a", encoding="utf-8") as results_file, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(_timed_run_job, job, out_dir): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            result = {"id": job_id(job), "kind": job.get("kind")}
+            result.update(future.result())
+            if result["status"] == "error":
+                logger.error("Job %s failed: %s", result["id"], result["error"])
+            counts[result["status"]] += 1
+            with write_lock:
+                results_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+                results_file.flush()
+                os.fsync(results_file.fileno())
+    build_courses(all_jobs, out_dir, results_path)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("jobs", nargs="?", default="requests.jsonl", help="JSONL file of jobs (default: requests.jsonl)")
+    parser.add_argument("--out-dir", default="batch_output", help="directory for artifacts (default: batch_output)")
+    parser.add_argument("--results", help="results JSONL (default: <out-dir>/results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=4, help="jobs run at once (default: 4)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+    metrics.start_exporters()
+    counts = run_batch(args.jobs, args.out_dir, args.results, args.concurrency)
+    if metrics.METRICS_DUMP_PATH:
+        metrics.dump_metrics()
+    logger.info("Finished: %d ok, %d failed", counts["ok"], counts["error"])
+    reuse = answer_index.stats()
+    logger.info("Reused answers of similar questions for %d of %d jobs (%.0f%%)", reuse["reuses"], reuse["lookups"], reuse["reuse_rate"] * 100)
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""Benchmark: export latency with the asset registry cold vs. warm.
+
+Run from the repository root:
+
+    python benchmarks/bench_assets.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from asset_registry import asset_registry, new_presentation
+from exports import render_pdf, save_as_scorm_word
+
+
+def best_of(func, cold, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            asset_registry.clear()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    content = "Pharmacovigilance signal detection relies on spontaneous reports and cohort data. " * 100
+    exporters = [
+        ("render_pdf", lambda: render_pdf(content)),
+        ("save_as_scorm_word", lambda: save_as_scorm_word(content)),
+        ("new_presentation", new_presentation),
+    ]
+    for name, func in exporters:
+        cold = best_of(func, cold=True)
+        warm = best_of(func, cold=False)
+        print(f"{name:20s} cold {cold * 1e3:8.2f} ms  warm {warm * 1e3:8.2f} ms  speedup {cold / warm:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark: cold-start cost of one script run per section, in a fresh process.
+
+Each section is rendered once with Streamlit's AppTest in a new interpreter
+(no API calls are made: only the page is opened). The report shows the
+wall time of that first run, the resident memory it added on top of
+Streamlit itself, and which heavy dependencies ended up imported.
+
+Run from the repository root:
+
+    python benchmarks/bench_cold_start.py
+
+For a per-module breakdown, combine with ``python -X importtime``.
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["openai", "pandas", "numpy", "scipy", "pptx", "docx", "fpdf", "PyPDF2", "requests"]
+SECTIONS = ["About", "Instructions", "Credits", "Content Generation", "PDF Analysis", "Research Search"]
+
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+from streamlit.testing.v1 import AppTest
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+heavy_before = {{name for name in {heavy!r} if name in sys.modules}}
+started = time.perf_counter()
+at = AppTest.from_file({script!r}, default_timeout=120)
+at.secrets["api"] = {{"OPENAI_API_KEY": "x", "GOOGLE_API_KEY": "x", "CUSTOM_SEARCH_ENGINE_ID": "x"}}
+at.run()
+if {section!r} != "About":
+    at.sidebar.selectbox[0].select({section!r}).run()
+elapsed = time.perf_counter() - started
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "seconds": elapsed,
+    "rss_mb": (after - before) / 1024,
+    "heavy_modules": sorted(name for name in {heavy!r} if name in sys.modules and name not in heavy_before),
+    "exception": [str(e.value) for e in at.exception],
+}}))
+"""
+
+
+def measure(section):
+    code = CHILD.format(root=ROOT, heavy=HEAVY_MODULES, script=os.path.join(ROOT, "index.py"), section=section)
+    env = dict(os.environ, LLM_CACHE_PATH="")
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    for section in SECTIONS:
+        result = measure(section)
+        print(
+            f"{section:20s} first run {result['seconds']:6.2f} s  +RSS {result['rss_mb']:6.1f} MiB  "
+            f"imports: {', '.join(result['heavy_modules']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Micro-benchmark: compiled keyword index vs. the original per-keyword loop.
+
+Run from the repository root:
+
+    python benchmarks/bench_keywords.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from research import RESEARCH_KEYWORDS, contains_research_keyword, is_query_research_related
+
+
+# The implementations that shipped before the compiled index, kept for comparison
+def legacy_is_query_research_related(query):
+    for keyword in RESEARCH_KEYWORDS:
+        if keyword.lower() in query.lower():
+            return True
+    return False
+
+
+def legacy_filter(items):
+    return [
+        item for item in items
+        if any(keyword in item["title"].lower() or keyword in item["snippet"].lower() for keyword in RESEARCH_KEYWORDS)
+    ]
+
+
+def compiled_filter(items):
+    return [item for item in items if contains_research_keyword(item["title"], item["snippet"])]
+
+
+def best_of(func, number, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def main():
+    # Worst case for the old loop: a long query that matches nothing
+    query = "The patient was given a new compound and observed for twelve weeks in the clinic. " * 20
+    items = [
+        {"title": f"Result {i} about new medicines", "snippet": "Latest news on vaccine updates and treatment options. " * 3}
+        for i in range(100)
+    ]
+
+    rows = [
+        ("is_query_research_related", best_of(lambda: legacy_is_query_research_related(query), 200),
+         best_of(lambda: is_query_research_related(query), 200)),
+        ("research results filter (100 items)", best_of(lambda: legacy_filter(items), 20),
+         best_of(lambda: compiled_filter(items), 20)),
+    ]
+    for name, legacy, compiled in rows:
+        print(f"{name:40s} legacy {legacy * 1e6:10.1f} us  compiled {compiled * 1e6:10.1f} us  speedup {legacy / compiled:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
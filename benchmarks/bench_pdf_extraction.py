@@ -0,0 +1,64 @@
+"""Benchmark: serial vs. process-pool PDF text extraction on a synthetic PDF.
+
+Run from the repository root:
+
+    python benchmarks/bench_pdf_extraction.py [pages]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import PyPDF2
+from fpdf import FPDF
+
+from pdf_tools import PDF_WORKERS, extract_text_from_pdf, extract_text_parallel
+
+
+# The implementation that shipped before the extraction engine, kept for comparison
+def legacy_extract_text_from_pdf(pdf_file):
+    pdf_reader = PyPDF2.PdfReader(pdf_file)
+    pdf_text = ""
+    for page in pdf_reader.pages:
+        pdf_text += page.extract_text()
+    return pdf_text
+
+
+def make_pdf(pages):
+    pdf = FPDF()
+    pdf.set_font("Arial", size=11)
+    paragraph = (
+        "Section {page}. The sponsor shall submit the stability data, batch records and "
+        "validation reports described in this guidance before the product is marketed. "
+    ) * 12
+    for page in range(pages):
+        pdf.add_page()
+        pdf.multi_cell(190, 6, paragraph.format(page=page))
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    pdf_bytes = make_pdf(pages)
+    print(f"synthetic PDF: {pages} pages, {len(pdf_bytes) / 1024:.0f} KiB, {PDF_WORKERS} workers")
+
+    legacy_time, expected = timed(lambda: legacy_extract_text_from_pdf(io.BytesIO(pdf_bytes)))
+    serial_time, serial_text = timed(lambda: extract_text_from_pdf(io.BytesIO(pdf_bytes)))
+    parallel_time, parallel_text = timed(lambda: extract_text_parallel(pdf_bytes))
+    assert serial_text == expected and parallel_text == expected
+
+    print(f"legacy serial (+=)      {legacy_time:8.2f} s")
+    print(f"serial (join)           {serial_time:8.2f} s")
+    print(f"process pool            {parallel_time:8.2f} s  speedup {legacy_time / parallel_time:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark: in-memory PDF SCORM packaging vs. the old scratch-folder round trip.
+
+Run from the repository root:
+
+    python benchmarks/bench_scorm_pdf.py
+"""
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from exports import SCORM_PDF_INDEX_HTML, SCORM_PDF_MANIFEST, save_as_pdf, save_as_scorm_pdf
+
+
+# The disk-based flow that shipped before: write the members to a folder, zip it, read it back
+def legacy_save_as_scorm_pdf(content, output_folder, scorm_zip_name):
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+    save_as_pdf(content, os.path.join(output_folder, "content.pdf"))
+    with open(os.path.join(output_folder, "index.html"), "w", encoding="utf-8") as html_file:
+        html_file.write(SCORM_PDF_INDEX_HTML)
+    with open(os.path.join(output_folder, "imsmanifest.xml"), "w", encoding="utf-8") as manifest_file:
+        manifest_file.write(SCORM_PDF_MANIFEST)
+    with zipfile.ZipFile(scorm_zip_name, "w", zipfile.ZIP_DEFLATED) as scorm_zip:
+        for foldername, subfolders, filenames in os.walk(output_folder):
+            for filename in filenames:
+                file_path = os.path.join(foldername, filename)
+                scorm_zip.write(file_path, os.path.relpath(file_path, output_folder))
+    with open(scorm_zip_name, "rb") as scorm_file:
+        return scorm_file.read()
+
+
+def best_of(func, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    content = "Clinical pharmacology of metformin: absorption, distribution and elimination. " * 200
+    with tempfile.TemporaryDirectory() as scratch:
+        folder = os.path.join(scratch, "scorm_package")
+        zip_name = os.path.join(scratch, "scorm_package.zip")
+        legacy = best_of(lambda: legacy_save_as_scorm_pdf(content, folder, zip_name))
+    in_memory = best_of(lambda: save_as_scorm_pdf(content))
+    print(f"disk round trip   {legacy * 1e3:8.2f} ms")
+    print(f"in memory         {in_memory * 1e3:8.2f} ms  speedup {legacy / in_memory:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark: build time and peak memory of SCORM zips, all-deflate buffers vs. the streaming archive writer.
+
+The content is random words, so the rendered PDF and DOCX compress about
+as little as real documents do. The PDF package is timed from the
+rendered PDF (packaging only); the Word package end to end, since the
+writer saves the DOCX straight into the archive.
+
+Run from the repository root:
+
+    python benchmarks/bench_scorm_zip.py [words]
+"""
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exports import (
+    SCORM_PDF_INDEX_HTML,
+    SCORM_PDF_MANIFEST,
+    render_docx,
+    render_html,
+    render_pdf,
+    save_as_scorm_word,
+)
+from scorm_archive import ScormArchive
+
+
+# The packaging that shipped before: every member deflated into a BytesIO
+def legacy_package_pdf(pdf_bytes):
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as scorm_zip:
+        scorm_zip.writestr("content.pdf", pdf_bytes)
+        scorm_zip.writestr("index.html", SCORM_PDF_INDEX_HTML)
+        scorm_zip.writestr("imsmanifest.xml", SCORM_PDF_MANIFEST)
+    return zip_buffer.getvalue()
+
+
+def package_pdf(pdf_bytes):
+    scorm_zip = ScormArchive()
+    scorm_zip.write("content.pdf", pdf_bytes)
+    scorm_zip.write("index.html", SCORM_PDF_INDEX_HTML)
+    scorm_zip.write("imsmanifest.xml", SCORM_PDF_MANIFEST)
+    return scorm_zip.getvalue()
+
+
+# The Word package that shipped before: DOCX rendered to bytes, then copied into the zip
+def legacy_save_as_scorm_word(content):
+    docx_bytes = render_docx(content)
+    html = render_html(content)
+    scorm_zip = io.BytesIO()
+    with zipfile.ZipFile(scorm_zip, "w") as zf:
+        zf.writestr("imanifest.xml", "<manifest/>")
+        zf.writestr("response.docx", docx_bytes)
+        zf.writestr("index.html", html)
+    scorm_zip.seek(0)
+    return scorm_zip.getvalue()
+
+
+def random_text(words, seed=0):
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 10))) for _ in range(5000)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+# Peak traced allocations while func runs, above what was allocated before it started
+def peak_memory(func):
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - baseline
+
+
+def report(label, func, repeat):
+    seconds, package = best_of(func, repeat)
+    assert zipfile.ZipFile(io.BytesIO(package)).testzip() is None
+    peak = peak_memory(func)
+    print(f"  {label:34s} {seconds * 1e3:9.1f} ms  peak {peak / 2**20:7.2f} MiB  zip {len(package) / 2**20:6.2f} MiB")
+
+
+def main():
+    words = int(sys.argv[1]) if len(sys.argv) > 1 else 400000
+    content = random_text(words)
+    pdf_bytes = render_pdf(content)
+
+    print(f"PDF package, {len(pdf_bytes) / 2**20:.2f} MiB PDF (packaging only)")
+    report("all deflated (before)", lambda: legacy_package_pdf(pdf_bytes), 5)
+    report("stored PDF, streamed (ScormArchive)", lambda: package_pdf(pdf_bytes), 5)
+
+    print(f"Word package, {words} words (rendering included)")
+    report("DOCX bytes copied in (before)", lambda: legacy_save_as_scorm_word(content), 3)
+    report("DOCX saved into archive", lambda: save_as_scorm_word(content), 3)
+
+
+if __name__ == "__main__":
+    main()
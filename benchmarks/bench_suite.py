@@ -0,0 +1,321 @@
+"""Benchmark suite: document pipeline, keyword matching and end-to-end section flows, fully offline.
+
+OpenAI and Google Custom Search are replaced by the local fake backends in
+``fake_backends.py`` (deterministic payloads, configurable latency), the
+LLM response cache is disabled and the rate limits are raised so the
+numbers measure this code, not the network or the limiter. Each case runs
+once as a warm-up, then ``--repeat`` times; results are printed as a
+table and written as JSON so runs can be compared over time.
+
+Run from the repository root:
+
+    python benchmarks/bench_suite.py --output benchmark-results.json
+    python benchmarks/bench_suite.py --only exports,keywords --compare benchmark-results.json
+
+Groups: pdf, exports, keywords, flows.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+from fake_backends import filler_text, use_fake_backends
+
+CASES = []
+
+
+# Function to register a benchmark case; ``factory(**params)`` does the setup and returns ``run(iteration)``
+def case(group, name, **params):
+    def register(factory):
+        CASES.append((group, name, params, factory))
+        return factory
+    return register
+
+
+# Decorators apply bottom-up, so cases are listed largest first to run smallest first
+@case("pdf", "extract_text_from_pdf", pages=200)
+@case("pdf", "extract_text_from_pdf", pages=50)
+@case("pdf", "extract_text_from_pdf", pages=10)
+def bench_extract_text(pages):
+    from bench_pdf_extraction import make_pdf
+    from pdf_tools import extract_text_from_pdf
+
+    pdf_bytes = make_pdf(pages)
+    return lambda iteration: extract_text_from_pdf(io.BytesIO(pdf_bytes))
+
+
+@case("exports", "save_as_pdf", words=10000)
+@case("exports", "save_as_pdf", words=2000)
+def bench_save_as_pdf(words):
+    from exports import save_as_pdf
+
+    content = filler_text("save_as_pdf", words)
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_"), "response.pdf")
+    return lambda iteration: save_as_pdf(content, path)
+
+
+@case("exports", "save_as_scorm_pdf", words=10000)
+@case("exports", "save_as_scorm_pdf", words=2000)
+def bench_save_as_scorm_pdf(words):
+    from exports import save_as_scorm_pdf
+
+    content = filler_text("save_as_scorm_pdf", words)
+    return lambda iteration: save_as_scorm_pdf(content)
+
+
+@case("exports", "save_as_scorm_word", words=10000)
+@case("exports", "save_as_scorm_word", words=2000)
+def bench_save_as_scorm_word(words):
+    from exports import save_as_scorm_word
+
+    content = filler_text("save_as_scorm_word", words)
+    return lambda iteration: save_as_scorm_word(content)
+
+
+@case("exports", "create_scorm_package", rows=2000)
+def bench_create_scorm_package(rows):
+    from exports import create_scorm_package
+
+    csv_content = "Name,Category,Value\n" + "\n".join(f"Item {n},{filler_text(str(n), 3)},{n}" for n in range(rows))
+    return lambda iteration: create_scorm_package(csv_content, "Medical", "benchmark data")
+
+
+@case("exports", "build_course_package", lessons=40)
+def bench_build_course_package(lessons):
+    from course_builder import build_course_package, course_item
+
+    items = [
+        course_item("content", f"Lesson {n}", filler_text(f"lesson {n}", 1500), "Medical", module=f"Module {n // 10 + 1}")
+        for n in range(lessons)
+    ]
+    return lambda iteration: build_course_package("Benchmark course", items)
+
+
+@case("keywords", "is_query_research_related", queries=1000)
+def bench_is_query_research_related(queries):
+    from research import is_query_research_related
+
+    # Half the queries contain a keyword; misses are the expensive case for a scan
+    texts = [
+        filler_text(f"query {n}", 40) + (" latest clinical trial results" if n % 2 else "")
+        for n in range(queries)
+    ]
+    return lambda iteration: [is_query_research_related(text) for text in texts]
+
+
+@case("keywords", "rank_research_results", items=1000)
+@case("keywords", "rank_research_results", items=100)
+def bench_rank_research_results(items):
+    from research import rank_research_results
+
+    # Results spread over a few dozen sites, half of them with the query phrase in the title
+    results = [
+        {
+            "title": filler_text(f"title {n}", 8) + (" clinical trial" if n % 2 else ""),
+            "link": f"https://site{n % 37}.example.org/{n}",
+            "snippet": filler_text(f"snippet {n}", 30),
+        }
+        for n in range(items)
+    ]
+    return lambda iteration: rank_research_results("clinical trial safety outcomes", results)
+
+
+# Every flow run uses a fresh query so no response, search or export cache is hit
+def _flow_query(topic, iteration):
+    return f"{topic} (benchmark run {os.getpid()}-{time.time_ns()}-{iteration})"
+
+
+@case("flows", "content_generation")
+def bench_content_flow():
+    from exports import export_artifacts
+    from generation import stream_gpt_response_content_gen
+
+    def run(iteration):
+        response = "".join(stream_gpt_response_content_gen("Medical", _flow_query("Explain heart failure", iteration)))
+        export_artifacts(response, ["scorm_pdf", "scorm_word"])
+    return run
+
+
+@case("flows", "csv_content_generation")
+def bench_csv_flow():
+    from csv_tools import CSVStreamParser
+    from exports import export_artifacts
+    from generation import stream_gpt_response_csv
+
+    def run(iteration):
+        query = _flow_query("Common antibiotics", iteration)
+        parser = CSVStreamParser()
+        parts = []
+        for token in stream_gpt_response_csv("Medical", query):
+            parts.append(token)
+            parser.feed(token)
+        parser.close()
+        assert parser.rows, "no CSV rows parsed"
+        export_artifacts("".join(parts), ["scorm_csv"], "Medical", query)
+    return run
+
+
+@case("flows", "pdf_analysis", pages=100)
+def bench_pdf_flow(pages):
+    from bench_pdf_extraction import make_pdf
+    from generation import pdf_prompt, stream_gpt_response_pdf
+    from pdf_tools import PDFTextCache
+    from retrieval import retrieve_context
+
+    pdf_bytes = make_pdf(pages)
+
+    def run(iteration):
+        text = PDFTextCache().extract_text(pdf_bytes)
+        query = _flow_query("What stability data must be submitted?", iteration)
+        "".join(stream_gpt_response_pdf(pdf_prompt(retrieve_context(text, query), query)))
+    return run
+
+
+@case("flows", "research_search", pages=5)
+def bench_research_flow(pages):
+    from research import iter_search_google, rank_research_results
+
+    def run(iteration):
+        query = _flow_query("mRNA vaccine trials", iteration)
+        items = []
+        for page_items in iter_search_google(query, "offline", "offline", pages):
+            items.extend(page_items)
+            results = rank_research_results(query, items)
+        assert results, "no research results"
+    return run
+
+
+@case("flows", "ppt_development")
+def bench_ppt_flow():
+    from ppt_builder import build_presentation
+
+    def run(iteration):
+        deck, slides = build_presentation("Medical", _flow_query("Heart failure", iteration))
+        assert not any(slide["error"] for slide in slides)
+    return run
+
+
+@case("flows", "large_dataset", rows=400)
+def bench_dataset_flow(rows):
+    from dataset_builder import build_dataset
+
+    def run(iteration):
+        summary = build_dataset("Medical", _flow_query("Drug interactions", iteration), rows, io.BytesIO(), io.BytesIO())
+        assert summary["rows"] == rows, summary
+    return run
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _case_id(result):
+    return (result["group"], result["name"], json.dumps(result["params"], sort_keys=True))
+
+
+def _format_params(params):
+    return ", ".join(f"{name}={value}" for name, value in params.items())
+
+
+def run_suite(groups=None, repeat=5, warmup=1):
+    results = []
+    for group, name, params, factory in CASES:
+        if groups and group not in groups:
+            continue
+        run = factory(**params)
+        for iteration in range(warmup):
+            run(-1 - iteration)
+        seconds = []
+        for iteration in range(repeat):
+            started = time.perf_counter()
+            run(iteration)
+            seconds.append(time.perf_counter() - started)
+        result = {
+            "group": group,
+            "name": name,
+            "params": params,
+            "seconds": seconds,
+            "min": min(seconds),
+            "median": statistics.median(seconds),
+            "mean": statistics.fmean(seconds),
+            "max": max(seconds),
+            "stdev": statistics.stdev(seconds) if len(seconds) > 1 else 0.0,
+        }
+        results.append(result)
+        print(
+            f"{group:9s} {name:28s} {_format_params(params):14s} "
+            f"median {result['median'] * 1e3:9.2f} ms  min {result['min'] * 1e3:9.2f} ms",
+            flush=True,
+        )
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = {_case_id(result): result for result in json.load(baseline_file)["results"]}
+    print(f"\nmedian vs. {baseline_path} (ratio < 1 is faster):")
+    for result in results:
+        previous = baseline.get(_case_id(result))
+        if previous is None:
+            continue
+        ratio = result["median"] / previous["median"]
+        print(f"{result['group']:9s} {result['name']:28s} {_format_params(result['params']):14s} {ratio:6.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default="benchmark-results.json", help="JSON results file (default: benchmark-results.json)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (default: 5)")
+    parser.add_argument("--only", help="comma-separated groups to run (default: all)")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake backend latency in seconds (default: 0.05)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="delay between streamed words (default: 0)")
+    parser.add_argument("--compare", help="earlier JSON results to compare medians against")
+    args = parser.parse_args(argv)
+
+    # Configure the app before any of its modules is imported by the cases
+    openai_backend, google_backend = use_fake_backends(latency=args.latency, token_delay=args.token_delay)
+    os.environ["LLM_CACHE_PATH"] = ""
+    os.environ.setdefault("OPENAI_RATE_LIMITS", "gpt-3.5-turbo=1000000/1000000000,gpt-4=1000000/1000000000")
+
+    groups = set(args.only.split(",")) if args.only else None
+    results = run_suite(groups, args.repeat)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+            "backend_latency": args.latency,
+            "token_delay": args.token_delay,
+            "openai_requests": openai_backend.requests,
+            "google_requests": google_backend.requests,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"\nwrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
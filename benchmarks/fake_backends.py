@@ -0,0 +1,230 @@
+"""Offline stand-ins for the OpenAI chat completions and Google Custom Search APIs.
+
+Both are small HTTP servers on 127.0.0.1 that answer with deterministic
+payloads derived from the request, after a configurable latency, so the
+app's real HTTP clients, retries and rate limiter are exercised without
+network access. Point the app at them with the environment variables set
+by ``use_fake_backends`` (``OPENAI_BASE_URL`` and ``GOOGLE_SEARCH_URL``)
+before importing the app's modules:
+
+    from fake_backends import use_fake_backends
+    openai_backend, google_backend = use_fake_backends(latency=0.05)
+
+Answers follow the prompts the app sends: slide outlines and dataset
+schemas as JSON, slide bullets, CSV for CSV and dataset-shard prompts,
+and plain text otherwise. An ``error_rate`` makes that fraction of
+requests fail with 429 (with Retry-After) or 500, from a seeded random
+generator so runs are repeatable.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+WORDS = (
+    "clinical study evidence trial patients analysis safety efficacy dosage regulatory guidance "
+    "market investment portfolio risk curriculum learning assessment outcomes research data"
+).split()
+
+
+def _seed(text):
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+# Function to make deterministic filler text of about ``words`` words for a given seed text
+def filler_text(seed_text, words):
+    rng = random.Random(_seed(seed_text))
+    sentences = []
+    count = 0
+    while count < words:
+        length = rng.randint(8, 16)
+        sentence = " ".join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence.capitalize() + ".")
+        count += length
+    return " ".join(sentences)
+
+
+class FakeBackend:
+    """A threaded HTTP server answering with ``respond(request) -> (status, headers, body)``."""
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                backend._handle(self, None)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                backend._handle(self, json.loads(body or b"{}"))
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _handle(self, handler, payload):
+        with self._lock:
+            self.requests += 1
+            fail = self.error_rate and self._random.random() < self.error_rate
+            status = self._random.choice((429, 500)) if fail else 200
+            if fail:
+                self.errors += 1
+        time.sleep(self.latency)
+        if status != 200:
+            body = json.dumps({"error": {"message": "injected failure", "type": "fake", "code": status}}).encode()
+            self._send(handler, status, {"Content-Type": "application/json", "retry-after-ms": "50"}, body)
+            return
+        self.respond(handler, payload)
+
+    def _send(self, handler, status, headers, body):
+        handler.send_response(status)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def respond(self, handler, payload):
+        raise NotImplementedError
+
+
+class FakeOpenAI(FakeBackend):
+    """``POST /v1/chat/completions``, streaming or not, with usage and rate-limit headers.
+
+    ``reply_words`` sets the length of plain-text answers; streamed answers
+    are sent one word per chunk, ``token_delay`` seconds apart.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0, reply_words=300, token_delay=0.0):
+        super().__init__(latency, error_rate, seed)
+        self.reply_words = reply_words
+        self.token_delay = token_delay
+
+    def reply(self, prompt):
+        if "Answer with JSON only" in prompt and '"slides"' in prompt:
+            titles = ["Introduction"] + [f"Key Point {n}" for n in range(1, 6)] + ["Case Studies", "Conclusion"]
+            return json.dumps({"slides": [{"title": title, "focus": filler_text(title, 10)} for title in titles]})
+        if "Answer with JSON only" in prompt and '"columns"' in prompt:
+            return json.dumps({
+                "columns": [
+                    {"name": "name", "type": "string", "description": "entry name"},
+                    {"name": "value", "type": "float", "description": "measured value"},
+                    {"name": "count", "type": "integer", "description": "occurrences"},
+                    {"name": "recorded", "type": "date", "description": "date recorded"},
+                ],
+                "key": ["name"],
+            })
+        if "Write the slide" in prompt:
+            return "\n".join(f"- {filler_text(prompt + str(n), 14)}" for n in range(5))
+        shard = re.search(r"numbered (\d+) to (\d+)", prompt)
+        if shard:
+            first, last = int(shard.group(1)), int(shard.group(2))
+            rows = [f"Entry {n},{n * 1.5},{n % 97},2024-{n % 12 + 1:02d}-{n % 28 + 1:02d}" for n in range(first, last + 1)]
+            return "name,value,count,recorded\n" + "\n".join(rows)
+        if "formatted as a proper CSV" in prompt:
+            rng = random.Random(_seed(prompt))
+            rows = [f'Item {n},"{rng.choice(WORDS)}, {rng.choice(WORDS)}",{rng.randint(1, 500)}' for n in range(1, 21)]
+            return "Name,Category,Value\n" + "\n".join(rows)
+        return filler_text(prompt, self.reply_words)
+
+    def respond(self, handler, payload):
+        model = payload.get("model", "gpt-3.5-turbo")
+        prompt = "\n".join(str(message.get("content", "")) for message in payload.get("messages", []))
+        text = self.reply(prompt)
+        usage = {
+            "prompt_tokens": len(prompt) // 4 + 1,
+            "completion_tokens": len(text) // 4 + 1,
+            "total_tokens": (len(prompt) + len(text)) // 4 + 2,
+        }
+        headers = {
+            "x-ratelimit-limit-requests": "100000",
+            "x-ratelimit-remaining-requests": "99999",
+            "x-ratelimit-limit-tokens": "100000000",
+            "x-ratelimit-remaining-tokens": "99999999",
+        }
+        base = {"id": "chatcmpl-fake", "created": 0, "model": model}
+        if not payload.get("stream"):
+            body = dict(base, object="chat.completion", usage=usage, choices=[
+                {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+            ])
+            self._send(handler, 200, dict(headers, **{"Content-Type": "application/json"}), json.dumps(body).encode())
+            return
+
+        handler.send_response(200)
+        for name, value in dict(headers, **{"Content-Type": "text/event-stream", "Connection": "close"}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.close_connection = True
+        words = text.split(" ")
+        for index, word in enumerate(words):
+            delta = {"content": word if index == 0 else " " + word}
+            chunk = dict(base, object="chat.completion.chunk", choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+            handler.wfile.write(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+            if self.token_delay:
+                handler.wfile.flush()
+                time.sleep(self.token_delay)
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            chunk = dict(base, object="chat.completion.chunk", choices=[], usage=usage)
+            handler.wfile.write(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
+
+
+class FakeGoogleSearch(FakeBackend):
+    """``GET /customsearch/v1`` returning ``num`` items for the requested ``start`` offset."""
+
+    def respond(self, handler, payload):
+        params = parse_qs(urlparse(handler.path).query)
+        query = params.get("q", [""])[0]
+        start = int(params.get("start", ["1"])[0])
+        num = int(params.get("num", ["10"])[0])
+        rng = random.Random(_seed(f"{query}:{start}"))
+        items = []
+        for position in range(start, start + num):
+            topic = rng.choice(("clinical trial", "journal article", "systematic review", "market report", "blog post"))
+            items.append({
+                "title": f"{topic.title()} {position} on {query}",
+                "link": f"https://example.org/{_seed(query) % 10000}/{position}",
+                "snippet": f"A {topic} about {query}. " + filler_text(f"{query}{position}", 25),
+            })
+        body = json.dumps({"items": items}).encode()
+        self._send(handler, 200, {"Content-Type": "application/json"}, body)
+
+
+# Function to start both fake backends and point the app's clients at them through the environment
+def use_fake_backends(latency=0.0, error_rate=0.0, token_delay=0.0, reply_words=300, seed=0):
+    openai_backend = FakeOpenAI(latency, error_rate, seed, reply_words, token_delay).start()
+    google_backend = FakeGoogleSearch(latency, error_rate, seed).start()
+    os.environ["OPENAI_BASE_URL"] = openai_backend.url + "/v1"
+    os.environ["OPENAI_API_KEY"] = os.environ.get("OPENAI_API_KEY") or "offline"
+    os.environ["GOOGLE_SEARCH_URL"] = google_backend.url + "/customsearch/v1"
+    return openai_backend, google_backend
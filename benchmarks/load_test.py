@@ -0,0 +1,284 @@
+"""Load test: many concurrent simulated sessions driving the app's section flows.
+
+Each simulated session is a Streamlit AppTest of ``index.py`` running on
+its own thread, so every session has its own session state and script
+runs while sharing this process's caches, thread pools and rate limiter,
+as sessions on one Streamlit worker do. OpenAI and Google Custom Search
+are the local fake backends from ``fake_backends.py``, with configurable
+latency and injected error rate. Every query is unique, so the LLM,
+search and export caches never short-circuit the work.
+
+A session runs its scenarios ``--iterations`` times; every widget
+interaction (one script rerun) is a timed step. The report gives
+throughput, p50/p95/p99 latency per step and per scenario, errors, and
+resident memory per session.
+
+Run from the repository root:
+
+    python benchmarks/load_test.py --sessions 20 --scenarios content,pdf --latency 0.5 --error-rate 0.02
+
+Scenarios: content (Content Generation then SCORM export), pdf (PDF upload
+then three questions), csv, research, ppt.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+from fake_backends import use_fake_backends
+
+SECRETS = {"OPENAI_API_KEY": "offline", "GOOGLE_API_KEY": "offline", "CUSTOM_SEARCH_ENGINE_ID": "offline"}
+
+
+def _select(section):
+    return lambda at, tag: at.sidebar.selectbox[0].select(section).run()
+
+
+def _text_input(index, value):
+    return lambda at, tag: at.text_input[index].input(value.format(tag=tag)).run()
+
+
+def _text_area(index, value):
+    return lambda at, tag: at.text_area[index].input(value.format(tag=tag)).run()
+
+
+def _upload_pdf(at, tag):
+    return at.file_uploader[0].set_value(("guidance.pdf", SAMPLE_PDF, "application/pdf")).run()
+
+
+def _click(label):
+    return lambda at, tag: next(button for button in at.button if button.label == label).click().run()
+
+
+# Scenario name -> list of (step name, action(app_test, unique_tag))
+SCENARIOS = {
+    "content": [
+        ("select section", _select("Content Generation")),
+        ("enter domain", _text_input(0, "Medical")),
+        ("query and SCORM export", _text_area(0, "Explain heart failure staging ({tag})")),
+    ],
+    "pdf": [
+        ("select section", _select("PDF Analysis")),
+        ("upload PDF", _upload_pdf),
+        ("question 1", _text_input(0, "What stability data must be submitted? ({tag})")),
+        ("question 2", _text_input(0, "Which validation reports are required? ({tag})")),
+        ("question 3", _text_input(0, "When must batch records be provided? ({tag})")),
+    ],
+    "csv": [
+        ("select section", _select("CSV Content Generation")),
+        ("enter domain", _text_input(0, "Medical")),
+        ("query", _text_area(0, "Common antibiotics and their classes ({tag})")),
+    ],
+    "research": [
+        ("select section", _select("Research Search")),
+        ("search", _text_area(0, "mRNA vaccine clinical trial results ({tag})")),
+    ],
+    "ppt": [
+        ("select section", _select("PPT Development")),
+        ("enter domain", _text_input(0, "Medical")),
+        ("enter topic", _text_input(1, "Heart failure ({tag})")),
+        ("generate deck", _click("Generate PPT")),
+    ],
+}
+
+SAMPLE_PDF = b""
+
+
+def current_rss_mib():
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": ordered[-1],
+    }
+
+
+def _failed(at):
+    if at.exception:
+        return at.exception[0].value
+    errors = [element.value for element in at.error]
+    return errors[0] if errors else None
+
+
+# Function to run one simulated session: its own AppTest, its scenarios, every step timed
+def run_session(session, scenarios, iterations, timeout, samples, lock):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "index.py"), default_timeout=timeout)
+    at.secrets["api"] = SECRETS
+    at.run()
+    for iteration in range(iterations):
+        for scenario in scenarios:
+            tag = f"s{session}-i{iteration}-{time.time_ns()}"
+            scenario_started = time.perf_counter()
+            error = None
+            for step, action in SCENARIOS[scenario]:
+                started = time.perf_counter()
+                try:
+                    at = action(at, tag)
+                    error = _failed(at)
+                except Exception as e:
+                    error = f"{e.__class__.__name__}: {e}"
+                with lock:
+                    samples.append({
+                        "session": session, "scenario": scenario, "step": step,
+                        "seconds": time.perf_counter() - started, "error": error,
+                    })
+                if error:
+                    break
+            with lock:
+                samples.append({
+                    "session": session, "scenario": scenario, "step": None,
+                    "seconds": time.perf_counter() - scenario_started, "error": error,
+                })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent simulated sessions (default: 10)")
+    parser.add_argument("--iterations", type=int, default=2, help="times each session runs its scenarios (default: 2)")
+    parser.add_argument("--scenarios", default="content,pdf", help=f"comma-separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake backend latency in seconds (default: 0.3)")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="delay between streamed words (default: 0.005)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of backend calls failing with 429/500")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="seconds over which sessions start (default: 2)")
+    parser.add_argument("--pdf-pages", type=int, default=40, help="pages of the uploaded synthetic PDF (default: 40)")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds allowed per script run (default: 300)")
+    parser.add_argument("--output", help="also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    scenarios = args.scenarios.split(",")
+    unknown = [scenario for scenario in scenarios if scenario not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario {unknown[0]!r}")
+
+    openai_backend, google_backend = use_fake_backends(
+        latency=args.latency, error_rate=args.error_rate, token_delay=args.token_delay
+    )
+    os.environ["LLM_CACHE_PATH"] = ""
+    os.environ.setdefault("OPENAI_RATE_LIMITS", "gpt-3.5-turbo=1000000/1000000000,gpt-4=1000000/1000000000")
+
+    global SAMPLE_PDF
+    if "pdf" in scenarios:
+        from streamlit.testing.v1 import AppTest
+
+        if not hasattr(AppTest, "file_uploader"):
+            parser.error("the pdf scenario needs a Streamlit whose AppTest supports file_uploader (1.50 or later)")
+        from bench_pdf_extraction import make_pdf
+
+        SAMPLE_PDF = make_pdf(args.pdf_pages)
+
+    # Warm imports and templates once so the first session doesn't pay for everyone
+    run_session(-1, scenarios, 1, args.timeout, [], threading.Lock())
+    rss_before = current_rss_mib()
+
+    samples = []
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(
+            target=run_session, args=(session, scenarios, args.iterations, args.timeout, samples, lock),
+            name=f"session-{session}", daemon=True,
+        )
+        for session in range(args.sessions)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+        time.sleep(args.ramp_up / max(1, args.sessions))
+    peak_rss = rss_before
+    while any(thread.is_alive() for thread in threads):
+        peak_rss = max(peak_rss, current_rss_mib())
+        time.sleep(0.2)
+    elapsed = time.perf_counter() - started
+    rss_after = current_rss_mib()
+
+    steps = [sample for sample in samples if sample["step"] is not None]
+    runs = [sample for sample in samples if sample["step"] is None]
+    report = {
+        "config": vars(args),
+        "wall_seconds": elapsed,
+        "throughput": {
+            "steps_per_second": len(steps) / elapsed,
+            "scenarios_per_second": len(runs) / elapsed,
+        },
+        "errors": {
+            "steps": sum(1 for sample in steps if sample["error"]),
+            "examples": sorted({sample["error"] for sample in steps if sample["error"]})[:5],
+            "backend_requests": openai_backend.requests + google_backend.requests,
+            "backend_injected_errors": openai_backend.errors + google_backend.errors,
+        },
+        "memory_mib": {
+            "before_sessions": rss_before,
+            "peak": peak_rss,
+            "after_sessions": rss_after,
+            "peak_per_session": (peak_rss - rss_before) / args.sessions,
+        },
+        "scenarios": {
+            scenario: percentiles([run["seconds"] for run in runs if run["scenario"] == scenario and not run["error"]])
+            for scenario in scenarios
+        },
+        "steps": {
+            f"{scenario}: {step}": percentiles([
+                sample["seconds"] for sample in steps
+                if sample["scenario"] == scenario and sample["step"] == step and not sample["error"]
+            ])
+            for scenario in scenarios
+            for step, _ in SCENARIOS[scenario]
+        },
+    }
+
+    print(f"{args.sessions} sessions x {args.iterations} iterations of {', '.join(scenarios)} in {elapsed:.1f} s")
+    print(
+        f"throughput: {report['throughput']['scenarios_per_second']:.2f} scenarios/s, "
+        f"{report['throughput']['steps_per_second']:.2f} steps/s; "
+        f"failed steps: {report['errors']['steps']} "
+        f"(backend injected {report['errors']['backend_injected_errors']} of {report['errors']['backend_requests']})"
+    )
+    print(
+        f"memory: {rss_before:.0f} MiB before, peak {peak_rss:.0f} MiB, "
+        f"{report['memory_mib']['peak_per_session']:.1f} MiB per session at peak"
+    )
+    for label, stats in list(report["scenarios"].items()) + list(report["steps"].items()):
+        if stats:
+            print(
+                f"  {label:38s} n={stats['count']:4d}  p50 {stats['p50']:7.2f} s  "
+                f"p95 {stats['p95']:7.2f} s  p99 {stats['p99']:7.2f} s"
+            )
+    for example in report["errors"]["examples"]:
+        print(f"  error: {example}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Multi-SCO SCORM courses: many generated items in one package with a generated manifest.
+
+Every item (a generated response, a PDF answer, CSV data, a dataset or a
+deck) becomes one SCO under ``items/NN-title/``: an HTML lesson page plus
+its attachments and, for text items, a printable PDF. Items are rendered
+concurrently and written into the archive as they finish. The logo,
+stylesheet and SCORM runtime script are stored once under ``shared/`` and
+declared as a shared asset resource that every SCO depends on.
+``imsmanifest.xml`` is generated with one organization item per SCO,
+grouped under a parent item per module.
+"""
+import html
+import os
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from asset_registry import image_bytes
+from cache import make_key
+from csv_tools import parse_csv_text
+from exports import LOGO_PATH, render_pdf
+from metrics import EXPORT_SECONDS, submit
+from scorm_archive import ScormArchive
+
+COURSE_WORKERS = int(os.environ.get("COURSE_WORKERS", 4))
+COURSE_MAX_ITEMS = int(os.environ.get("COURSE_MAX_ITEMS", 200))
+# Rows of CSV data and datasets shown on the lesson page; the full data is attached
+COURSE_TABLE_ROWS = int(os.environ.get("COURSE_TABLE_ROWS", 50))
+
+COURSE_ITEM_KINDS = ("content", "pdf-qa", "csv", "dataset", "ppt")
+# Items whose text is also rendered as a printable PDF
+PDF_ITEM_KINDS = ("content", "pdf-qa", "ppt")
+
+SHARED_DIR = "shared"
+SHARED_LOGO = "shared/logo.jpeg"
+
+_executor = ThreadPoolExecutor(max_workers=COURSE_WORKERS, thread_name_prefix="course")
+
+# Marks every lesson completed in the LMS through the SCORM 1.2 runtime API, when there is one
+SCORM_RUNTIME_JS = """(function () {
+    function findAPI(win) {
+        for (var depth = 0; win && depth < 10; depth++) {
+            if (win.API) {
+                return win.API;
+            }
+            if (win.parent === win) {
+                break;
+            }
+            win = win.parent;
+        }
+        return null;
+    }
+    var api = findAPI(window) || (window.opener ? findAPI(window.opener) : null);
+    if (!api) {
+        return;
+    }
+    api.LMSInitialize("");
+    api.LMSSetValue("cmi.core.lesson_status", "completed");
+    api.LMSCommit("");
+    window.addEventListener("beforeunload", function () {
+        api.LMSFinish("");
+    });
+})();
+"""
+
+COURSE_CSS = """body { font-family: Calibri, Arial, sans-serif; margin: 2em auto; max-width: 60em; line-height: 1.5; }
+header { display: flex; align-items: center; gap: 1em; border-bottom: 1px solid #ccc; }
+header img { height: 3em; }
+table { border-collapse: collapse; }
+th, td { border: 1px solid #ccc; padding: 0.2em 0.5em; text-align: left; }
+.question { font-style: italic; }
+"""
+
+LESSON_HTML = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <title>{title}</title>
+    <link rel="stylesheet" href="../../shared/course.css">
+    <script src="../../shared/scorm.js"></script>
+</head>
+<body>
+    <header>{logo}<p>{course_title}</p></header>
+    <h1>{title}</h1>
+{body}
+</body>
+</html>
+"""
+
+
+class CourseError(Exception):
+    """The course cannot be packaged, e.g. because it has no items."""
+
+
+# Function to make a course item from a generated result
+def course_item(kind, title, text, domain="", query="", module="", attachments=None):
+    """Return an item for ``build_course_package``.
+
+    ``text`` is the response (CSV text for ``csv`` and ``dataset`` items,
+    ``deck_text`` for decks); ``attachments`` maps file names to bytes,
+    e.g. ``{"presentation.pptx": deck}``. Items with the same ``module``
+    are grouped under it in the course outline.
+    """
+    if kind not in COURSE_ITEM_KINDS:
+        raise CourseError(f"unknown course item kind: {kind!r}")
+    return {
+        "kind": kind,
+        "title": title.strip() or kind,
+        "text": text,
+        "domain": domain,
+        "query": query,
+        "module": module.strip(),
+        "attachments": dict(attachments or {}),
+    }
+
+
+# Function to take the header and first rows of CSV bytes, e.g. of a large dataset, for its lesson page
+def csv_preview(data, rows=COURSE_TABLE_ROWS):
+    head = data[:1 << 20].decode("utf-8", "ignore")
+    return "\n".join(head.split("\n")[:rows + 1])
+
+
+def slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.casefold()).strip("-")[:40] or "item"
+
+
+# Function to render plain or lightly formatted text: blank-line paragraphs, "- " bullets and "Heading:" lines
+def text_to_html(text):
+    blocks = []
+    for block in re.split(r"\n\s*\n", text.strip()):
+        lines = [line.strip() for line in block.splitlines() if line.strip()]
+        heading = None
+        if len(lines) > 1 and lines[0].endswith(":") and not lines[0].startswith("- "):
+            heading = lines.pop(0)
+            blocks.append(f"    <h2>{html.escape(heading.rstrip(':'))}</h2>")
+        if lines and all(line.startswith(("- ", "* ", "• ")) for line in lines):
+            items = "".join(f"<li>{html.escape(line[2:].strip())}</li>" for line in lines)
+            blocks.append(f"    <ul>{items}</ul>")
+        elif lines:
+            blocks.append("    <p>" + "<br>".join(html.escape(line) for line in lines) + "</p>")
+    return "\n".join(blocks)
+
+
+def _table_html(csv_text):
+    parser = parse_csv_text(csv_text)
+    if not parser.header:
+        return "    <p>No tabular data.</p>"
+    header = "".join(f"<th>{html.escape(name)}</th>" for name in parser.header)
+    rows = "".join(
+        "<tr>" + "".join(f"<td>{html.escape(value)}</td>" for value in row) + "</tr>"
+        for row in parser.rows[:COURSE_TABLE_ROWS]
+    )
+    note = f"<p>First {COURSE_TABLE_ROWS} rows shown; the full data is attached.</p>" if len(parser.rows) > COURSE_TABLE_ROWS else ""
+    return f"    <table><tr>{header}</tr>{rows}</table>{note}"
+
+
+def _latin1(text):
+    # The core PDF fonts are latin-1 only; the lesson page keeps the exact text
+    return text.encode("latin-1", "replace").decode("latin-1")
+
+
+# Function to render one course item as the files of its SCO, relative to the item folder
+def render_item(item, course_title, has_logo=True):
+    files = dict(item["attachments"])
+    if item["kind"] in ("csv", "dataset"):
+        body = _table_html(item["text"])
+        files.setdefault("data.csv", item["text"].encode("utf-8"))
+    else:
+        body = text_to_html(item["text"])
+    if item["kind"] in PDF_ITEM_KINDS:
+        files["lesson.pdf"] = render_pdf(_latin1(item["text"]), title=_latin1(item["title"]), logo=False)
+
+    if item["query"]:
+        body = f"    <p class=\"question\">{html.escape(item['query'])}</p>\n" + body
+    links = "".join(f'<li><a href="{html.escape(name)}">{html.escape(name)}</a></li>' for name in files)
+    if links:
+        body += f"\n    <h2>Downloads</h2>\n    <ul>{links}</ul>"
+    files["index.html"] = LESSON_HTML.format(
+        title=html.escape(item["title"]),
+        course_title=html.escape(course_title),
+        logo=f'<img src="../../{SHARED_LOGO}" alt="">' if has_logo else "",
+        body=body,
+    ).encode("utf-8")
+    return files
+
+
+# Function to generate imsmanifest.xml for a course of one SCO per item
+def course_manifest(course_title, items, item_files, shared_files):
+    """Return the SCORM 1.2 manifest as bytes.
+
+    ``item_files`` lists, per item, the archive paths of its files (the
+    lesson page first); ``shared_files`` the paths of the shared assets.
+    """
+    manifest = ET.Element("manifest", {
+        "identifier": "COURSE-" + make_key(course_title, [item["title"] for item in items])[:12].upper(),
+        "version": "1.0",
+        "xmlns": "http://www.imsproject.org/xsd/imscp_rootv1p1p2",
+        "xmlns:adlcp": "http://www.adlnet.org/xsd/adlcp_rootv1p2",
+        "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
+        "xsi:schemaLocation": (
+            "http://www.imsproject.org/xsd/imscp_rootv1p1p2 imscp_rootv1p1p2.xsd "
+            "http://www.adlnet.org/xsd/adlcp_rootv1p2 adlcp_rootv1p2.xsd"
+        ),
+    })
+    metadata = ET.SubElement(manifest, "metadata")
+    ET.SubElement(metadata, "schema").text = "ADL SCORM"
+    ET.SubElement(metadata, "schemaversion").text = "1.2"
+
+    organizations = ET.SubElement(manifest, "organizations", default="ORG-1")
+    organization = ET.SubElement(organizations, "organization", identifier="ORG-1")
+    ET.SubElement(organization, "title").text = course_title
+    modules = {}
+    for number, item in enumerate(items, 1):
+        parent = organization
+        if item["module"]:
+            parent = modules.get(item["module"])
+            if parent is None:
+                parent = modules[item["module"]] = ET.SubElement(organization, "item", identifier=f"MODULE-{len(modules) + 1}")
+                ET.SubElement(parent, "title").text = item["module"]
+        element = ET.SubElement(parent, "item", identifier=f"ITEM-{number}", identifierref=f"RES-{number}", isvisible="true")
+        ET.SubElement(element, "title").text = item["title"]
+
+    resources = ET.SubElement(manifest, "resources")
+    for number, paths in enumerate(item_files, 1):
+        resource = ET.SubElement(resources, "resource", {
+            "identifier": f"RES-{number}", "type": "webcontent", "adlcp:scormtype": "sco", "href": paths[0],
+        })
+        for path in paths:
+            ET.SubElement(resource, "file", href=path)
+        ET.SubElement(resource, "dependency", identifierref="RES-SHARED")
+    shared = ET.SubElement(resources, "resource", {"identifier": "RES-SHARED", "type": "webcontent", "adlcp:scormtype": "asset"})
+    for path in shared_files:
+        ET.SubElement(shared, "file", href=path)
+
+    ET.indent(manifest)
+    return ET.tostring(manifest, encoding="utf-8", xml_declaration=True)
+
+
+# Function to package many items as one multi-SCO SCORM course, rendering the items concurrently
+@EXPORT_SECONDS.time(format="scorm_course")
+def build_course_package(course_title, items, progress=None):
+    """Return the bytes of a SCORM zip with one SCO per item, in item order.
+
+    ``progress(done, total)`` is called as items are rendered. Raises
+    CourseError if there are no items or more than ``COURSE_MAX_ITEMS``.
+    """
+    if not items:
+        raise CourseError("The course has no items.")
+    if len(items) > COURSE_MAX_ITEMS:
+        raise CourseError(f"The course has {len(items)} items; at most {COURSE_MAX_ITEMS} can be packaged.")
+
+    logo = image_bytes(LOGO_PATH)
+    folders = [f"items/{number:02d}-{slug(item['title'])}" for number, item in enumerate(items, 1)]
+    futures = {submit(_executor, render_item, item, course_title, logo is not None): index for index, item in enumerate(items)}
+
+    scorm_zip = ScormArchive()
+    item_files = [None] * len(items)
+    # The archive is written from this thread only, as each item's files arrive
+    for done, future in enumerate(as_completed(futures), 1):
+        index = futures[future]
+        files = future.result()
+        names = ["index.html"] + [name for name in files if name != "index.html"]
+        item_files[index] = [f"{folders[index]}/{name}" for name in names]
+        for name, path in zip(names, item_files[index]):
+            scorm_zip.write(path, files[name])
+        if progress is not None:
+            progress(done, len(items))
+
+    shared_files = {f"{SHARED_DIR}/scorm.js": SCORM_RUNTIME_JS, f"{SHARED_DIR}/course.css": COURSE_CSS}
+    if logo is not None:
+        shared_files[SHARED_LOGO] = logo
+    for path, data in shared_files.items():
+        scorm_zip.write(path, data)
+    scorm_zip.write("imsmanifest.xml", course_manifest(course_title, items, item_files, list(shared_files)))
+    return scorm_zip.getvalue()
@@ -0,0 +1,98 @@
+"""Incremental parsing of CSV produced by the model, one row at a time as tokens arrive."""
+import csv
+import os
+
+# A "row" still open after this many characters is an unterminated quote, not data
+MAX_ROW_CHARS = int(os.environ.get("CSV_MAX_ROW_CHARS", 65536))
+
+
+# Function to make header names unique the way pandas does (name, name.1, name.2, ...)
+def unique_column_names(header):
+    seen = {}
+    names = []
+    for index, name in enumerate(header):
+        name = name.strip() or f"column_{index + 1}"
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        names.append(name if count == 0 else f"{name}.{count}")
+    return names
+
+
+class CSVStreamParser:
+    """Parse CSV text fed in arbitrary pieces, e.g. streamed completion tokens.
+
+    The first non-blank line is the header. Each later line is parsed with
+    the ``csv`` module as soon as its terminating newline arrives (newlines
+    inside quoted fields are kept with their row). Rows whose field count
+    does not match the header are kept in ``quarantined`` as
+    ``(line_number, text, reason)`` instead of failing the whole response.
+    Markdown code fences and blank lines are ignored.
+    """
+
+    def __init__(self):
+        self.header = None
+        self.rows = []
+        self.quarantined = []
+        self._buffer = ""
+        self._scan_from = 0
+        self._line_number = 0
+
+    def feed(self, text):
+        """Add ``text`` and return the rows it completed."""
+        self._buffer += text
+        new_rows = []
+        while True:
+            newline = self._buffer.find("\n", self._scan_from)
+            if newline < 0:
+                self._scan_from = len(self._buffer)
+                if len(self._buffer) > MAX_ROW_CHARS:
+                    self._take_line(len(self._buffer), new_rows)
+                return new_rows
+            # An odd number of quotes means the newline is inside a quoted field
+            if self._buffer.count('"', 0, newline) % 2 and newline < MAX_ROW_CHARS:
+                self._scan_from = newline + 1
+                continue
+            self._take_line(newline + 1, new_rows)
+
+    def close(self):
+        """Parse whatever is left once the stream has ended and return those rows."""
+        new_rows = []
+        if self._buffer:
+            self._take_line(len(self._buffer), new_rows)
+        return new_rows
+
+    def columns(self):
+        """Return the parsed rows as ``{column name: [values]}``, ready for ``st.dataframe``."""
+        names = unique_column_names(self.header or [])
+        return {name: [row[index] for row in self.rows] for index, name in enumerate(names)}
+
+    def _take_line(self, end, new_rows):
+        text = self._buffer[:end]
+        self._buffer = self._buffer[end:]
+        self._scan_from = 0
+        self._line_number += text.count("\n") or 1
+        line = text.strip()
+        if not line or line.startswith("```"):
+            return
+        try:
+            fields = next(csv.reader([line], strict=True))
+        except (csv.Error, StopIteration) as e:
+            self.quarantined.append((self._line_number, line, str(e)))
+            return
+        if self.header is None:
+            self.header = fields
+        elif len(fields) != len(self.header):
+            self.quarantined.append(
+                (self._line_number, line, f"expected {len(self.header)} fields, found {len(fields)}")
+            )
+        else:
+            self.rows.append(fields)
+            new_rows.append(fields)
+
+
+# Function to parse a complete CSV string with the same rules as the streaming parser
+def parse_csv_text(text):
+    parser = CSVStreamParser()
+    parser.feed(text)
+    parser.close()
+    return parser
@@ -0,0 +1,335 @@
+"""Large CSV datasets built from many concurrent row-shard completions.
+
+A first call fixes the schema (column names, types and key columns). Rows
+are then requested in shards of ``DATASET_SHARD_ROWS`` on a bounded worker
+pool behind the shared OpenAI rate limiter. Each shard is parsed, type
+checked and de-duplicated as soon as it arrives, then written straight to
+the CSV sink. Parquet and Arrow rows are buffered up to
+``DATASET_ROW_GROUP_ROWS``, so the files get a few large row groups and
+record batches instead of one per shard; only the shards in flight and
+one row group are held in memory. Throughput grows with ``concurrency``
+until the rate limits of the model are reached.
+"""
+import csv
+import datetime
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from csv_tools import parse_csv_text
+from llm import chat_completion, strip_code_fence
+from metrics import submit
+
+DATASET_MODEL = "gpt-3.5-turbo"
+DATASET_SHARD_ROWS = int(os.environ.get("DATASET_SHARD_ROWS", 40))
+DATASET_CONCURRENCY = int(os.environ.get("DATASET_CONCURRENCY", 8))
+DATASET_MAX_ROWS = int(os.environ.get("DATASET_MAX_ROWS", 20000))
+DATASET_MAX_COLUMNS = 16
+# Completion budget per shard; also what the rate limiter reserves for each call
+DATASET_SHARD_MAX_TOKENS = int(os.environ.get("DATASET_SHARD_MAX_TOKENS", 3000))
+# Extra rounds of shards to make up for rows dropped as duplicates or invalid
+DATASET_TOP_UP_ROUNDS = 3
+# Rows per Parquet row group and Arrow record batch
+DATASET_ROW_GROUP_ROWS = int(os.environ.get("DATASET_ROW_GROUP_ROWS", 10000))
+
+COLUMN_TYPES = ("string", "integer", "float", "boolean", "date")
+TRUE_VALUES = {"true", "yes", "y", "1"}
+FALSE_VALUES = {"false", "no", "n", "0"}
+NUMBER_NOISE = re.compile(r"[,\s$€£%]")
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetError(Exception):
+    """The dataset cannot be generated, e.g. because no usable schema came back."""
+
+
+def _parse_integer(value):
+    number = float(NUMBER_NOISE.sub("", value))
+    if not number.is_integer():
+        raise ValueError(f"{value!r} is not an integer")
+    return int(number)
+
+
+def _parse_float(value):
+    return float(NUMBER_NOISE.sub("", value))
+
+
+def _parse_boolean(value):
+    lowered = value.lower()
+    if lowered in TRUE_VALUES:
+        return True
+    if lowered in FALSE_VALUES:
+        return False
+    raise ValueError(f"{value!r} is not a boolean")
+
+
+def _parse_date(value):
+    return datetime.date.fromisoformat(value)
+
+
+PARSERS = {
+    "string": str,
+    "integer": _parse_integer,
+    "float": _parse_float,
+    "boolean": _parse_boolean,
+    "date": _parse_date,
+}
+
+
+# Function to format a typed value back into CSV text
+def format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+# Function to ask the model for the column names, types and key of the dataset
+def generate_schema(domain, query):
+    """Return ``{"columns": [{"name", "type", "description"}], "key": [names]}``.
+
+    Raises DatasetError if the answer is not a usable schema.
+    """
+    prompt = f"""
+    Design the columns of a tabular dataset in the domain of {domain} for this request: {query}
+    Don't design data for any other domain except the one provided by the user.
+
+    Answer with JSON only, in exactly this form:
+    {{"columns": [{{"name": "...", "type": "string|integer|float|boolean|date", "description": "..."}}],
+      "key": ["names of the columns that together identify a row uniquely"]}}
+
+    Use between 3 and {DATASET_MAX_COLUMNS} columns with short snake_case names. Dates are ISO 8601 (YYYY-MM-DD).
+    """
+    answer = chat_completion(model=DATASET_MODEL, messages=[{"role": "user", "content": prompt}])
+    try:
+        schema = json.loads(strip_code_fence(answer))
+        columns = [
+            {
+                "name": str(column["name"]).strip(),
+                "type": str(column.get("type", "string")).strip().lower(),
+                "description": str(column.get("description", "")).strip(),
+            }
+            for column in schema["columns"]
+        ]
+    except (ValueError, KeyError, TypeError) as e:
+        raise DatasetError(f"The schema returned by the model is not valid JSON: {e}")
+
+    names = [column["name"] for column in columns]
+    if not columns or len(columns) > DATASET_MAX_COLUMNS or "" in names or len(set(names)) != len(names):
+        raise DatasetError("The schema returned by the model has missing, duplicate or too many columns.")
+    for column in columns:
+        if column["type"] not in COLUMN_TYPES:
+            column["type"] = "string"
+    key = schema.get("key") or []
+    key = [name for name in ([key] if isinstance(key, str) else key) if name in names]
+    return {"columns": columns, "key": key}
+
+
+def _shard_prompt(domain, query, schema, shard, rows):
+    header = ",".join(column["name"] for column in schema["columns"])
+    column_notes = "\n".join(
+        f"    - {column['name']} ({column['type']}): {column['description']}" for column in schema["columns"]
+    )
+    first = shard * DATASET_SHARD_ROWS + 1
+    key_note = f"Values of {', '.join(schema['key'])} must be unique. " if schema["key"] else ""
+    return f"""
+    Please provide reliable and accurate data related to the following query in the domain of {domain}.
+    Query: {query}
+
+    This is part {shard + 1} of a larger dataset: provide exactly {rows} new entries, numbered {first} to {first + rows - 1}
+    in the full dataset, that differ from the entries other parts would list first. {key_note}
+
+    Columns:
+{column_notes}
+
+    The response **must** be CSV only, without additional text, explanations, or formatting, starting with this header line:
+    {header}
+    """
+
+
+# Function to convert the text fields of a row to the schema's types
+def coerce_row(fields, schema):
+    values = []
+    for field, column in zip(fields, schema["columns"]):
+        field = field.strip()
+        values.append(PARSERS[column["type"]](field) if field else None)
+    return values
+
+
+def _row_key(values, key_indexes):
+    text = "\x1f".join(format_value(values[index]).casefold() for index in key_indexes)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class DatasetWriter:
+    """Write typed rows to any of a CSV, Parquet or Arrow IPC binary stream, batch by batch.
+
+    CSV rows are written as they come; Parquet and Arrow rows are buffered
+    and written ``row_group_rows`` at a time, the rest on ``close``.
+    """
+
+    def __init__(self, schema, csv_file=None, parquet_file=None, arrow_file=None, row_group_rows=DATASET_ROW_GROUP_ROWS):
+        self.schema = schema
+        self.names = [column["name"] for column in schema["columns"]]
+        self.row_group_rows = row_group_rows
+        self._pending = []
+        self._csv_text = None
+        self._csv_writer = None
+        self._parquet_writer = None
+        self._arrow_writer = None
+        if csv_file is not None:
+            self._csv_text = io.TextIOWrapper(csv_file, encoding="utf-8", newline="")
+            self._csv_writer = csv.writer(self._csv_text)
+            self._csv_writer.writerow(self.names)
+        if parquet_file is not None or arrow_file is not None:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            arrow_types = {
+                "string": pa.string(),
+                "integer": pa.int64(),
+                "float": pa.float64(),
+                "boolean": pa.bool_(),
+                "date": pa.date32(),
+            }
+            self._arrow_schema = pa.schema([(column["name"], arrow_types[column["type"]]) for column in schema["columns"]])
+            if parquet_file is not None:
+                self._parquet_writer = pq.ParquetWriter(parquet_file, self._arrow_schema)
+            if arrow_file is not None:
+                self._arrow_writer = pa.ipc.new_file(arrow_file, self._arrow_schema)
+
+    def write_rows(self, rows):
+        if not rows:
+            return
+        if self._csv_writer is not None:
+            self._csv_writer.writerows([format_value(value) for value in row] for row in rows)
+        if self._parquet_writer is not None or self._arrow_writer is not None:
+            self._pending.extend(rows)
+            while len(self._pending) >= self.row_group_rows:
+                self._flush(self._pending[:self.row_group_rows])
+                del self._pending[:self.row_group_rows]
+
+    def _flush(self, rows):
+        import pyarrow as pa
+
+        batch = pa.record_batch([list(column) for column in zip(*rows)], schema=self._arrow_schema)
+        if self._parquet_writer is not None:
+            self._parquet_writer.write_batch(batch)
+        if self._arrow_writer is not None:
+            self._arrow_writer.write_batch(batch)
+
+    def close(self):
+        # Only finalize the formats; the caller owns (and closes) the binary streams
+        if self._pending:
+            self._flush(self._pending)
+            self._pending = []
+        if self._csv_text is not None:
+            self._csv_text.detach()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        if self._arrow_writer is not None:
+            self._arrow_writer.close()
+
+
+# Function to build a dataset of ``total_rows`` unique rows from concurrent shard requests
+def build_dataset(domain, query, total_rows, csv_file=None, parquet_file=None, arrow_file=None,
+                  concurrency=DATASET_CONCURRENCY, progress=None):
+    """Generate the dataset and write it to the given binary streams.
+
+    Rows are de-duplicated on the schema's key columns (the whole row when
+    the model names none) and converted to the column types; rows that
+    don't fit are counted as rejected. Shards are topped up for up to
+    ``DATASET_TOP_UP_ROUNDS`` extra rounds to reach ``total_rows``.
+    ``progress(rows_written, total_rows)`` is called after every shard.
+    Returns a summary dict with the schema and row, duplicate, rejected
+    and failed-shard counts.
+    """
+    total_rows = max(1, min(int(total_rows), DATASET_MAX_ROWS))
+    started = time.perf_counter()
+    schema = generate_schema(domain, query)
+    names = [column["name"] for column in schema["columns"]]
+    key_indexes = [names.index(name) for name in schema["key"]] or list(range(len(names)))
+    header = [name.casefold() for name in names]
+
+    writer = DatasetWriter(schema, csv_file, parquet_file, arrow_file)
+    seen = set()
+    summary = {"schema": schema, "rows": 0, "duplicates": 0, "rejected": 0, "shards": 0, "failed_shards": 0}
+
+    def accept(answer):
+        parsed = parse_csv_text(answer)
+        rows = parsed.rows
+        # A shard that left out the header line has its first entry parsed as the header
+        if parsed.header and [field.strip().casefold() for field in parsed.header] != header:
+            rows = [parsed.header] + rows
+        summary["rejected"] += len(parsed.quarantined)
+        batch = []
+        for fields in rows:
+            if len(fields) != len(names):
+                summary["rejected"] += 1
+                continue
+            try:
+                values = coerce_row(fields, schema)
+            except ValueError:
+                summary["rejected"] += 1
+                continue
+            key = _row_key(values, key_indexes)
+            if key in seen:
+                summary["duplicates"] += 1
+                continue
+            if summary["rows"] + len(batch) >= total_rows:
+                break
+            seen.add(key)
+            batch.append(values)
+        writer.write_rows(batch)
+        summary["rows"] += len(batch)
+
+    def request_shard(shard, rows):
+        return chat_completion(
+            model=DATASET_MODEL,
+            messages=[{"role": "user", "content": _shard_prompt(domain, query, schema, shard, rows)}],
+            max_tokens=DATASET_SHARD_MAX_TOKENS,
+        )
+
+    next_shard = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="dataset") as pool:
+            for _ in range(DATASET_TOP_UP_ROUNDS + 1):
+                missing = total_rows - summary["rows"]
+                if missing <= 0:
+                    break
+                shards = list(range(next_shard, next_shard + -(-missing // DATASET_SHARD_ROWS)))
+                next_shard += len(shards)
+                pending = set()
+                # Keep at most ``concurrency`` shards in flight so memory is bounded by shard size
+                while shards or pending:
+                    while shards and len(pending) < max(1, concurrency):
+                        pending.add(submit(pool, request_shard, shards.pop(0), DATASET_SHARD_ROWS))
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        summary["shards"] += 1
+                        try:
+                            accept(future.result())
+                        except Exception as e:
+                            summary["failed_shards"] += 1
+                            logger.warning("Dataset shard failed: %s", e)
+                        if progress is not None:
+                            progress(summary["rows"], total_rows)
+    finally:
+        writer.close()
+
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(
+        "Dataset of %d rows built from %d shards in %.1fs (%d duplicates, %d rejected, %d shards failed)",
+        summary["rows"], summary["shards"], summary["seconds"],
+        summary["duplicates"], summary["rejected"], summary["failed_shards"],
+    )
+    return summary
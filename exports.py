@@ -0,0 +1,282 @@
+"""Document and SCORM package exporters shared by the app's sections."""
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from docx.shared import Inches
+from fpdf import FPDF
+
+from asset_registry import add_pdf_image, image_stream, new_document
+from cache import TTLCache, make_key
+from metrics import DOCUMENT_RENDER_SECONDS, EXPORT_SECONDS, ZIP_BUILD_SECONDS, submit
+from scorm_archive import ScormArchive
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "logo.jpeg")
+
+
+# Function to render the content as a PDF document and return its bytes
+@DOCUMENT_RENDER_SECONDS.time(format="pdf")
+def render_pdf(content, title="Research Content Response", logo=True):
+    pdf = FPDF()
+    pdf.add_page()
+
+    # Add the logo, decoded once per process by the asset registry
+    if logo:
+        add_pdf_image(pdf, LOGO_PATH)
+        pdf.image(LOGO_PATH, x=10, y=8, w=30)
+
+    # Title of the document
+    pdf.set_font("Arial", style='B', size=16)
+    pdf.ln(30)
+    pdf.cell(200, 10, txt=title, ln=True, align='C')
+    pdf.ln(10)
+
+    # Add content
+    pdf.set_font("Arial", size=12)
+    pdf.multi_cell(190, 10, content)
+
+    # FPDF 1.7 returns the document as a latin-1 string
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def save_as_pdf(content, file_name="response.pdf"):
+    with open(file_name, "wb") as pdf_file:
+        pdf_file.write(render_pdf(content))
+
+
+# HTML page of the PDF SCORM package, embedding content.pdf
+SCORM_PDF_INDEX_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <title>SCORM Content</title>
+</head>
+<body>
+    <h1>Research Content Response</h1>
+    <iframe src="content.pdf" width="100%" height="600px"></iframe>
+</body>
+</html>
+"""
+
+SCORM_PDF_MANIFEST = """<?xml version="1.0" encoding="UTF-8"?>
+<manifest xmlns="http://www.imsglobal.org/xsd/imscp_v1p1"
+          xmlns:adlcp="http://www.adlnet.org/xsd/adlcp_v1p3"
+          xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+          xsi:schemaLocation="http://www.imsglobal.org/xsd/imscp_v1p1
+                              http://www.imsglobal.org/xsd/imscp_v1p1.xsd
+                              http://www.adlnet.org/xsd/adlcp_v1p3
+                              http://www.adlnet.org/xsd/adlcp_v1p3.xsd">
+    <metadata>
+        <schema>ADL SCORM</schema>
+        <schemaversion>1.2</schemaversion>
+    </metadata>
+    <organizations>
+        <organization identifier="ORG-1">
+            <title>Research Content</title>
+            <item identifier="ITEM-1" identifierref="RES-1">
+                <title>Research Content Response</title>
+            </item>
+        </organization>
+    </organizations>
+    <resources>
+        <resource identifier="RES-1" type="webcontent" href="index.html">
+            <file href="index.html"/>
+            <file href="content.pdf"/>
+        </resource>
+    </resources>
+</manifest>
+"""
+
+
+# Function to build the PDF SCORM package entirely in memory
+def save_as_scorm_pdf(content):
+    """Return the bytes of a SCORM zip holding the content as a PDF.
+
+    Nothing touches the filesystem, so concurrent sessions cannot overwrite
+    each other's packages. The PDF, already compressed, is stored as-is.
+    """
+    pdf_bytes = render_pdf(content)
+    started = time.perf_counter()
+    scorm_zip = ScormArchive()
+    scorm_zip.write("content.pdf", pdf_bytes)
+    scorm_zip.write("index.html", SCORM_PDF_INDEX_HTML)
+    scorm_zip.write("imsmanifest.xml", SCORM_PDF_MANIFEST)
+    package = scorm_zip.getvalue()
+    ZIP_BUILD_SECONDS.observe(time.perf_counter() - started, package="scorm_pdf")
+    return package
+
+
+# Function to render the content as a Word document into a writable binary file object
+@DOCUMENT_RENDER_SECONDS.time(format="docx")
+def write_docx(content, docx_file):
+    doc = new_document()
+    # Add the logo to the Word document
+    logo = image_stream(LOGO_PATH)
+    if logo is not None:
+        doc.add_picture(logo, width=Inches(1.5))
+    doc.add_paragraph('\n')
+    doc.add_paragraph("Research Content Response", style='Heading 1')
+    doc.add_paragraph('\n')
+    doc.add_paragraph(content)
+    doc.save(docx_file)
+
+
+# Function to render the content as a Word document and return its bytes
+def render_docx(content):
+    docx_buffer = io.BytesIO()
+    write_docx(content, docx_buffer)
+    return docx_buffer.getvalue()
+
+
+# Function to render the content as a simple HTML page
+def render_html(content):
+    html_body = content.replace('\n', '<br>')
+    return f"""
+        <html>
+        <head><title>Research Content Response</title></head>
+        <body>
+        <h1>Research Content Response</h1>
+        <p>{html_body}</p>
+        </body>
+        </html>
+        """
+
+
+def save_as_scorm_word(content):
+    html = render_html(content)
+    started = time.perf_counter()
+
+    # Create an in-memory zip file
+    scorm_zip = ScormArchive()
+
+    # Create and add manifest.xml
+    manifest_content = """<manifest>
+        <metadata>
+            <schema>ADL SCORM</schema>
+            <schemaversion>1.2</schemaversion>
+        </metadata>
+        <resources>
+            <resource identifier="res1" type="webcontent" href="response.docx">
+                <file href="response.docx"/>
+                <file href="response.html"/>
+            </resource>
+        </resources>
+    </manifest>"""
+    scorm_zip.write("imanifest.xml", manifest_content)
+
+    # Save the DOCX straight into the archive, stored since it is already a zip
+    with scorm_zip.open("response.docx") as docx_member:
+        write_docx(content, docx_member)
+
+    # Create HTML file
+    scorm_zip.write("index.html", html)
+
+    package = scorm_zip.getvalue()
+    ZIP_BUILD_SECONDS.observe(time.perf_counter() - started, package="scorm_word")
+    return package
+
+
+# Function to create SCORM package dynamically based on domain and query
+def create_scorm_package(csv_content, domain, query):
+    started = time.perf_counter()
+
+    # Create an in-memory zip file
+    zip_file = ScormArchive()
+
+    # Add the CSV content to the zip file
+    zip_file.write("data.csv", csv_content)
+
+    # Dynamically create imsmanifest.xml content
+    imsmanifest_content = f"""<?xml version="1.0" encoding="UTF-8"?>
+<manifest identifier="scorm_2004" version="1.0">
+    <organizations>
+        <organization identifier="org_1">
+            <title>{domain} SCORM Package</title>
+        </organization>
+    </organizations>
+    <resources>
+        <resource identifier="res_1" type="webcontent" href="index.html">
+            <file href="data.csv"/>
+            <file href="index.html"/>
+        </resource>
+    </resources>
+</manifest>"""
+    zip_file.write("imsmanifest.xml", imsmanifest_content)
+
+    # Create dynamic index.html content with the domain and query
+    index_html_content = f"""<!DOCTYPE html>
+<html>
+<head>
+    <title>{domain} Data</title>
+</head>
+<body>
+    <h1>Welcome to the {domain} SCORM Package</h1>
+    <p><strong>Query:</strong> {query}</p>
+    <p>This package contains generated data based on the domain and query provided.</p>
+</body>
+</html>
+"""
+    zip_file.write("index.html", index_html_content)
+
+    zip_buffer = zip_file.close()
+    ZIP_BUILD_SECONDS.observe(time.perf_counter() - started, package="scorm_csv")
+
+    # Rewind the buffer to the beginning
+    zip_buffer.seek(0)
+    return zip_buffer
+
+
+# Export formats offered by the download buttons: renderer(content, domain, query), file name, MIME type
+EXPORT_FORMATS = {
+    "pdf": (lambda content, domain, query: render_pdf(content), "response.pdf", "application/pdf"),
+    "docx": (
+        lambda content, domain, query: render_docx(content),
+        "response.docx",
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ),
+    "html": (lambda content, domain, query: render_html(content).encode("utf-8"), "response.html", "text/html"),
+    "scorm_pdf": (lambda content, domain, query: save_as_scorm_pdf(content), "scorm_package.zip", "application/zip"),
+    "scorm_word": (lambda content, domain, query: save_as_scorm_word(content), "scorm_word_package.zip", "application/zip"),
+    "scorm_csv": (
+        lambda content, domain, query: create_scorm_package(content, domain, query).getvalue(),
+        "scorm_package.zip",
+        "application/zip",
+    ),
+}
+
+EXPORT_CACHE_TTL = int(os.environ.get("EXPORT_CACHE_TTL", 3600))
+EXPORT_CACHE_MAX_ENTRIES = int(os.environ.get("EXPORT_CACHE_MAX_ENTRIES", 128))
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", 4))
+
+export_cache = TTLCache(ttl=EXPORT_CACHE_TTL, max_entries=EXPORT_CACHE_MAX_ENTRIES)
+_export_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+
+
+def _render_export(export_format, content, domain, query):
+    with EXPORT_SECONDS.time(format=export_format):
+        return EXPORT_FORMATS[export_format][0](content, domain, query)
+
+
+# Function to render several export formats at once, memoized by content and format
+def export_artifacts(content, formats, domain="", query=""):
+    """Return ``{format: bytes}`` for each requested format in ``EXPORT_FORMATS``.
+
+    Formats already rendered for the same content and metadata are served
+    from ``export_cache``; the rest are rendered concurrently on a thread
+    pool, so reruns and repeat clicks cost no rendering at all.
+    """
+    artifacts = {}
+    pending = {}
+    for export_format in formats:
+        key = make_key(export_format, content, domain, query)
+        data = export_cache.get(key)
+        if data is not None:
+            artifacts[export_format] = data
+        else:
+            future = submit(_export_executor, _render_export, export_format, content, domain, query)
+            pending[export_format] = (key, future)
+    for export_format, (key, future) in pending.items():
+        data = future.result()
+        export_cache.set(key, data)
+        artifacts[export_format] = data
+    return artifacts
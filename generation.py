@@ -0,0 +1,183 @@
+"""OpenAI-backed generation functions shared by the Streamlit app and the batch runner."""
+from llm import chat_completion, stream_chat_completion, strip_code_fence
+from metrics import QUERY_REUSE_LOOKUPS
+from query_index import SimilarQueryIndex
+from summarize import map_reduce_summarize
+
+# Answers to earlier questions, reused for rephrasings of them in the same section and domain
+answer_index = SimilarQueryIndex()
+
+
+def _lookup_answer(kind, domain, query, reuse):
+    match = answer_index.lookup((kind, domain.strip().casefold()), query)
+    QUERY_REUSE_LOOKUPS.inc(kind=kind, result="new" if match is None else "reused")
+    if match is not None and reuse is not None:
+        reuse.update(match)
+    return match
+
+
+def _remember_answer(kind, domain, query, answer):
+    if answer and not answer.startswith("Error:"):
+        answer_index.add((kind, domain.strip().casefold()), query, answer)
+
+
+# Function to answer from a similar earlier question if there is one, otherwise generate with ``fetch()``
+def answer_or_reuse(kind, domain, query, fetch, reuse=None):
+    """Return the answer to ``query``; ``reuse`` (a dict) receives the matched question and score when reused."""
+    match = _lookup_answer(kind, domain, query, reuse)
+    if match is not None:
+        return match["answer"]
+    answer = fetch()
+    _remember_answer(kind, domain, query, answer)
+    return answer
+
+
+# Streaming variant of answer_or_reuse: ``stream(outcome)`` is only called when nothing is reused
+def stream_or_reuse(kind, domain, query, stream, reuse=None):
+    """Yield the answer to ``query``, reused or streamed.
+
+    ``stream`` sets ``outcome["error"]`` when it fails partway; the tokens
+    already sent are then not remembered as an answer.
+    """
+    match = _lookup_answer(kind, domain, query, reuse)
+    if match is not None:
+        yield match["answer"]
+        return
+    outcome = {}
+    parts = []
+    for token in stream(outcome):
+        parts.append(token)
+        yield token
+    if "error" not in outcome:
+        _remember_answer(kind, domain, query, "".join(parts))
+
+
+def content_gen_messages(domain, query):
+    system_prompt = (
+        f"You are an expert in the {domain} domain only. "
+        f"Only answer the questions related to the specified {domain} domain "
+        "and don't answer any other questions."
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": query},
+    ]
+
+
+def _fetch_content_gen(domain, query):
+    try:
+        return chat_completion(model="gpt-3.5-turbo", messages=content_gen_messages(domain, query))
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+def _stream_content_gen(domain, query, outcome):
+    try:
+        yield from stream_chat_completion(model="gpt-3.5-turbo", messages=content_gen_messages(domain, query))
+    except Exception as e:
+        outcome["error"] = str(e)
+        yield f"Error: {str(e)}"
+
+
+def fetch_gpt_response_content_gen(domain, query, reuse=None):
+    return answer_or_reuse("content", domain, query, lambda: _fetch_content_gen(domain, query), reuse)
+
+
+# Streaming variant: yields tokens as they arrive so st.write_stream can render them
+def stream_gpt_response_content_gen(domain, query, reuse=None):
+    yield from stream_or_reuse("content", domain, query, lambda outcome: _stream_content_gen(domain, query, outcome), reuse)
+
+
+def pdf_messages(query):
+    return [
+        {"role": "system", "content": "You are an expert in analyzing PDFs and providing highlights, summaries, analyses, and insights. Only answer questions based strictly on the content of the uploaded PDF. Do not answer any questions that are unrelated or outside the scope of the PDF."},
+        {"role": "user", "content": query},
+    ]
+
+
+# Function to build the PDF question prompt from the relevant document content
+def pdf_prompt(pdf_content, query):
+    return (
+        "You are an expert in analyzing PDFs and providing highlights, summaries, analyses, and insights. "
+        "Only answer questions based strictly on the content of the uploaded PDF. "
+        "Do not answer any questions that are unrelated or outside the scope of the PDF.\n\n"
+        f"PDF Content: {pdf_content}\n\n"
+        f"Question: {query}"
+    )
+
+
+def fetch_gpt_response_pdf(query):
+    try:
+        return chat_completion(model="gpt-3.5-turbo", messages=pdf_messages(query))
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+# Streaming variant of fetch_gpt_response_pdf
+def stream_gpt_response_pdf(query):
+    try:
+        yield from stream_chat_completion(model="gpt-3.5-turbo", messages=pdf_messages(query))
+    except Exception as e:
+        yield f"Error: {str(e)}"
+
+
+# Function to summarize a PDF too large for a single prompt
+def summarize_large_pdf(text, query, progress=None):
+    try:
+        return map_reduce_summarize(text, query, progress)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+# Function to answer a single prompt with no system message
+def get_response(text):
+    try:
+        return chat_completion(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": text}]
+        )
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+# Function to build the prompt asking for structured CSV data in the given domain
+def csv_prompt(domain, query):
+    return f"""
+    Please provide reliable and accurate data related to the following query in the domain of {domain}.
+    Don't answer queries or provide CSV data for any other domain except the one provided by the user.
+    The data should include at least 15 to 20 entries and be formatted as a proper CSV with headers and rows.
+    
+    The response **must** strictly follow this format:
+    
+    ```
+    Column1,Column2,Column3
+    Value1,Value2,Value3
+    Value4,Value5,Value6
+    ```
+    
+    Ensure that the output is structured properly as CSV without additional text, explanations, or formatting.
+    
+    Query: {query}
+    """
+
+
+# Function to fetch structured CSV data for a domain and query, reusing the answer to a similar earlier query
+def fetch_gpt_response(domain, query, reuse=None):
+    response = answer_or_reuse("csv", domain, query, lambda: get_response(csv_prompt(domain, query)), reuse)
+    return strip_code_fence(response)
+
+
+def _stream_csv(domain, query, outcome):
+    try:
+        yield from stream_chat_completion(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": csv_prompt(domain, query)}],
+        )
+    except Exception as e:
+        outcome["error"] = str(e)
+        yield f"Error: {str(e)}"
+
+
+# Streaming variant of fetch_gpt_response, so rows can be parsed and shown as they arrive
+def stream_gpt_response_csv(domain, query, reuse=None):
+    yield from stream_or_reuse("csv", domain, query, lambda outcome: _stream_csv(domain, query, outcome), reuse)
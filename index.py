@@ -1,460 +1,87 @@
 import streamlit as st
-import requests
-from fpdf import FPDF
-from docx import Document
-import openai
-import PyPDF2
-from docx.shared import Inches
 import io
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
-import zipfile
 import os
-from pathlib import Path
-import csv
-import pandas as pd
+import logging
+import time
 
-# Access keys from Streamlit Secrets
-openai.api_key = st.secrets["api"]["OPENAI_API_KEY"]
-google_api_key = st.secrets["api"]["GOOGLE_API_KEY"]
-custom_search_engine_id = st.secrets["api"]["CUSTOM_SEARCH_ENGINE_ID"]
+import metrics
 
+# Heavy dependencies (openai, numpy/scipy, python-pptx, python-docx, fpdf,
+# PyPDF2, requests) are imported inside the sections that use them, so pages such as
+# About or Credits, and every new worker process, don't pay for them up front.
 
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
 
-# Research-related keywords
-RESEARCH_KEYWORDS = [
-"research", "article", "study", "paper", "journal", "report", "document", "thesis", "dissertation",
-    "review", "literature", "source", "abstract", "manuscript", "publication", "findings", "results",
-    "investigation", "survey", "exploration", "clinical trial", "experiment", "data analysis",
-    "methodology", "results", "hypothesis", "sample study", "case study", "data set", "research method",
-    "peer-reviewed", "academic paper", "research paper", "study report", "research proposal", "field study",
-    "systematic review", "experimental study", "observational study", "control group", "clinical research",
-    "medical research", "pharmaceutical research", "biotech research", "drug development", "drug discovery",
-    "experimental design", "epidemiological study", "randomized control trial", "meta-analysis", "biostatistics",
-    "computational study", "therapeutic research", "molecular research", "genetic research", "biomedical research",
-    "cancer research", "immunology study", "pathophysiology", "translational research", "treatment protocol",
-    "medical innovation", "medical device study", "medical trial", "disease research", "pharmacology",
-    "pharmacovigilance", "clinical development", "clinical study protocol", "patient safety", "pharmaceutical study",
-    "pharmacokinetics", "therapeutic efficacy", "pharmacodynamics", "evidence-based medicine", "drug toxicology",
-    "preclinical study", "clinical outcomes", "regulatory affairs", "patent study", "artificial intelligence research",
-    "machine learning algorithms", "predictive modeling", "computational biology", "quantum computing research",
-    "robotics in medicine", "data mining", "neural networks in pharma", "digital health", "telemedicine research",
-    "precision medicine", "genomic research", "biotechnology innovation", "CRISPR technology",
-    "wearable health technology",
-    "peer-reviewed articles", "research journal", "scientific journal", "academic journal", "medical journal",
-    "pharmaceutical journal", "research article", "review article", "open access", "editorial", "article abstract",
-    "case report", "journal impact factor", "citation analysis", "scopus indexed", "elsevier", "springer",
-    "wiley online library", "doi", "pubmed indexed", "neuroscience research", "cardiology research",
-    "oncology research",
-    "infectious disease study", "pediatrics research", "geriatrics study", "regenerative medicine",
-    "stem cell research",
-    "mental health studies", "HIV/AIDS research", "diabetes research", "rare diseases study",
-    "autoimmune diseases research",
-    "cardiovascular diseases study", "hepatology research", "dermatology study", "orthopedics research",
-    "rheumatology research",
-    "patent research", "patent application", "patent literature", "patent filing", "intellectual property",
-    "patent search",
-    "patent documentation", "pharmaceutical patent", "drug patent", "biotechnology patent", "data-driven research",
-    "systematic review", "research data", "open science", "data visualization", "collaborative research",
-    "research collaboration",
-    "research network", "research findings", "literature review", "trial report", "cohort study",
-    "cross-sectional study",
-    "research grants", "clinical evaluation", "research ethics", "scientific method", "study design",
-    "research funding",
-    "research institutions", "research organizations", "health policy research", "epidemiology research"
-
-]
-
-# Function to check if a query contains research-related keywords
-def is_query_research_related(query):
-    for keyword in RESEARCH_KEYWORDS:
-        if keyword.lower() in query.lower():
-            return True
-    return False
-
-# Function to search using Google Custom Search API
-def google_custom_search(query):
-    url = (
-        f"https://www.googleapis.com/customsearch/v1"
-        f"?q={query}&key={google_api_key}&cx={custom_search_engine_id}"
-    )
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        return {"error": "Error fetching data from Google Custom Search"}
-
-def fetch_gpt_response_content_gen(domain, query):
-    try:
-        system_prompt = (
-            f"You are an expert in the {domain} domain only. "
-            f"Only answer the questions related to the specified {domain} domain "
-            "and don't answer any other questions."
-        )
-        
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": query},
-            ],
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error: {str(e)}"
-
-
-
-
-# Function to extract text from PDF
-def extract_text_from_pdf(pdf_file):
-    pdf_reader = PyPDF2.PdfReader(pdf_file)
-    pdf_text = ""
-    for page in pdf_reader.pages:
-        pdf_text += page.extract_text()
-    return pdf_text
-
-
-def save_as_scorm_pdf(content, output_folder="scorm_package", scorm_zip_name="scorm_package.zip"):
-    # Step 1: Create the SCORM folder structure
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    # Save the PDF
-    pdf_file_path = os.path.join(output_folder, "content.pdf")
-    save_as_pdf(content, pdf_file_path)
-
-    # Step 2: Create the HTML file
-    html_file_path = os.path.join(output_folder, "index.html")
-    with open(html_file_path, "w", encoding="utf-8") as html_file:
-        html_file.write(f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>SCORM Content</title>
-        </head>
-        <body>
-            <h1>Research Content Response</h1>
-            <iframe src="content.pdf" width="100%" height="600px"></iframe>
-        </body>
-        </html>
-        """)
+# Minimum seconds between redraws of the CSV table while rows stream in
+CSV_REFRESH_SECONDS = float(os.environ.get("CSV_REFRESH_SECONDS", 0.2))
 
-    # Step 3: Create the imsmanifest.xml file
-    manifest_file_path = os.path.join(output_folder, "imsmanifest.xml")
-    with open(manifest_file_path, "w", encoding="utf-8") as manifest_file:
-        manifest_file.write(f"""
-        <?xml version="1.0" encoding="UTF-8"?>
-        <manifest xmlns="http://www.imsglobal.org/xsd/imscp_v1p1"
-                  xmlns:adlcp="http://www.adlnet.org/xsd/adlcp_v1p3"
-                  xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-                  xsi:schemaLocation="http://www.imsglobal.org/xsd/imscp_v1p1
-                                      http://www.imsglobal.org/xsd/imscp_v1p1.xsd
-                                      http://www.adlnet.org/xsd/adlcp_v1p3
-                                      http://www.adlnet.org/xsd/adlcp_v1p3.xsd">
-            <metadata>
-                <schema>ADL SCORM</schema>
-                <schemaversion>1.2</schemaversion>
-            </metadata>
-            <organizations>
-                <organization identifier="ORG-1">
-                    <title>Research Content</title>
-                    <item identifier="ITEM-1" identifierref="RES-1">
-                        <title>Research Content Response</title>
-                    </item>
-                </organization>
-            </organizations>
-            <resources>
-                <resource identifier="RES-1" type="webcontent" href="index.html">
-                    <file href="index.html"/>
-                    <file href="content.pdf"/>
-                </resource>
-            </resources>
-        </manifest>
-        """)
+# The Metrics panel is listed only when the page is opened with ?admin=<this token>
+METRICS_ADMIN_TOKEN = os.environ.get("METRICS_ADMIN_TOKEN", "")
 
-    # Step 4: Zip the SCORM package
-    with zipfile.ZipFile(scorm_zip_name, 'w', zipfile.ZIP_DEFLATED) as scorm_zip:
-        for foldername, subfolders, filenames in os.walk(output_folder):
-            for filename in filenames:
-                file_path = os.path.join(foldername, filename)
-                arcname = os.path.relpath(file_path, output_folder)
-                scorm_zip.write(file_path, arcname)
-
-    # Provide the download button for the SCORM package
-    with open(scorm_zip_name, "rb") as scorm_file:
-        st.download_button("Download SCORM Package", scorm_file, scorm_zip_name, "application/zip")
-
-
-def save_as_pdf(content, file_name="response.pdf"):
-    pdf = FPDF()
-    pdf.add_page()
-
-    # Add the logo
-    pdf.image('assets/logo.jpeg', x=10, y=8, w=30)
-
-    # Title of the document
-    pdf.set_font("Arial", style='B', size=16)
-    pdf.ln(30)
-    pdf.cell(200, 10, txt="Research Content Response", ln=True, align='C')
-    pdf.ln(10)
-
-    # Add content
-    pdf.set_font("Arial", size=12)
-    pdf.multi_cell(190, 10, content)
-
-    # Save the PDF
-    pdf.output(file_name)
-
-
-def save_as_scorm_word(content, file_name="scorm_package.zip"):
-    # Create an in-memory zip file
-    scorm_zip = io.BytesIO()
-
-    with zipfile.ZipFile(scorm_zip, 'w') as zf:
-        # Create and add manifest.xml
-        manifest_content = """<manifest>
-            <metadata>
-                <schema>ADL SCORM</schema>
-                <schemaversion>1.2</schemaversion>
-            </metadata>
-            <resources>
-                <resource identifier="res1" type="webcontent" href="response.docx">
-                    <file href="response.docx"/>
-                    <file href="response.html"/>
-                </resource>
-            </resources>
-        </manifest>"""
-        zf.writestr("imanifest.xml", manifest_content)
-
-        # Create DOCX file
-        docx_buffer = io.BytesIO()
-        doc = Document()
-        # Add the logo to the Word document
-        logo_path = "assets/logo.jpeg"
-        if Path(logo_path).is_file():
-            doc.add_picture(logo_path, width=Inches(1.5))
-        doc.add_paragraph('\n')
-        doc.add_paragraph("Research Content Response", style='Heading 1')
-        doc.add_paragraph('\n')
-        doc.add_paragraph(content)
-        doc.save(docx_buffer)
-        docx_buffer.seek(0)
-        zf.writestr("response.docx", docx_buffer.getvalue())
-
-        # Create HTML file
-        html_content = f"""
-        <html>
-        <head><title>Research Content Response</title></head>
-        <body>
-        <h1>Research Content Response</h1>
-        <p>{content.replace('\n', '<br>')}</p>
-        </body>
-        </html>
-        """
-        zf.writestr("index.html", html_content)
-
-    scorm_zip.seek(0)
-    return scorm_zip.getvalue()
-
-
-# Usage in Streamlit
-def save_as_scorm_button(content):
-    scorm_data = save_as_scorm_word(content)
-    st.download_button(
-        label="Download SCORM Package",
-        data=scorm_data,
-        file_name="scorm_package.zip",
-        mime="application/zip"
-    )
+# Serve /metrics and/or dump them to a file if configured; only the first run starts them
+metrics.start_exporters()
 
-def fetch_gpt_response_pdf(query):
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert in analyzing PDFs and providing highlights, summaries, analyses, and insights. Only answer questions based strictly on the content of the uploaded PDF. Do not answer any questions that are unrelated or outside the scope of the PDF."},
-                {"role": "user", "content": query},
-            ],
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error: {str(e)}"
+# Access keys from Streamlit Secrets; the OpenAI client picks its key up from the environment
+os.environ["OPENAI_API_KEY"] = st.secrets["api"]["OPENAI_API_KEY"]
+google_api_key = st.secrets["api"]["GOOGLE_API_KEY"]
+custom_search_engine_id = st.secrets["api"]["CUSTOM_SEARCH_ENGINE_ID"]
 
 
+# Download buttons served from the memoized export pipeline; buttons maps format -> (label, file name)
+def show_export_downloads(content, buttons, domain="", query=""):
+    from exports import EXPORT_FORMATS, export_artifacts
 
-def get_response(text):
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": text}]
+    artifacts = export_artifacts(content, list(buttons), domain, query)
+    for export_format, (label, file_name) in buttons.items():
+        st.download_button(
+            label=label,
+            data=artifacts[export_format],
+            file_name=file_name,
+            mime=EXPORT_FORMATS[export_format][2],
         )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error: {str(e)}"
 
 
-# Function to fetch medical and pharma-related data from GPT-3
-# Function to fetch data from GPT-3 based on domain and query
+# Note when an answer was reused from a similar earlier question, with the reuse rate so far
+def show_reuse_notice(reuse):
+    from generation import answer_index
+
+    stats = answer_index.stats()
+    if reuse:
+        st.caption(f"♻️ Reused the answer to a similar earlier question: “{reuse['query']}” (similarity {reuse['score']:.0%})")
+    st.caption(f"Similar-question reuse rate: {stats['reuse_rate']:.0%} ({stats['reuses']} of {stats['lookups']} questions)")
+
+
+# Button adding the current result to the course assembled in the Course Builder section
+def add_to_course_button(kind, title, text, domain="", query="", attachments=None):
+    from course_builder import course_item
+
+    if not st.button("➕ Add to course", key=f"add_to_course_{kind}"):
+        return
+    course = st.session_state.setdefault("course_items", [])
+    if any(item["kind"] == kind and item["text"] == text for item in course):
+        st.info("This result is already in the course.")
+        return
+    item = course_item(kind, title[:120], text, domain, query, attachments=attachments)
+    # Stable ids keep each item's widgets attached to it when other items are removed
+    item["id"] = st.session_state.get("course_next_id", 0)
+    st.session_state.course_next_id = item["id"] + 1
+    course.append(item)
+    st.success(f"Added to the course ({len(course)} items). Package it in the Course Builder section.")
 
-# Function to fetch structured CSV data from GPT-3
-def fetch_gpt_response(domain, query):
-    prompt = f"""
-    Please provide reliable and accurate data related to the following query in the domain of {domain}.
-    Don't answer queries or provide CSV data for any other domain except the one provided by the user.
-    The data should include at least 15 to 20 entries and be formatted as a proper CSV with headers and rows.
-    
-    The response **must** strictly follow this format:
-    
-    ```
-    Column1,Column2,Column3
-    Value1,Value2,Value3
-    Value4,Value5,Value6
-    ```
-    
-    Ensure that the output is structured properly as CSV without additional text, explanations, or formatting.
-    
-    Query: {query}
-    """
-    response = get_response(prompt)  # Fetch response from GPT-3
-    return response.strip()
-
-# Function to create SCORM package dynamically based on domain and query
-def create_scorm_package(csv_content, domain, query):
-    # Create an in-memory binary stream for the zip file
-    zip_buffer = io.BytesIO()
-
-    with zipfile.ZipFile(zip_buffer, "w") as zip_file:
-        # Add the CSV content to the zip file
-        zip_file.writestr("data.csv", csv_content)
-
-        # Dynamically create imsmanifest.xml content
-        imsmanifest_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<manifest identifier="scorm_2004" version="1.0">
-    <organizations>
-        <organization identifier="org_1">
-            <title>{domain} SCORM Package</title>
-        </organization>
-    </organizations>
-    <resources>
-        <resource identifier="res_1" type="webcontent" href="index.html">
-            <file href="data.csv"/>
-            <file href="index.html"/>
-        </resource>
-    </resources>
-</manifest>"""
-        zip_file.writestr("imsmanifest.xml", imsmanifest_content)
-
-        # Create dynamic index.html content with the domain and query
-        index_html_content = f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>{domain} Data</title>
-</head>
-<body>
-    <h1>Welcome to the {domain} SCORM Package</h1>
-    <p><strong>Query:</strong> {query}</p>
-    <p>This package contains generated data based on the domain and query provided.</p>
-</body>
-</html>
-"""
-        zip_file.writestr("index.html", index_html_content)
-
-    # Rewind the buffer to the beginning
-    zip_buffer.seek(0)
-    return zip_buffer
-
-
-
-
-
-
-
-# Function to convert CSV string to DataFrame
-def csv_to_dataframe(csv_string):
-    try:
-        df = pd.read_csv(io.StringIO(csv_string))
-        return df
-    except Exception as e:
-        return None  # Handle invalid CSV cases
-
-def generate_detailed_ppt_content(domain, topic):
-    """Generate detailed content for a presentation using GPT based on the selected domain and topic."""
-    prompt = (
-        f"You are an expert in the {domain} domain. Generate a professional, formal PowerPoint presentation on the topic: '{topic}'.\n\n"
-        f"Instructions:\n"
-        f"1. All content must be specific to the {domain} domain and based on the topic '{topic}'.\n"
-        f"2. Each slide must have at least 4 well-written bullet points, not paragraphs.\n"
-        f"3. Ensure formal tone, clarity, and relevance to the chosen domain.\n"
-        f"4. Structure should include:\n"
-        f"   - Title Slide (Domain, Topic, Author Name placeholder)\n"
-        f"   - Introduction Slide (Definition and importance of the topic)\n"
-        f"   - 4–6 Key Point Slides (with elaborated points)\n"
-        f"   - Case Studies/Examples Slide (with real-world relevance to the domain)\n"
-        f"   - Conclusion Slide (with summary/future direction)\n\n"
-        f"Output only detailed slide-wise content."
-    )
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": f"You are a domain expert in {domain}."},
-                {"role": "user", "content": prompt},
-            ],
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error: {str(e)}"
-
-def create_professional_ppt(content, topic, file_name="presentation.pptx"):
-    """Create a well-formatted professional PowerPoint presentation."""
-    ppt = Presentation()
-
-    # Set consistent font styles
-    def set_textbox_style(text_frame):
-        """Style the textbox content."""
-        for paragraph in text_frame.paragraphs:
-            paragraph.font.name = "Calibri (Body)"
-            paragraph.font.size = Pt(20)
-            paragraph.alignment = PP_ALIGN.LEFT
-
-    # Title Slide
-    title_slide_layout = ppt.slide_layouts[0]
-    slide = ppt.slides.add_slide(title_slide_layout)
-    title = slide.shapes.title
-    subtitle = slide.placeholders[1]
-    title.text = topic
-    subtitle.text = f"A Comprehensive Overview in {domain} Domain"
-
-    # Process GPT content into slides
-    sections = content.split("\n\n")
-    for section in sections:
-        if ":" in section:  # Detect title: content structure
-            slide_title, slide_content = section.split(":", 1)
-
-            # Add a new slide for each section
-            slide = ppt.slides.add_slide(ppt.slide_layouts[1])
-            title = slide.shapes.title
-            title.text = slide_title.strip()
-
-            # Add content to the slide
-            content_box = slide.placeholders[1]
-            content_box.text = slide_content.strip()
-            set_textbox_style(content_box.text_frame)
-
-    # Save the presentation
-    ppt.save(file_name)
-    return file_name
 
 # Streamlit UI
 st.set_page_config(page_title="Content and Research Analysis", layout="wide")
 st.title("📚 Content Generation And Analysis System")
 
 # Sidebar Navigation
-sections = ["About", "Content Generation", "PDF Analysis","CSV Content Generation", "Research Search","PPT Development", "Instructions", "Credits"]
+sections = ["About", "Content Generation", "PDF Analysis","CSV Content Generation", "Research Search","PPT Development", "Course Builder", "Instructions", "Credits"]
+if METRICS_ADMIN_TOKEN and st.query_params.get("admin") == METRICS_ADMIN_TOKEN:
+    sections.append("Metrics")
 selected_section = st.sidebar.selectbox("Navigation", sections)
 
+# Label the latency and token metrics recorded during this run with the section
+metrics.set_section(selected_section)
+
 if selected_section == "About":
     st.markdown("---")
     st.header("📖 About")
@@ -508,6 +135,8 @@ if selected_section == "About":
 
 
 elif selected_section == "Content Generation":
+    from generation import stream_gpt_response_content_gen
+
     st.markdown("---")
     st.header("🔍 Content Generation")
     
@@ -529,15 +158,18 @@ elif selected_section == "Content Generation":
         )
 
         if query:
+            # Display the response
+            st.subheader("Response")
+
             # Check if a new query has been entered
             if query != st.session_state.get("last_query"):
-                # Fetch response and store in session state
-                st.session_state.generated_response = fetch_gpt_response_content_gen(domain, query)
+                # Stream the response as it is generated and store the full text in session state
+                reuse = {}
+                st.session_state.generated_response = st.write_stream(stream_gpt_response_content_gen(domain, query, reuse))
                 st.session_state.last_query = query  # Update last query
-
-            # Display the response
-            st.subheader("Response")
-            st.write(st.session_state.generated_response)
+                show_reuse_notice(reuse)
+            else:
+                st.write(st.session_state.generated_response)
 
         # Horizontal line before download options
         st.markdown("---")
@@ -545,24 +177,13 @@ elif selected_section == "Content Generation":
         # Download options
         st.subheader("📥 Download Options")
 
-        # Button to download SCORM PDF
-        if st.button("Generate the PDF as SCORM Package"):
-            save_as_scorm_pdf(st.session_state.generated_response)
-            st.success("SCORM package generated successfully!")
-
-        # Button to download SCORM Word
-        if st.button("Generate the Word File as SCORM Package"):
-            scorm_word = save_as_scorm_word(st.session_state.generated_response, file_name="response.docx")
-            if scorm_word:
-                st.success("SCORM Word package generated successfully!")
-                st.download_button(
-                    label="Download SCORM Word Package",
-                    data=scorm_word,
-                    file_name="scorm_word_package.zip",
-                    mime="application/zip",
-                )
-            else:
-                st.error("Failed to generate SCORM Word package.")
+        # Buttons to download the response as SCORM PDF and SCORM Word packages
+        if st.session_state.generated_response:
+            show_export_downloads(st.session_state.generated_response, {
+                "scorm_pdf": ("Download the PDF as SCORM Package", "scorm_package.zip"),
+                "scorm_word": ("Download the Word File as SCORM Package", "scorm_word_package.zip"),
+            })
+            add_to_course_button("content", query or domain, st.session_state.generated_response, domain, query)
 
     # Horizontal line
     st.markdown("---")
@@ -571,6 +192,10 @@ elif selected_section == "Content Generation":
     st.caption("Developed by **Corbin Technology Solutions**")
 
 elif selected_section == "PDF Analysis":
+    from generation import pdf_prompt, stream_gpt_response_pdf, summarize_large_pdf
+    from pdf_tools import extract_text_from_pdf_cached
+    from retrieval import retrieve_context
+    from summarize import is_summary_request, needs_map_reduce
     
     # Horizontal line
     st.markdown("---")
@@ -584,8 +209,13 @@ elif selected_section == "PDF Analysis":
     response = ""
 
     if pdf_file:
-        with io.BytesIO(pdf_file.read()) as pdf_stream:
-            extracted_text = extract_text_from_pdf(pdf_stream)
+        # Pages are cached by the hash of the upload, so reruns skip parsing entirely
+        progress_bar = st.empty()
+        extracted_text = extract_text_from_pdf_cached(
+            pdf_file.getvalue(),
+            progress=lambda done, total: progress_bar.progress(done / total, text=f"Extracted {done} of {total} pages"),
+        )
+        progress_bar.empty()
 
         # Show Extracted Text
         st.write("Extracted Text:")
@@ -595,21 +225,31 @@ elif selected_section == "PDF Analysis":
         query = st.text_input("Ask a question based on the PDF:")
         
         if query:
-            # Only answer questions related to the uploaded PDF
-            full_prompt = (
-                "You are an expert in analyzing PDFs and providing highlights, summaries, analyses, and insights. "
-                "Only answer questions based strictly on the content of the uploaded PDF. "
-                "Do not answer any questions that are unrelated or outside the scope of the PDF.\n\n"
-                f"PDF Content: {extracted_text}\n\n"
-                f"Question: {query}"
-            )
+            st.subheader("Response")
 
-            # Get response
-            response = fetch_gpt_response_pdf(full_prompt)
+            if needs_map_reduce(extracted_text, query):
+                # The document is too large for one prompt: summarize it in parts and merge the results
+                progress_bar = st.progress(0.0, text="Summarizing the document...")
+                response = summarize_large_pdf(
+                    extracted_text,
+                    query,
+                    progress=lambda done, total, stage: progress_bar.progress(done / total, text=f"{stage}: {done} of {total}"),
+                )
+                progress_bar.empty()
+                st.write(response)
+            else:
+                # A summary that fits in one prompt gets the whole document; other questions only the most relevant chunks
+                if is_summary_request(query):
+                    pdf_context = extracted_text
+                else:
+                    pdf_context = retrieve_context(extracted_text, query)
 
-            # Display the response
-            st.subheader("Response")
-            st.write(response)
+                # Only answer questions related to the uploaded PDF
+                full_prompt = pdf_prompt(pdf_context, query)
+
+                # Stream the response while it is generated and keep the full text for the exports
+                response = st.write_stream(stream_gpt_response_pdf(full_prompt))
+            st.session_state.generated_response = response
 
             # Horizontal line
             st.markdown("---")
@@ -617,23 +257,11 @@ elif selected_section == "PDF Analysis":
             # Download Options
             st.subheader("Download Options")
 
-            if st.button("Generate the Response as PDF SCORM Package"):
-                save_as_scorm_pdf(response)
-                st.success("SCORM package generated. Check the 'Download SCORM Package' button.")
-
-            if st.button("Generate the Response as Word SCORM Package"):
-                scorm_word = save_as_scorm_word(response, file_name="response.docx")
-
-                if scorm_word:
-                    st.success("SCORM package generated. Click the 'Download SCORM Package' button below.")
-                    st.download_button(
-                        label="Download SCORM Word Package",
-                        data=scorm_word,
-                        file_name="scorm_word_package.zip",
-                        mime="application/zip"
-                    )
-                else:
-                    st.error("Failed to generate SCORM Word package.")
+            show_export_downloads(response, {
+                "scorm_pdf": ("Download the Response as PDF SCORM Package", "scorm_package.zip"),
+                "scorm_word": ("Download the Response as Word SCORM Package", "scorm_word_package.zip"),
+            })
+            add_to_course_button("pdf-qa", query, response, query=query)
 
     else:
         st.info("Please upload a PDF file to begin analysis.")
@@ -646,6 +274,11 @@ elif selected_section == "PDF Analysis":
     
 # Streamlit Section to Handle User Input and SCORM Package Generation
 elif selected_section == "CSV Content Generation":
+    from csv_tools import CSVStreamParser, parse_csv_text
+    from dataset_builder import DATASET_MAX_ROWS, DATASET_SHARD_ROWS, build_dataset
+    from generation import stream_gpt_response_csv
+    from llm import strip_code_fence
+
     # Horizontal line
     st.markdown("---")
 
@@ -668,46 +301,133 @@ elif selected_section == "CSV Content Generation":
             placeholder=f"Enter any query related to the {domain} domain",
         )
 
-        if query:
+        dataset_size = st.radio("Dataset size:", ["Preview (15–20 rows)", "Large dataset"], horizontal=True)
+
+        if query and dataset_size != "Large dataset":
+            st.subheader("CSV Data Preview")
+            table = st.empty()
+
             # Check if a new query has been entered
             if query != st.session_state.get("last_query"):
-                # Fetch response and store in session state
-                st.session_state.generated_response = fetch_gpt_response(domain, query)
+                # Parse rows as tokens arrive and grow the table with them
+                parser = CSVStreamParser()
+                parts = []
+                last_refresh = 0.0
+                reuse = {}
+                for token in stream_gpt_response_csv(domain, query, reuse):
+                    parts.append(token)
+                    if parser.feed(token) and time.perf_counter() - last_refresh > CSV_REFRESH_SECONDS:
+                        table.dataframe(parser.columns())
+                        last_refresh = time.perf_counter()
+                parser.close()
+                # The table skips a ``` fence around the CSV; the downloads must not carry it either
+                st.session_state.generated_response = strip_code_fence("".join(parts))
                 st.session_state.last_query = query  # Update last query
+                show_reuse_notice(reuse)
+            else:
+                parser = parse_csv_text(st.session_state.generated_response or "")
 
-            # Convert response to CSV format and display
             csv_data = st.session_state.generated_response
-            df = csv_to_dataframe(csv_data)
 
-            if df is not None:
-                st.subheader("CSV Data Preview")
-                st.dataframe(df)  # Display CSV as table
+            if csv_data and not csv_data.startswith("Error:") and parser.rows:
+                table.dataframe(parser.columns())  # Display CSV as table
+
+                # Rows that don't match the header are set aside instead of rejecting the response
+                if parser.quarantined:
+                    with st.expander(f"⚠ {len(parser.quarantined)} malformed row(s) left out of the table"):
+                        st.code("\n".join(f"line {line_number}: {text}  ({reason})" for line_number, text, reason in parser.quarantined))
 
                 # Horizontal line before download options
                 st.markdown("---")
 
-                # Provide a button to download the CSV file
-                csv_buffer = io.StringIO()
-                df.to_csv(csv_buffer, index=False)
+                # Provide a button to download the CSV file exactly as generated
                 st.download_button(
                     label="Download CSV File",
-                    data=csv_buffer.getvalue(),
+                    data=csv_data.encode("utf-8"),
                     file_name=f"{domain.lower().replace(' ', '_')}_data.csv",
                     mime="text/csv"
                 )
 
-                # Button to generate and download the CSV as a SCORM package
-                if st.button("Generate SCORM Package"):
-                    scorm_package = create_scorm_package(csv_data, domain, query)
-                    st.download_button(
-                        label="Download CSV File as SCORM Package",
-                        data=scorm_package.getvalue(),
-                        file_name=f"{domain.lower().replace(' ', '_')}_scorm.zip",
-                        mime="application/zip"
-                    )
+                # Button to download the CSV as a SCORM package
+                show_export_downloads(csv_data, {
+                    "scorm_csv": ("Download CSV File as SCORM Package", f"{domain.lower().replace(' ', '_')}_scorm.zip"),
+                }, domain, query)
+                add_to_course_button("csv", query, csv_data, domain, query)
             else:
+                table.empty()
                 st.warning("⚠ The generated response is not in a valid CSV format.")
 
+        elif query:
+            rows = st.number_input(
+                "Number of rows:",
+                min_value=min(DATASET_SHARD_ROWS, DATASET_MAX_ROWS),
+                max_value=DATASET_MAX_ROWS,
+                value=min(1000, DATASET_MAX_ROWS),
+                step=DATASET_SHARD_ROWS,
+            )
+            dataset_key = (domain, query, rows)
+
+            # Large datasets are generated in shards on demand, not on every rerun
+            if st.button("Generate dataset"):
+                progress_bar = st.progress(0.0, text="Designing the columns...")
+                files = {"csv": io.BytesIO(), "parquet": io.BytesIO(), "arrow": io.BytesIO()}
+                try:
+                    summary = build_dataset(
+                        domain, query, rows, files["csv"], files["parquet"], files["arrow"],
+                        progress=lambda done, total: progress_bar.progress(done / total, text=f"{done} of {total} rows"),
+                    )
+                    st.session_state.dataset = {
+                        "key": dataset_key,
+                        "summary": summary,
+                        "files": {name: buffer.getvalue() for name, buffer in files.items()},
+                    }
+                except Exception as e:
+                    st.error(f"Error: {str(e)}")
+                progress_bar.empty()
+
+            dataset = st.session_state.get("dataset")
+            if dataset and dataset["key"] == dataset_key:
+                import pyarrow.parquet as pq
+
+                summary = dataset["summary"]
+                st.success(
+                    f"{summary['rows']} rows from {summary['shards']} requests in {summary['seconds']:.1f} s "
+                    f"({summary['duplicates']} duplicates and {summary['rejected']} invalid rows dropped)."
+                )
+                if summary["rows"] < rows:
+                    st.warning(f"⚠ Only {summary['rows']} of the {rows} requested rows could be generated.")
+
+                st.subheader("Columns")
+                st.dataframe({
+                    "Column": [column["name"] for column in summary["schema"]["columns"]],
+                    "Type": [column["type"] for column in summary["schema"]["columns"]],
+                    "Key": [column["name"] in summary["schema"]["key"] for column in summary["schema"]["columns"]],
+                })
+                if summary["rows"]:
+                    st.subheader("First rows")
+                    st.dataframe(pq.ParquetFile(io.BytesIO(dataset["files"]["parquet"])).read_row_group(0).slice(0, 20))
+
+                # Horizontal line before download options
+                st.markdown("---")
+
+                file_stem = domain.lower().replace(' ', '_')
+                st.download_button("Download CSV File", dataset["files"]["csv"], f"{file_stem}_data.csv", "text/csv")
+                st.download_button(
+                    "Download Parquet File", dataset["files"]["parquet"], f"{file_stem}_data.parquet",
+                    "application/vnd.apache.parquet",
+                )
+                st.download_button(
+                    "Download Arrow File", dataset["files"]["arrow"], f"{file_stem}_data.arrow",
+                    "application/vnd.apache.arrow.file",
+                )
+
+                # The lesson page shows the first rows; the full CSV and Parquet files are attached
+                from course_builder import csv_preview
+
+                add_to_course_button("dataset", query, csv_preview(dataset["files"]["csv"]), domain, query, {
+                    "data.csv": dataset["files"]["csv"], "data.parquet": dataset["files"]["parquet"],
+                })
+
     # Horizontal line
     st.markdown("---")
 
@@ -716,6 +436,8 @@ elif selected_section == "CSV Content Generation":
 
 # Research Search Section
 elif selected_section == "Research Search":
+    from research import iter_search_google, rank_research_results, search_cache_stats
+
     st.markdown("---")
     st.header("🔬 Research Search")
 
@@ -726,20 +448,24 @@ elif selected_section == "Research Search":
     )
 
     if query:
-        search_results = google_custom_search(query)
+        # Re-rank everything received so far as each page of the concurrent requests completes
+        results = st.empty()
+        search_items = []
         relevant_content = []
-        for item in search_results.get("items", []):
-            title = item.get("title", "")
-            snippet = item.get("snippet", "")
-            if any(keyword in title.lower() or keyword in snippet.lower() for keyword in RESEARCH_KEYWORDS):
-                relevant_content.append({"title": title, "link": item.get("link", ""), "snippet": snippet})
-        if relevant_content:
-            st.write("**Research Results:**")
-            for content in relevant_content:
-                st.write(f"- **[{content['title']}]({content['link']})**")
-                st.write(content["snippet"])
-        else:
-            st.write("No relevant research-related content found.")
+        for items in iter_search_google(query, google_api_key, custom_search_engine_id):
+            search_items.extend(items)
+            relevant_content = rank_research_results(query, search_items)
+            with results.container():
+                if relevant_content:
+                    st.write("**Research Results:**")
+                for content in relevant_content:
+                    st.write(f"- **[{content['title']}]({content['link']})** · {content['domain']}")
+                    st.write(content["snippet"])
+        if not relevant_content:
+            results.write("No relevant research-related content found.")
+
+        cache_stats = search_cache_stats()["memory"]
+        st.caption(f"Search cache hit rate: {cache_stats['hit_rate']:.0%} ({cache_stats['hits']} of {cache_stats['hits'] + cache_stats['misses']} lookups)")
      # Horizontal line
     st.markdown("---")
 
@@ -749,6 +475,8 @@ elif selected_section == "Research Search":
 
 # Streamlit Integration for PPT Generation
 elif selected_section == "PPT Development":
+    from ppt_builder import build_presentation, deck_text
+
     st.markdown("---")
     st.header("📊 PPT Content Generation")
 
@@ -769,23 +497,98 @@ elif selected_section == "PPT Development":
     # Step 3: Generate and preview content before PPT download
     if st.button("Generate PPT"):
       if domain and topic:
-        st.info("Generating detailed content for your presentation. Please wait...")
-        detailed_content = generate_detailed_ppt_content(domain, topic)
+        progress_bar = st.progress(0.0, text="Planning the slides...")
+        try:
+            deck, slides = build_presentation(
+                domain, topic,
+                progress=lambda done, total: progress_bar.progress(done / total, text=f"{done} of {total} slides written"),
+            )
+            st.session_state.presentation = {"key": (domain, topic), "deck": deck, "slides": slides}
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
+        progress_bar.empty()
+      else:
+        st.warning("Please enter both domain and topic before generating the presentation.")
 
-        if "Error" not in detailed_content:
+    # The deck stays available across reruns, e.g. the one triggered by the download button
+    presentation = st.session_state.get("presentation")
+    if presentation and presentation["key"] == (domain, topic):
+        failed = [slide["title"] for slide in presentation["slides"] if slide["error"]]
+        if failed:
+            st.warning(f"⚠ These slides could not be generated: {', '.join(failed)}")
+        else:
             st.success("PowerPoint presentation generated successfully!")
 
-            # Download button (fix: add 'data' parameter)
+        with st.expander("Preview slide content"):
+            st.markdown(deck_text(presentation["slides"]))
+
+        st.download_button(
+            label="📥 Download Your PPT",
+            data=presentation["deck"],
+            file_name=f"{domain}_{topic}.pptx",
+            mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+        )
+        add_to_course_button("ppt", topic, deck_text(presentation["slides"]), domain, topic, {
+            "presentation.pptx": presentation["deck"],
+        })
+
+    # Horizontal line
+    st.markdown("---")
+
+    # Footer
+    st.caption("Developed by **Corbin Technology Solutions**")
+
+
+elif selected_section == "Course Builder":
+    from course_builder import COURSE_MAX_ITEMS, build_course_package
+
+    st.markdown("---")
+    st.header("🎓 Course Builder")
+
+    course = st.session_state.setdefault("course_items", [])
+    if not course:
+        st.info("Use the **➕ Add to course** button under a generated result, PDF answer, CSV, dataset or presentation to add it to the course.")
+    else:
+        course_title = st.text_input("Course title:", value="Generated Course")
+        st.caption(f"{len(course)} of at most {COURSE_MAX_ITEMS} items. Items sharing a module name are grouped under it.")
+
+        for index, item in enumerate(course):
+            title_column, module_column, remove_column = st.columns([6, 3, 1])
+            item["title"] = title_column.text_input(f"{index + 1}. {item['kind']}", item["title"], key=f"course_title_{item['id']}")
+            item["module"] = module_column.text_input("Module", item["module"], key=f"course_module_{item['id']}")
+            if remove_column.button("🗑", key=f"course_remove_{item['id']}"):
+                course.pop(index)
+                st.rerun()
+
+        # A package built for an earlier title, outline or item list is not offered
+        course_key = (course_title, [(item["id"], item["title"], item["module"]) for item in course])
+        if st.button("Build course package"):
+            progress_bar = st.progress(0.0, text="Rendering the lessons...")
+            try:
+                st.session_state.course_package = {
+                    "key": course_key,
+                    "data": build_course_package(
+                        course_title, course,
+                        progress=lambda done, total: progress_bar.progress(done / total, text=f"{done} of {total} lessons rendered"),
+                    ),
+                }
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
+            progress_bar.empty()
+
+        course_package = st.session_state.get("course_package")
+        if course_package and course_package["key"] == course_key:
+            st.success(f"Course package built: {len(course)} lessons, {len(course_package['data']) / 1024:.0f} KiB.")
             st.download_button(
-                label="📥 Download Your PPT",
-                data=detailed_content,  # <-- This is the required parameter
-                file_name=f"{domain}_{topic}.pptx",
-                mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                "Download Course as SCORM Package",
+                course_package["data"],
+                f"{course_title.lower().replace(' ', '_')}_scorm_course.zip",
+                "application/zip",
             )
-        else:
-            st.error(detailed_content)
-      else:
-        st.warning("Please enter both domain and topic before generating the presentation.")
+
+        if st.button("Clear course"):
+            course.clear()
+            st.rerun()
 
     # Horizontal line
     st.markdown("---")
@@ -863,6 +666,16 @@ elif selected_section == "Instructions":
           3. Download the generated **PPT** file using the download button.
         """)
 
+    # Course Builder Instructions
+    with st.expander("6️⃣ **Course Builder**"):
+        st.markdown("""
+        - Package many generated results into one SCORM course with a lesson per result.
+        - **Steps**:
+          1. Click **➕ Add to course** under any response, PDF answer, CSV, dataset or presentation.
+          2. Open **Course Builder**, set the course title and, optionally, a **module** name per lesson to group lessons.
+          3. Click **Build course package** and download the SCORM course.
+        """)
+
     # Footer Success Message
     st.success("Refer to these instructions for smooth navigation and utilization of all features!")
     # Horizontal line
@@ -900,3 +713,25 @@ elif selected_section == "Credits":
 
     # Footer Message
     st.success("We appreciate your support and feedback to enhance this application!")
+
+# Metrics Section (admins only)
+elif selected_section == "Metrics":
+    st.markdown("---")
+    st.header("📈 Metrics")
+    st.caption("Recorded by this server process since it started. Times are in seconds; p50/p95 are bucket upper bounds.")
+
+    if st.button("Refresh"):
+        st.rerun()
+
+    for metric in metrics.registry.metrics:
+        rows = metric.snapshot()
+        if not rows:
+            continue
+        st.subheader(metric.name)
+        st.caption(metric.documentation)
+        st.dataframe(rows)
+
+    exposition = metrics.registry.render()
+    with st.expander("Prometheus text format"):
+        st.code(exposition, language="text")
+    st.download_button("Download metrics", exposition, "metrics.prom", "text/plain")
@@ -0,0 +1,165 @@
+"""OpenAI chat completions with a shared response cache, rate limiting and retries."""
+import logging
+import os
+import time
+
+import openai
+
+from cache import SQLiteCache, make_key
+from metrics import (
+    LLM_CACHE_LOOKUPS,
+    OPENAI_REQUEST_SECONDS,
+    OPENAI_RETRIES,
+    OPENAI_STREAM_SECONDS,
+    OPENAI_TIME_TO_FIRST_TOKEN_SECONDS,
+    OPENAI_TOKENS,
+)
+from rate_limit import backoff_delay, openai_limiter
+
+# Retries are handled here, with backoff shared across threads, instead of by the SDK
+openai.max_retries = 0
+OPENAI_MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", 5))
+# Completion tokens assumed when a call sets no max_tokens, for rate limiting only
+EXPECTED_COMPLETION_TOKENS = 1000
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+# Response cache settings; set LLM_CACHE_PATH to an empty string to disable it
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", os.path.join(".cache", "llm_responses.sqlite3"))
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 10000))
+
+logger = logging.getLogger(__name__)
+
+response_cache = (
+    SQLiteCache(LLM_CACHE_PATH, table="llm_responses", ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES)
+    if LLM_CACHE_PATH
+    else None
+)
+
+
+# Function to roughly estimate the token count of a text (about four characters per token)
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+# Function to remove a Markdown code fence the model may wrap around JSON or CSV answers
+def strip_code_fence(text):
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return text.strip()
+
+
+# Function to count the tokens reported in a response's usage block
+def record_usage(model, usage):
+    if usage is None:
+        return
+    OPENAI_TOKENS.inc(usage.prompt_tokens or 0, model=model, type="prompt")
+    OPENAI_TOKENS.inc(usage.completion_tokens or 0, model=model, type="completion")
+
+
+# Function to call the chat completions API within the rate limits, retrying transient failures
+def create_completion(model, messages, **params):
+    """Call ``openai.chat.completions.create`` through the process-wide limiter.
+
+    Rate limit (429), connection and 5xx errors are retried up to
+    ``OPENAI_MAX_RETRIES`` times with jittered exponential backoff that
+    honours ``Retry-After``. The ``x-ratelimit-*`` headers of every
+    response are fed back to the limiter.
+    """
+    estimated_tokens = estimate_tokens("".join(str(message.get("content", "")) for message in messages))
+    estimated_tokens += params.get("max_tokens") or EXPECTED_COMPLETION_TOKENS
+    for attempt in range(OPENAI_MAX_RETRIES + 1):
+        openai_limiter.acquire(model, estimated_tokens)
+        started = time.perf_counter()
+        try:
+            raw_response = openai.chat.completions.with_raw_response.create(model=model, messages=messages, **params)
+        except RETRYABLE_ERRORS as e:
+            OPENAI_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model, outcome=e.__class__.__name__)
+            response = getattr(e, "response", None)
+            headers = response.headers if response is not None else None
+            openai_limiter.update(model, headers)
+            if isinstance(e, openai.RateLimitError):
+                openai_limiter.penalize(model)
+            if attempt == OPENAI_MAX_RETRIES:
+                raise
+            OPENAI_RETRIES.inc(model=model, error=e.__class__.__name__)
+            delay = backoff_delay(attempt, headers)
+            logger.warning("%s call failed (%s); retry %d in %.1fs", model, e.__class__.__name__, attempt + 1, delay)
+            time.sleep(delay)
+            continue
+        except Exception as e:
+            OPENAI_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model, outcome=e.__class__.__name__)
+            raise
+        OPENAI_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model, outcome="ok")
+        openai_limiter.update(model, raw_response.headers)
+        response = raw_response.parse()
+        if not params.get("stream"):
+            record_usage(model, response.usage)
+        return response
+
+
+# Function to get a chat completion, reusing an identical earlier answer if cached
+def chat_completion(model, messages, **params):
+    key = make_key(model, messages, params)
+    if response_cache is not None:
+        cached = response_cache.get(key)
+        LLM_CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+
+    response = create_completion(model, messages, **params)
+    content = response.choices[0].message.content
+    if response_cache is not None and content:
+        response_cache.set(key, content)
+    return content
+
+
+# Function to stream a chat completion token by token
+def stream_chat_completion(model, messages, **params):
+    """Yield the completion text as it arrives from the API.
+
+    A cached answer is yielded in one piece. Otherwise the chunks are
+    collected and the full text is cached once the stream finishes.
+    Time-to-first-token and total latency are logged and recorded in
+    the metrics for every call.
+    """
+    key = make_key(model, messages, params)
+    if response_cache is not None:
+        cached = response_cache.get(key)
+        LLM_CACHE_LOOKUPS.inc(result="miss" if cached is None else "hit")
+        if cached is not None:
+            yield cached
+            return
+
+    started = time.perf_counter()
+    first_token_at = None
+    parts = []
+    # The final chunk then carries the token usage, which streams otherwise omit
+    stream = create_completion(model, messages, stream=True, stream_options={"include_usage": True}, **params)
+    for chunk in stream:
+        if not chunk.choices:
+            record_usage(model, chunk.usage)
+            continue
+        token = chunk.choices[0].delta.content
+        if not token:
+            continue
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+        parts.append(token)
+        yield token
+
+    finished = time.perf_counter()
+    OPENAI_TIME_TO_FIRST_TOKEN_SECONDS.observe((first_token_at or finished) - started, model=model)
+    OPENAI_STREAM_SECONDS.observe(finished - started, model=model)
+    logger.info(
+        "streamed %s completion: time to first token %.3fs, total %.3fs",
+        model,
+        (first_token_at or finished) - started,
+        finished - started,
+    )
+    content = "".join(parts)
+    if response_cache is not None and content:
+        response_cache.set(key, content)
@@ -0,0 +1,289 @@
+"""In-process latency and usage metrics, exported in the Prometheus text format.
+
+Every stage records into the histograms and counters defined at the bottom
+of this module. Metrics labelled by ``section`` pick up the section of the
+app (or batch job kind) currently running, set with ``set_section``; work
+handed to thread pools keeps that label when submitted through ``submit``.
+
+Exposition is opt-in through environment variables:
+
+- ``METRICS_PORT``: serve ``/metrics`` on ``METRICS_HOST`` (default 127.0.0.1)
+- ``METRICS_DUMP_PATH``: rewrite that file every ``METRICS_DUMP_INTERVAL`` seconds
+"""
+import bisect
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+METRICS_DUMP_PATH = os.environ.get("METRICS_DUMP_PATH", "")
+METRICS_DUMP_INTERVAL = float(os.environ.get("METRICS_DUMP_INTERVAL", 60))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+logger = logging.getLogger(__name__)
+
+_section = contextvars.ContextVar("metrics_section", default="none")
+
+
+# Function to set the section label used by metrics recorded from the current thread or task
+def set_section(name):
+    _section.set(name)
+
+
+# Function to submit work to an executor so the metrics it records keep the caller's section
+def submit(executor, fn, *args, **kwargs):
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if "section" in self.labelnames and "section" not in labels:
+            labels = dict(labels, section=_section.get())
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        family = self.name + "_total" if self.kind == "counter" else self.name
+        lines = [f"# HELP {family} {self.documentation}", f"# TYPE {family} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_value(list(zip(self.labelnames, key)), value) for key, value in items)
+        return "\n".join(line for line in lines if line)
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_value(self, pairs, value):
+        return f"{self.name}_total{_format_labels(pairs)} {_format_number(value)}"
+
+    def snapshot(self):
+        with self._lock:
+            return [dict(zip(self.labelnames, key), value=value) for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """Observation counts per bucket, plus their sum and count, per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Observe the duration of the ``with`` block, labelled ``outcome="error"`` if it raises."""
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            if "outcome" in self.labelnames and "outcome" not in labels:
+                labels = dict(labels, outcome=outcome)
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_value(self, pairs, state):
+        lines = []
+        cumulative = 0
+        for upper, count in zip(self.buckets, state[0]):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', _format_number(upper))])} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_number(state[1])}")
+        lines.append(f"{self.name}_count{_format_labels(pairs)} {state[2]}")
+        return "\n".join(lines)
+
+    def _quantile(self, counts, total, q):
+        # Upper bound of the bucket holding the q-th observation, as Prometheus' histogram_quantile would bound it
+        rank = q * total
+        cumulative = 0
+        for upper, count in zip(self.buckets, counts):
+            cumulative += count
+            if cumulative >= rank:
+                return upper
+        return self.buckets[-1]
+
+    def snapshot(self):
+        rows = []
+        with self._lock:
+            for key, (counts, total_seconds, count) in sorted(self._values.items()):
+                rows.append(dict(
+                    zip(self.labelnames, key),
+                    count=count,
+                    mean=total_seconds / count,
+                    p50_le=self._quantile(counts, count, 0.5),
+                    p95_le=self._quantile(counts, count, 0.95),
+                ))
+        return rows
+
+
+class MetricsRegistry:
+    """The process-wide set of metrics, rendered together for exposition."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics endpoint: " + format, *args)
+
+
+_exporters_lock = threading.Lock()
+_exporters_started = False
+
+
+# Function to write the current metrics to a file, replacing it atomically
+def dump_metrics(path=None):
+    path = path or METRICS_DUMP_PATH
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = path + ".part"
+    with open(temporary_path, "w", encoding="utf-8") as metrics_file:
+        metrics_file.write(registry.render())
+    os.replace(temporary_path, path)
+
+
+def _dump_periodically():
+    while True:
+        time.sleep(METRICS_DUMP_INTERVAL)
+        try:
+            dump_metrics()
+        except OSError as e:
+            logger.warning("Could not write metrics to %s: %s", METRICS_DUMP_PATH, e)
+
+
+# Function to start the configured metrics endpoint and file dump once per process
+def start_exporters():
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+        if METRICS_PORT:
+            try:
+                server = ThreadingHTTPServer((METRICS_HOST, METRICS_PORT), _MetricsHandler)
+            except OSError as e:
+                logger.warning("Metrics endpoint not started on %s:%d: %s", METRICS_HOST, METRICS_PORT, e)
+            else:
+                threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+                logger.info("Serving metrics on http://%s:%d/metrics", METRICS_HOST, METRICS_PORT)
+        if METRICS_DUMP_PATH:
+            threading.Thread(target=_dump_periodically, name="metrics-dump", daemon=True).start()
+
+
+# Stage metrics recorded across the app
+OPENAI_REQUEST_SECONDS = registry.histogram(
+    "openai_request_seconds",
+    "OpenAI API call latency per attempt (to the response headers for streams)",
+    ["section", "model", "outcome"],
+)
+OPENAI_STREAM_SECONDS = registry.histogram(
+    "openai_stream_seconds", "Total duration of streamed OpenAI completions", ["section", "model"]
+)
+OPENAI_TIME_TO_FIRST_TOKEN_SECONDS = registry.histogram(
+    "openai_time_to_first_token_seconds", "Time to the first streamed token", ["section", "model"]
+)
+OPENAI_TOKENS = registry.counter(
+    "openai_tokens", "Tokens reported in response.usage", ["section", "model", "type"]
+)
+OPENAI_RETRIES = registry.counter("openai_retries", "OpenAI calls retried after a transient error", ["model", "error"])
+LLM_CACHE_LOOKUPS = registry.counter("llm_cache_lookups", "Response cache lookups", ["section", "result"])
+QUERY_REUSE_LOOKUPS = registry.counter(
+    "query_reuse_lookups", "Lookups of a similar answered question before generating (reused or new)", ["section", "kind", "result"]
+)
+GOOGLE_SEARCH_SECONDS = registry.histogram(
+    "google_search_seconds", "Google Custom Search page request latency", ["section", "outcome"]
+)
+PDF_EXTRACTION_SECONDS = registry.histogram(
+    "pdf_extraction_seconds", "PDF text extraction time per document", ["section"]
+)
+PDF_PAGES_EXTRACTED = registry.counter(
+    "pdf_pages_extracted", "PDF pages extracted (pages served from the cache are not counted)", ["section"]
+)
+DOCUMENT_RENDER_SECONDS = registry.histogram(
+    "document_render_seconds", "PDF (FPDF) and Word (python-docx) rendering time", ["section", "format"]
+)
+ZIP_BUILD_SECONDS = registry.histogram("zip_build_seconds", "SCORM zip packaging time", ["section", "package"])
+EXPORT_SECONDS = registry.histogram(
+    "export_seconds", "Time to produce an export format, rendering and packaging included", ["section", "format"]
+)
@@ -0,0 +1,177 @@
+"""PDF text extraction for the PDF Analysis section."""
+import hashlib
+import io
+import multiprocessing
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import PyPDF2
+
+from metrics import PDF_EXTRACTION_SECONDS, PDF_PAGES_EXTRACTED
+
+# Upper bound on extracted text held in memory across all cached documents
+PDF_CACHE_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Parallel extraction settings: documents with fewer pages left are read serially
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", 48))
+PDF_PAGES_PER_TASK = int(os.environ.get("PDF_PAGES_PER_TASK", 16))
+
+# Workers are spawned rather than forked: the Streamlit server is multi-threaded
+_mp_context = multiprocessing.get_context("spawn")
+
+
+# Function to extract text from PDF
+def extract_text_from_pdf(pdf_file):
+    pdf_reader = PyPDF2.PdfReader(pdf_file)
+    return "".join(page.extract_text() for page in pdf_reader.pages)
+
+
+# Each pool worker parses the shared PDF bytes once and then serves page ranges
+_worker_reader = None
+
+
+def _init_worker(pdf_bytes):
+    global _worker_reader
+    _worker_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+
+
+def _extract_page_range(start, stop):
+    return start, [_worker_reader.pages[index].extract_text() for index in range(start, stop)]
+
+
+# Function to extract page ranges in a process pool, yielding each range as it finishes
+def iter_page_ranges(pdf_bytes, start=0, stop=None, workers=PDF_WORKERS):
+    """Yield ``(first_page_index, [page_text, ...])`` for pages ``start..stop``.
+
+    Ranges of ``PDF_PAGES_PER_TASK`` pages are spread over a process pool
+    whose workers each open the PDF from the same bytes. Ranges arrive in
+    completion order, not page order. Small jobs run in this process.
+    """
+    if stop is None:
+        stop = len(PyPDF2.PdfReader(io.BytesIO(pdf_bytes)).pages)
+    if workers <= 1 or stop - start < PDF_PARALLEL_MIN_PAGES:
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+        for index in range(start, stop):
+            yield index, [pdf_reader.pages[index].extract_text()]
+        return
+
+    tasks = range(start, stop, PDF_PAGES_PER_TASK)
+    pool = ProcessPoolExecutor(
+        max_workers=min(workers, len(tasks)),
+        mp_context=_mp_context,
+        initializer=_init_worker,
+        initargs=(pdf_bytes,),
+    )
+    try:
+        futures = [pool.submit(_extract_page_range, first, min(first + PDF_PAGES_PER_TASK, stop)) for first in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # Don't block a rerun that abandoned the generator on the remaining ranges
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Function to extract all text from PDF bytes using the process pool
+def extract_text_parallel(pdf_bytes, workers=PDF_WORKERS):
+    page_count = len(PyPDF2.PdfReader(io.BytesIO(pdf_bytes)).pages)
+    pages = [""] * page_count
+    for first, texts in iter_page_ranges(pdf_bytes, 0, page_count, workers):
+        pages[first:first + len(texts)] = texts
+    return "".join(pages)
+
+
+class _Document:
+    def __init__(self):
+        self.pages = []
+        self.page_count = None
+        self.size = 0
+        self.lock = threading.Lock()
+
+
+class PDFTextCache:
+    """Per-page extracted text keyed by the SHA-256 of the PDF bytes.
+
+    Pages are stored as soon as they are extracted, so a document whose
+    extraction was interrupted (e.g. by a Streamlit rerun) resumes from the
+    first missing page. When the stored text exceeds ``max_bytes`` whole
+    documents are evicted in least recently used order.
+    """
+
+    def __init__(self, max_bytes=PDF_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._documents = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _document(self, key):
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None:
+                document = self._documents[key] = _Document()
+            self._documents.move_to_end(key)
+            return document
+
+    def _grow(self, key, document, size):
+        with self._lock:
+            document.size += size
+            if self._documents.get(key) is document:
+                self._size += size
+            while self._size > self.max_bytes and len(self._documents) > 1:
+                evicted_key, evicted = self._documents.popitem(last=False)
+                if evicted_key == key:
+                    # Never evict the document being read; re-insert it at the most recently used end
+                    self._documents[key] = evicted
+                    continue
+                self._size -= evicted.size
+
+    def iter_pages(self, pdf_bytes, progress=None):
+        """Yield the text of every page in order, extracting only pages not yet cached.
+
+        ``progress(done, total)`` is called whenever newly extracted pages
+        arrive, which with the process pool may be out of page order.
+        """
+        key = hashlib.sha256(pdf_bytes).hexdigest()
+        document = self._document(key)
+        with document.lock:
+            yield from document.pages
+            if document.page_count is not None and len(document.pages) == document.page_count:
+                return
+            if document.page_count is None:
+                document.page_count = len(PyPDF2.PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+            # Ranges can finish out of order; only the contiguous prefix is cached and yielded
+            pending = {}
+            done = len(document.pages)
+            for first, texts in iter_page_ranges(pdf_bytes, done, document.page_count):
+                pending.update(zip(range(first, first + len(texts)), texts))
+                PDF_PAGES_EXTRACTED.inc(len(texts))
+                done += len(texts)
+                if progress is not None:
+                    progress(done, document.page_count)
+                ready = []
+                while len(document.pages) in pending:
+                    text = pending.pop(len(document.pages))
+                    document.pages.append(text)
+                    self._grow(key, document, sys.getsizeof(text))
+                    ready.append(text)
+                yield from ready
+
+    def extract_text(self, pdf_bytes, progress=None):
+        return "".join(self.iter_pages(pdf_bytes, progress))
+
+    def stats(self):
+        with self._lock:
+            return {"documents": len(self._documents), "bytes": self._size}
+
+
+pdf_text_cache = PDFTextCache()
+
+
+# Function to extract text from PDF bytes, reusing pages extracted on earlier reruns
+def extract_text_from_pdf_cached(pdf_bytes, progress=None):
+    with PDF_EXTRACTION_SECONDS.time():
+        return pdf_text_cache.extract_text(pdf_bytes, progress)
@@ -0,0 +1,143 @@
+"""PowerPoint decks built from a slide outline and concurrent per-slide completions.
+
+One call returns the outline (slide titles and what each should cover).
+The title and body placeholders of every slide are laid out at once, in
+order, then each slide's bullets are requested concurrently and written
+into the in-memory Presentation as they complete. The whole deck takes
+about as long as the outline plus the slowest slide, not the sum of all
+slides.
+"""
+import io
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from asset_registry import new_presentation
+from llm import chat_completion, strip_code_fence
+from metrics import submit
+
+PPT_MODEL = "gpt-4"
+PPT_WORKERS = int(os.environ.get("PPT_WORKERS", 8))
+PPT_MAX_SLIDES = 12
+
+BULLET_PREFIX = re.compile(r"^\s*(?:[-*•–]|\d+[.)])\s*")
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=PPT_WORKERS, thread_name_prefix="ppt")
+
+
+class PresentationError(Exception):
+    """The deck cannot be generated, e.g. because no usable outline came back."""
+
+
+def _system_message(domain):
+    return {"role": "system", "content": f"You are a domain expert in {domain}."}
+
+
+# Function to get the slide outline of a presentation as a list of {"title", "focus"} dicts
+def generate_slide_outline(domain, topic):
+    prompt = (
+        f"You are an expert in the {domain} domain. Plan a professional, formal PowerPoint presentation on the topic: '{topic}'.\n\n"
+        f"Instructions:\n"
+        f"1. All content must be specific to the {domain} domain and based on the topic '{topic}'.\n"
+        f"2. Structure should include:\n"
+        f"   - Introduction Slide (Definition and importance of the topic)\n"
+        f"   - 4–6 Key Point Slides\n"
+        f"   - Case Studies/Examples Slide (with real-world relevance to the domain)\n"
+        f"   - Conclusion Slide (with summary/future direction)\n"
+        f"3. Do not include the title slide.\n\n"
+        f'Answer with JSON only, in exactly this form: {{"slides": [{{"title": "...", "focus": "what the slide must cover"}}]}}'
+    )
+    answer = chat_completion(model=PPT_MODEL, messages=[_system_message(domain), {"role": "user", "content": prompt}])
+    try:
+        slides = [
+            {"title": str(slide["title"]).strip(), "focus": str(slide.get("focus", "")).strip()}
+            for slide in json.loads(strip_code_fence(answer))["slides"]
+        ]
+    except (ValueError, KeyError, TypeError) as e:
+        raise PresentationError(f"The slide outline returned by the model is not valid JSON: {e}")
+    slides = [slide for slide in slides if slide["title"]][:PPT_MAX_SLIDES]
+    if not slides:
+        raise PresentationError("The slide outline returned by the model has no slides.")
+    return slides
+
+
+# Function to generate the bullet points of one slide of the outline
+def generate_slide_bullets(domain, topic, outline, index):
+    slide = outline[index]
+    deck_titles = "\n".join(f"{number}. {other['title']}" for number, other in enumerate(outline, 1))
+    prompt = (
+        f"You are writing slide {index + 1} of a professional, formal presentation on '{topic}' in the {domain} domain.\n\n"
+        f"The full deck is:\n{deck_titles}\n\n"
+        f"Write the slide '{slide['title']}', which must cover: {slide['focus']}\n"
+        f"Give 4 to 6 well-written bullet points, not paragraphs, one per line, without repeating other slides. "
+        f"Output only the bullet points."
+    )
+    answer = chat_completion(model=PPT_MODEL, messages=[_system_message(domain), {"role": "user", "content": prompt}])
+    bullets = [BULLET_PREFIX.sub("", line).strip() for line in strip_code_fence(answer).splitlines()]
+    return [bullet for bullet in bullets if bullet]
+
+
+def _style_text_frame(text_frame):
+    from pptx.enum.text import PP_ALIGN
+    from pptx.util import Pt
+
+    for paragraph in text_frame.paragraphs:
+        paragraph.font.name = "Calibri (Body)"
+        paragraph.font.size = Pt(20)
+        paragraph.alignment = PP_ALIGN.LEFT
+
+
+# Function to render slides as "Title:" followed by "- bullet" lines, e.g. for previews and text exports
+def deck_text(slides):
+    return "\n\n".join(
+        f"{slide['title']}:\n" + "\n".join(f"- {bullet}" for bullet in slide["bullets"]) for slide in slides
+    )
+
+
+# Function to build a complete presentation, generating the slides concurrently
+def build_presentation(domain, topic, progress=None):
+    """Return ``(pptx_bytes, slides)`` for a deck on ``topic``.
+
+    ``slides`` lists ``{"title", "focus", "bullets", "error"}`` in deck
+    order; ``error`` is set (and the slide left with a short notice) when
+    that slide's completion failed. ``progress(done, total)`` is called as
+    slides complete. Raises PresentationError if no outline came back.
+    """
+    outline = generate_slide_outline(domain, topic)
+
+    ppt = new_presentation()
+    title_slide = ppt.slides.add_slide(ppt.slide_layouts[0])
+    title_slide.shapes.title.text = topic
+    title_slide.placeholders[1].text = f"A Comprehensive Overview in {domain} Domain"
+
+    # Lay out every slide up front so slides keep the outline order whatever order they complete in
+    bodies = []
+    for slide in outline:
+        ppt_slide = ppt.slides.add_slide(ppt.slide_layouts[1])
+        ppt_slide.shapes.title.text = slide["title"]
+        bodies.append(ppt_slide.placeholders[1])
+
+    slides = [dict(slide, bullets=[], error=None) for slide in outline]
+    futures = {
+        submit(_executor, generate_slide_bullets, domain, topic, outline, index): index for index in range(len(outline))
+    }
+    # python-pptx is not thread-safe, so slides are written here as their bullets arrive
+    for done, future in enumerate(as_completed(futures), 1):
+        index = futures[future]
+        try:
+            slides[index]["bullets"] = future.result()
+        except Exception as e:
+            slides[index]["error"] = str(e)
+            logger.warning("Slide %d (%s) failed: %s", index + 1, outline[index]["title"], e)
+        bodies[index].text = "\n".join(slides[index]["bullets"]) or "Content unavailable."
+        _style_text_frame(bodies[index].text_frame)
+        if progress is not None:
+            progress(done, len(outline))
+
+    deck = io.BytesIO()
+    ppt.save(deck)
+    return deck.getvalue(), slides
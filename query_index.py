@@ -0,0 +1,193 @@
+"""Reuse of earlier answers for rephrased questions, matched by TF-IDF cosine similarity."""
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+# Similarity settings; set QUERY_REUSE_THRESHOLD above 1 to disable reuse
+QUERY_REUSE_THRESHOLD = float(os.environ.get("QUERY_REUSE_THRESHOLD", 0.85))
+QUERY_REUSE_TTL = int(os.environ.get("QUERY_REUSE_TTL", 24 * 3600))
+QUERY_REUSE_MAX_ENTRIES = int(os.environ.get("QUERY_REUSE_MAX_ENTRIES", 500))
+QUERY_REUSE_MAX_SCOPES = int(os.environ.get("QUERY_REUSE_MAX_SCOPES", 256))
+
+# Letters and digits in any script
+TERM_PATTERN = re.compile(r"[^\W_]+")
+
+# Function words and filler that don't change what is being asked; negations are deliberately kept
+STOP_WORDS = frozenset("""
+a an the of in on at to for from by with about into over as and or
+is are was were be been being do does did can could would should will shall may might must
+what which who whom whose when where why how
+i me my we our you your it its this that these those there their they them
+please tell give kindly let know some any
+""".split())
+
+# Question words and modals are left out of the similarity terms but must match exactly, like numbers:
+# "why is metformin prescribed" and "how is metformin prescribed" ask different questions
+QUESTION_WORDS = frozenset("""
+what which who whom whose when where why how
+can could would should will shall may might must
+""".split())
+
+
+# Function to fold simple plurals so "effects" and "effect" are the same term
+def fold_term(term):
+    if len(term) > 3 and term.endswith("s") and not term.endswith(("ss", "us", "is")):
+        return term[:-1]
+    return term
+
+
+def _words(query):
+    return TERM_PATTERN.findall(unicodedata.normalize("NFKC", query).casefold())
+
+
+# Function to reduce a query to its normalized terms, e.g. "Metformin side effects?" -> ["metformin", "side", "effect"]
+def query_terms(query):
+    return [fold_term(term) for term in _words(query) if term not in STOP_WORDS]
+
+
+class _Scope:
+    """The answered queries of one scope and their TF-IDF matrix, rebuilt after changes."""
+
+    def __init__(self):
+        self.entries = []
+        self._weights = None
+
+    def add(self, entry, ttl, max_entries):
+        now = time.monotonic()
+        # A query with the same terms and exact terms replaces the older answer
+        self.entries = [
+            old for old in self.entries
+            if (old["counts"], old["exact_terms"]) != (entry["counts"], entry["exact_terms"])
+            and not (ttl and now - old["created"] > ttl)
+        ]
+        self.entries.append(entry)
+        del self.entries[:-max_entries]
+        self._weights = None
+
+    def _build(self):
+        # scipy is only loaded once answers are indexed, not by modules that just need query_terms
+        from scipy import sparse
+
+        self._vocabulary = {}
+        indices = []
+        data = []
+        indptr = [0]
+        for entry in self.entries:
+            for term, count in entry["counts"].items():
+                indices.append(self._vocabulary.setdefault(term, len(self._vocabulary)))
+                data.append(1.0 + math.log(count))
+            indptr.append(len(indices))
+        term_counts = sparse.csr_matrix(
+            (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(self.entries), len(self._vocabulary)),
+        )
+        # Smoothed IDF, so a single stored query still weighs its terms
+        document_frequency = np.bincount(term_counts.indices, minlength=len(self._vocabulary))
+        self._unseen_idf = math.log(1 + len(self.entries)) + 1.0
+        self._idf = (np.log((1 + len(self.entries)) / (1 + document_frequency)) + 1.0).astype(np.float32)
+        weights = term_counts.multiply(self._idf[np.newaxis, :]).tocsr()
+        norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+        self._weights = sparse.diags(1.0 / np.maximum(norms, 1e-12)) @ weights
+
+    def best_match(self, counts, exact_terms, ttl):
+        """Return ``(entry, cosine)`` for the most similar live entry with the same exact terms, or None."""
+        if not self.entries:
+            return None
+        if self._weights is None:
+            self._build()
+
+        query = np.zeros(len(self._vocabulary), dtype=np.float32)
+        norm = 0.0
+        for term, count in counts.items():
+            column = self._vocabulary.get(term)
+            weight = (1.0 + math.log(count)) * (self._idf[column] if column is not None else self._unseen_idf)
+            norm += weight * weight
+            if column is not None:
+                query[column] = weight
+        scores = self._weights @ query / math.sqrt(norm)
+
+        now = time.monotonic()
+        for index in np.argsort(-scores):
+            entry = self.entries[index]
+            if ttl and now - entry["created"] > ttl:
+                continue
+            if entry["exact_terms"] == exact_terms:
+                return entry, float(scores[index])
+        return None
+
+
+class SimilarQueryIndex:
+    """Answered queries grouped by scope, looked up by TF-IDF cosine similarity of their terms.
+
+    Rephrasings such as "side effects of metformin" and "metformin side
+    effects?" normalize to the same terms and match exactly; looser
+    rephrasings match when their cosine similarity reaches ``threshold``.
+    Queries whose numbers ("type 1" / "type 2"), question words or modals
+    ("why" / "how", "should" / "when should") differ never match. Each
+    scope, e.g. a section and domain, keeps a sparse entry x term matrix,
+    so a lookup is one sparse matrix-vector product.
+    """
+
+    def __init__(self, threshold=QUERY_REUSE_THRESHOLD, ttl=QUERY_REUSE_TTL,
+                 max_entries=QUERY_REUSE_MAX_ENTRIES, max_scopes=QUERY_REUSE_MAX_SCOPES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+        self.lookups = 0
+        self.reuses = 0
+        self._scopes = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(query):
+        words = _words(query)
+        terms = [fold_term(word) for word in words if word not in STOP_WORDS]
+        exact_terms = {term for term in terms if any(char.isdigit() for char in term)}
+        exact_terms.update(word for word in words if word in QUESTION_WORDS)
+        return Counter(terms), frozenset(exact_terms)
+
+    def lookup(self, scope, query):
+        """Return ``{"answer", "query", "score"}`` for a similar answered query in ``scope``, or None."""
+        counts, exact_terms = self._signature(query)
+        with self._lock:
+            self.lookups += 1
+            entries = self._scopes.get(scope)
+            match = entries.best_match(counts, exact_terms, self.ttl) if entries is not None and counts else None
+            if match is None or match[1] < self.threshold:
+                return None
+            self._scopes.move_to_end(scope)
+            self.reuses += 1
+            entry, score = match
+            return {"answer": entry["answer"], "query": entry["query"], "score": score}
+
+    def add(self, scope, query, answer):
+        """Remember ``answer`` for ``query`` in ``scope``, evicting expired, old and least used entries."""
+        counts, exact_terms = self._signature(query)
+        if not counts:
+            return
+        entry = {"counts": counts, "exact_terms": exact_terms, "query": query, "answer": answer, "created": time.monotonic()}
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is None:
+                entries = self._scopes[scope] = _Scope()
+            self._scopes.move_to_end(scope)
+            entries.add(entry, self.ttl, self.max_entries)
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+
+    def stats(self):
+        """Return lookup and reuse counters and the number of remembered queries."""
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "reuses": self.reuses,
+                "entries": sum(len(entries.entries) for entries in self._scopes.values()),
+                "reuse_rate": self.reuses / self.lookups if self.lookups else 0.0,
+            }
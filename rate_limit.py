@@ -0,0 +1,170 @@
+"""Client-side rate limiting and retry backoff for outbound API calls."""
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Function to parse "model=requests/tokens" entries; malformed entries are logged and skipped
+def parse_model_limits(spec):
+    limits = {}
+    for entry in filter(None, (entry.strip() for entry in spec.split(","))):
+        try:
+            model, entry_limits = entry.split("=")
+            requests, tokens = (int(value) for value in entry_limits.split("/"))
+            if not model.strip() or requests <= 0 or tokens <= 0:
+                raise ValueError("expected a model name and positive limits")
+        except ValueError as e:
+            logger.warning("Ignoring OPENAI_RATE_LIMITS entry %r (expected model=requests/tokens): %s", entry, e)
+            continue
+        limits[model.strip()] = (requests, tokens)
+    return limits
+
+
+# Requests and tokens per minute assumed for each model until the API reports its real limits.
+# Override with e.g. OPENAI_RATE_LIMITS="gpt-4=500/30000,gpt-3.5-turbo=3500/200000".
+DEFAULT_REQUESTS_PER_MINUTE = int(os.environ.get("OPENAI_REQUESTS_PER_MINUTE", 500))
+DEFAULT_TOKENS_PER_MINUTE = int(os.environ.get("OPENAI_TOKENS_PER_MINUTE", 30000))
+MODEL_LIMITS = {
+    "gpt-3.5-turbo": (500, 200000),
+    "gpt-4": (500, 10000),
+}
+MODEL_LIMITS.update(parse_model_limits(os.environ.get("OPENAI_RATE_LIMITS", "")))
+
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` units per ``period`` seconds."""
+
+    def __init__(self, rate, period=60.0, capacity=None):
+        self.rate = rate / period
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """Block until ``amount`` units are available, then take them."""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def set_limit(self, rate, period=60.0):
+        """Change the sustained rate and burst capacity, e.g. from a server-reported limit."""
+        with self._lock:
+            self._refill()
+            self.rate = rate / period
+            self.capacity = rate
+            self._tokens = min(self._tokens, self.capacity)
+
+    def limit_available(self, available):
+        """Never believe more units are available than the server says remain."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, available)
+
+    def drain(self):
+        """Empty the bucket so every waiting caller backs off together."""
+        with self._lock:
+            self._refill()
+            self._tokens = 0
+
+
+# Function to read how long the server asked us to wait, or None if it didn't say
+def retry_after(headers):
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+# Function to compute the wait before retry number ``attempt`` (0-based)
+def backoff_delay(attempt, headers=None):
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    server_delay = retry_after(headers)
+    return max(delay, server_delay) if server_delay is not None else delay
+
+
+class ModelRateLimiter:
+    """Process-wide request and token buckets, one pair per model.
+
+    Callers ``acquire`` before each API call with an estimate of the tokens
+    it will use. ``update`` feeds back the ``x-ratelimit-*`` response headers,
+    so the buckets converge on the account's real limits and never assume
+    more headroom than the server reports. ``penalize`` drains a model's
+    request bucket after a 429 so concurrent callers back off together.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = dict(MODEL_LIMITS if limits is None else limits)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _model_buckets(self, model):
+        with self._lock:
+            buckets = self._buckets.get(model)
+            if buckets is None:
+                requests_per_minute, tokens_per_minute = self.limits.get(
+                    model, (DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE)
+                )
+                buckets = self._buckets[model] = (RateLimiter(requests_per_minute), RateLimiter(tokens_per_minute))
+            return buckets
+
+    def acquire(self, model, tokens):
+        requests_bucket, tokens_bucket = self._model_buckets(model)
+        requests_bucket.acquire(1)
+        tokens_bucket.acquire(tokens)
+
+    def update(self, model, headers):
+        if not headers:
+            return
+        for bucket, kind in zip(self._model_buckets(model), ("requests", "tokens")):
+            try:
+                limit = headers.get(f"x-ratelimit-limit-{kind}")
+                if limit and float(limit) != bucket.capacity:
+                    bucket.set_limit(float(limit))
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if remaining is not None:
+                    bucket.limit_available(float(remaining))
+            except ValueError:
+                continue
+
+    def penalize(self, model):
+        # Token headroom is corrected from the 429's own headers; only pause new requests here
+        self._model_buckets(model)[0].drain()
+
+
+openai_limiter = ModelRateLimiter()
@@ -0,0 +1,365 @@
+"""Keyword matching and Google Custom Search client for the Research Search section."""
+import json
+import logging
+import os
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import SQLiteCache, TTLCache, make_key
+from metrics import GOOGLE_SEARCH_SECONDS, submit
+from query_index import fold_term, query_terms
+
+GOOGLE_SEARCH_URL = os.environ.get("GOOGLE_SEARCH_URL", "https://www.googleapis.com/customsearch/v1")
+RESULTS_PER_PAGE = 10
+# Custom Search never returns results past the 100th, i.e. start=91 is the last page
+MAX_SEARCH_PAGES = 10
+SEARCH_PAGES = int(os.environ.get("SEARCH_PAGES", 5))
+SEARCH_TIMEOUT = float(os.environ.get("SEARCH_TIMEOUT", 10))
+
+# Search result cache settings; SEARCH_CACHE_PATH enables the optional on-disk tier
+SEARCH_CACHE_TTL = int(os.environ.get("SEARCH_CACHE_TTL", 6 * 3600))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", 512))
+SEARCH_CACHE_PATH = os.environ.get("SEARCH_CACHE_PATH", "")
+
+# Result ranking: score = keyword weight x research keyword score + query weight x query term coverage
+RANK_KEYWORD_WEIGHT = float(os.environ.get("RANK_KEYWORD_WEIGHT", 0.4))
+RANK_QUERY_WEIGHT = float(os.environ.get("RANK_QUERY_WEIGHT", 0.6))
+# Matches in a title count this many times as much as matches in a snippet
+RANK_TITLE_WEIGHT = float(os.environ.get("RANK_TITLE_WEIGHT", 2.0))
+# Results kept per site after ranking
+RESULTS_PER_DOMAIN = int(os.environ.get("RESULTS_PER_DOMAIN", 1))
+
+logger = logging.getLogger(__name__)
+
+# Research-related keywords
+RESEARCH_KEYWORDS = [
+"research", "article", "study", "paper", "journal", "report", "document", "thesis", "dissertation",
+    "review", "literature", "source", "abstract", "manuscript", "publication", "findings", "results",
+    "investigation", "survey", "exploration", "clinical trial", "experiment", "data analysis",
+    "methodology", "results", "hypothesis", "sample study", "case study", "data set", "research method",
+    "peer-reviewed", "academic paper", "research paper", "study report", "research proposal", "field study",
+    "systematic review", "experimental study", "observational study", "control group", "clinical research",
+    "medical research", "pharmaceutical research", "biotech research", "drug development", "drug discovery",
+    "experimental design", "epidemiological study", "randomized control trial", "meta-analysis", "biostatistics",
+    "computational study", "therapeutic research", "molecular research", "genetic research", "biomedical research",
+    "cancer research", "immunology study", "pathophysiology", "translational research", "treatment protocol",
+    "medical innovation", "medical device study", "medical trial", "disease research", "pharmacology",
+    "pharmacovigilance", "clinical development", "clinical study protocol", "patient safety", "pharmaceutical study",
+    "pharmacokinetics", "therapeutic efficacy", "pharmacodynamics", "evidence-based medicine", "drug toxicology",
+    "preclinical study", "clinical outcomes", "regulatory affairs", "patent study", "artificial intelligence research",
+    "machine learning algorithms", "predictive modeling", "computational biology", "quantum computing research",
+    "robotics in medicine", "data mining", "neural networks in pharma", "digital health", "telemedicine research",
+    "precision medicine", "genomic research", "biotechnology innovation", "CRISPR technology",
+    "wearable health technology",
+    "peer-reviewed articles", "research journal", "scientific journal", "academic journal", "medical journal",
+    "pharmaceutical journal", "research article", "review article", "open access", "editorial", "article abstract",
+    "case report", "journal impact factor", "citation analysis", "scopus indexed", "elsevier", "springer",
+    "wiley online library", "doi", "pubmed indexed", "neuroscience research", "cardiology research",
+    "oncology research",
+    "infectious disease study", "pediatrics research", "geriatrics study", "regenerative medicine",
+    "stem cell research",
+    "mental health studies", "HIV/AIDS research", "diabetes research", "rare diseases study",
+    "autoimmune diseases research",
+    "cardiovascular diseases study", "hepatology research", "dermatology study", "orthopedics research",
+    "rheumatology research",
+    "patent research", "patent application", "patent literature", "patent filing", "intellectual property",
+    "patent search",
+    "patent documentation", "pharmaceutical patent", "drug patent", "biotechnology patent", "data-driven research",
+    "systematic review", "research data", "open science", "data visualization", "collaborative research",
+    "research collaboration",
+    "research network", "research findings", "literature review", "trial report", "cohort study",
+    "cross-sectional study",
+    "research grants", "clinical evaluation", "research ethics", "scientific method", "study design",
+    "research funding",
+    "research institutions", "research organizations", "health policy research", "epidemiology research"
+
+]
+
+
+# Function to build a character trie of the keywords; "" marks the end of a keyword
+def _build_trie(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+    return trie
+
+
+# Build a regex from a character trie of the keywords so that shared prefixes
+# ("research", "research paper", "research proposal", ...) are only tested once
+# per position instead of once per keyword.
+def _trie_pattern(trie):
+    def build(node):
+        is_end = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        pattern = "(?:" + "|".join(branches) + ")"
+        return pattern + "?" if is_end else pattern
+
+    return build(trie)
+
+
+# Lowercased, de-duplicated keyword index compiled once at import. The lookahead
+# lets matches overlap, so "cancer research" reports both "cancer research" and
+# "research"; at each position the longest keyword wins.
+KEYWORD_INDEX = sorted({keyword.lower() for keyword in RESEARCH_KEYWORDS})
+KEYWORD_TRIE = _build_trie(KEYWORD_INDEX)
+KEYWORD_PATTERN = re.compile("(?=(" + _trie_pattern(KEYWORD_TRIE) + "))")
+
+
+KEYWORD_COLUMNS = {keyword: column for column, keyword in enumerate(KEYWORD_INDEX)}
+
+
+# Function to find every research keyword in a text with one pass over it
+def find_research_keywords(text):
+    """Return (keyword, position) pairs for all keywords found in ``text``.
+
+    Matching is case-insensitive; positions index into ``text.lower()``.
+    The regex finds where keywords start; the trie is then walked along
+    the longest match so shorter keywords at the same position ("research"
+    within "research paper") are reported too, shortest first.
+    """
+    found = []
+    for match in KEYWORD_PATTERN.finditer(text.lower()):
+        node = KEYWORD_TRIE
+        for end, char in enumerate(match.group(1), 1):
+            node = node[char]
+            if "" in node:
+                found.append((match.group(1)[:end], match.start()))
+    return found
+
+
+# Function to check whether any of the given texts contains a research keyword
+def contains_research_keyword(*texts):
+    return any(KEYWORD_PATTERN.search(text.lower()) for text in texts if text)
+
+
+# Function to check if a query contains research-related keywords
+def is_query_research_related(query):
+    return contains_research_keyword(query)
+
+
+# Function to count, per text, the matches of a pattern's first group that are in a vocabulary
+def _match_counts(texts, pattern, columns, normalize=None):
+    """Return a ``len(texts) x len(columns)`` count matrix from one regex pass over all texts.
+
+    The texts are joined with NUL separators; each match is assigned to its
+    text by a binary search of its position over the text offsets.
+    """
+    counts = np.zeros((len(texts), len(columns)), dtype=np.float32)
+    if not texts or not columns:
+        return counts
+    offsets = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]])
+    positions = []
+    hit_columns = []
+    for match in pattern.finditer("\0".join(texts)):
+        term = match.group(1)
+        column = columns.get(normalize(term) if normalize else term)
+        if column is not None:
+            positions.append(match.start())
+            hit_columns.append(column)
+    rows = np.searchsorted(offsets, np.array(positions, dtype=np.int64), side="right") - 1
+    np.add.at(counts, (rows, np.array(hit_columns, dtype=np.int64)), 1)
+    return counts
+
+
+# Function to build a pattern matching only the given terms and their plurals, as whole words
+def _terms_pattern(terms):
+    alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(r"(?<![^\W_])((?:" + alternatives + r")s?)(?![^\W_])")
+
+
+def _idf(counts):
+    # Smoothed IDF over the candidate results: terms found in every result weigh least
+    document_frequency = np.count_nonzero(counts, axis=0)
+    return np.log((1 + len(counts)) / (1 + document_frequency)) + 1.0
+
+
+# Function to get the site of a result link, e.g. "https://www.nature.com/x" -> "nature.com"
+def result_domain(link):
+    host = urlparse(link).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+# Function to rank search results by research relevance and query overlap in one batch
+def rank_research_results(query, items, per_domain=RESULTS_PER_DOMAIN):
+    """Return the research-related ``items`` best first, at most ``per_domain`` per site.
+
+    Every item is scored at once with matrix operations. Research keyword
+    hits are weighted by their IDF over the candidates and damped with
+    log1p, then scaled to the best item. Query coverage is the IDF-weighted
+    share of the query's terms found in the item, with a bonus for terms in
+    the title. Title matches count ``RANK_TITLE_WEIGHT`` times. Items
+    without any research keyword are dropped, as before ranking; ties keep
+    the search engine's order. Each result is
+    ``{"title", "link", "snippet", "domain", "score"}``.
+    """
+    titles = [item.get("title", "") or "" for item in items]
+    snippets = [item.get("snippet", "") or "" for item in items]
+
+    keyword_counts = (
+        RANK_TITLE_WEIGHT * _match_counts([title.lower() for title in titles], KEYWORD_PATTERN, KEYWORD_COLUMNS)
+        + _match_counts([snippet.lower() for snippet in snippets], KEYWORD_PATTERN, KEYWORD_COLUMNS)
+    )
+    keyword_scores = np.log1p(keyword_counts) @ _idf(keyword_counts)
+    if len(items) and keyword_scores.max() > 0:
+        keyword_scores /= keyword_scores.max()
+
+    term_columns = {term: column for column, term in enumerate(dict.fromkeys(query_terms(query)))}
+    coverage = np.zeros(len(items))
+    if term_columns:
+        def normalize(text):
+            return unicodedata.normalize("NFKC", text).casefold()
+
+        # Only words that can fold to a query term are matched; fold_term confirms them
+        pattern = _terms_pattern(term_columns)
+        title_terms = _match_counts([normalize(title) for title in titles], pattern, term_columns, fold_term)
+        snippet_terms = _match_counts([normalize(snippet) for snippet in snippets], pattern, term_columns, fold_term)
+        term_idf = _idf(title_terms + snippet_terms)
+        found = ((title_terms + snippet_terms) > 0).astype(np.float32) + (title_terms > 0)
+        coverage = (found @ term_idf) / (2 * term_idf.sum())
+
+    scores = RANK_KEYWORD_WEIGHT * keyword_scores + RANK_QUERY_WEIGHT * coverage
+    relevant = keyword_counts.sum(axis=1) > 0
+    order = np.lexsort((np.arange(len(items)), -scores))
+
+    ranked = []
+    per_site = {}
+    for index in order[relevant[order]]:
+        domain = result_domain(items[index].get("link", ""))
+        if per_site.get(domain, 0) >= per_domain:
+            continue
+        per_site[domain] = per_site.get(domain, 0) + 1
+        ranked.append({
+            "title": titles[index],
+            "link": items[index].get("link", ""),
+            "snippet": snippets[index],
+            "domain": domain,
+            "score": float(scores[index]),
+        })
+    return ranked
+
+
+# One keep-alive session and thread pool per process, shared by every search
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_SEARCH_PAGES))
+_executor = ThreadPoolExecutor(max_workers=MAX_SEARCH_PAGES, thread_name_prefix="google-search")
+
+
+# Function to fetch one page of Google Custom Search results
+def fetch_search_page(query, api_key, cx, start=1):
+    with GOOGLE_SEARCH_SECONDS.time():
+        response = _session.get(
+            GOOGLE_SEARCH_URL,
+            params={"q": query, "key": api_key, "cx": cx, "start": start, "num": RESULTS_PER_PAGE},
+            timeout=SEARCH_TIMEOUT,
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+# Per-process result cache in front of the API, with an optional shared disk tier
+search_cache = TTLCache(ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES)
+search_disk_cache = (
+    SQLiteCache(SEARCH_CACHE_PATH, table="search_results", ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES * 10)
+    if SEARCH_CACHE_PATH
+    else None
+)
+
+
+# Function to normalize a query so trivially different spellings share a cache entry
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+# Function to report search cache hit rates for both tiers
+def search_cache_stats():
+    stats = {"memory": search_cache.stats()}
+    if search_disk_cache is not None:
+        stats["disk"] = search_disk_cache.stats()
+    return stats
+
+
+# Function to search several result pages concurrently, yielding items as pages land
+def iter_search_google(query, api_key, cx, pages=SEARCH_PAGES):
+    """Yield lists of new result items, one list per page as it completes.
+
+    Pages ``start=1, 11, 21, ...`` are requested at once over the pooled
+    session. Items are de-duplicated by link across pages; pages that fail
+    are logged and skipped. Complete result sets are cached by normalized
+    query, so a repeated search yields its items at once without any HTTP
+    requests.
+    """
+    pages = max(1, min(pages, MAX_SEARCH_PAGES))
+    key = make_key(normalize_query(query), cx, pages)
+    items = search_cache.get(key)
+    if items is None and search_disk_cache is not None:
+        cached = search_disk_cache.get(key)
+        if cached is not None:
+            items = json.loads(cached)
+            search_cache.set(key, items)
+    if items is not None:
+        yield list(items)
+        return
+
+    items = []
+    failed = False
+    for page_items in _iter_search_pages(query, api_key, cx, pages):
+        if page_items is None:
+            failed = True
+            continue
+        items.extend(page_items)
+        yield page_items
+
+    # Partial result sets are not cached so a transient failure is retried next time
+    if not failed:
+        search_cache.set(key, items)
+        if search_disk_cache is not None:
+            search_disk_cache.set(key, json.dumps(items))
+
+
+def _iter_search_pages(query, api_key, cx, pages):
+    futures = [
+        submit(_executor, fetch_search_page, query, api_key, cx, 1 + page * RESULTS_PER_PAGE)
+        for page in range(pages)
+    ]
+    seen_links = set()
+    for future in as_completed(futures):
+        try:
+            data = future.result()
+        except Exception as e:
+            logger.warning("Google Custom Search page failed: %s", e)
+            yield None
+            continue
+        new_items = []
+        for item in data.get("items", []):
+            link = item.get("link", "")
+            if link in seen_links:
+                continue
+            seen_links.add(link)
+            new_items.append(item)
+        yield new_items
+
+
+# Function to search using Google Custom Search API
+def search_google(query, api_key, cx, pages=SEARCH_PAGES):
+    """Return ``{"items": [...]}`` merged over ``pages`` result pages."""
+    items = []
+    received = False
+    for page_items in iter_search_google(query, api_key, cx, pages):
+        received = True
+        items.extend(page_items)
+    if not received:
+        return {"error": "Error fetching data from Google Custom Search"}
+    return {"items": items}
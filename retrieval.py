@@ -0,0 +1,104 @@
+"""Local BM25 retrieval over extracted PDF text for PDF question answering."""
+import hashlib
+import os
+import re
+
+import numpy as np
+from scipy import sparse
+
+from cache import TTLCache
+
+# Chunking and retrieval settings
+CHUNK_WORDS = int(os.environ.get("RETRIEVAL_CHUNK_WORDS", 180))
+CHUNK_OVERLAP = int(os.environ.get("RETRIEVAL_CHUNK_OVERLAP", 30))
+TOP_K = int(os.environ.get("RETRIEVAL_TOP_K", 6))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+# Function to split text into lowercase word tokens
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+# Function to split text into overlapping chunks of roughly ``chunk_words`` words
+def chunk_text(text, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    words = text.split()
+    step = max(1, chunk_words - overlap)
+    return [" ".join(words[start:start + chunk_words]) for start in range(0, max(len(words) - overlap, 1), step)]
+
+
+class BM25Index:
+    """Okapi BM25 over a list of chunks, stored as a sparse chunk x term matrix.
+
+    Per-term BM25 weights are precomputed once, so scoring a query is a
+    column slice and a row sum over the sparse matrix.
+    """
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.vocabulary = {}
+        indices = []
+        indptr = [0]
+        for chunk in chunks:
+            for token in tokenize(chunk):
+                indices.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+            indptr.append(len(indices))
+
+        # Duplicate (row, term) entries are summed into term frequencies by the CSR constructor
+        term_counts = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(len(chunks), len(self.vocabulary)),
+        )
+        term_counts.sum_duplicates()
+
+        lengths = np.diff(np.array(indptr)).astype(np.float32)
+        average_length = lengths.mean() if len(lengths) and lengths.mean() > 0 else 1.0
+        document_frequency = np.bincount(term_counts.indices, minlength=len(self.vocabulary))
+        idf = np.log((len(chunks) - document_frequency + 0.5) / (document_frequency + 0.5) + 1.0).astype(np.float32)
+
+        tf = term_counts.data
+        norm = np.repeat(k1 * (1 - b + b * lengths / average_length), np.diff(term_counts.indptr))
+        weights = term_counts.copy()
+        weights.data = tf * (k1 + 1) / (tf + norm) * idf[term_counts.indices]
+        self.weights = weights.tocsc()
+
+    def search(self, query, k=TOP_K):
+        """Return up to ``k`` ``(chunk_index, score)`` pairs, best first."""
+        columns = [self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary]
+        if not columns or not self.chunks:
+            return []
+        scores = np.asarray(self.weights[:, columns].sum(axis=1)).ravel()
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(index), float(scores[index])) for index in top if scores[index] > 0]
+
+
+# Indexes are built once per document and reused for every question about it
+_index_cache = TTLCache(ttl=0, max_entries=16)
+
+
+# Function to get (building on first use) the BM25 index for a document's text
+def get_index(text):
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    index = _index_cache.get(key)
+    if index is None:
+        index = BM25Index(chunk_text(text))
+        _index_cache.set(key, index)
+    return index
+
+
+# Function to select the parts of a document most relevant to a question
+def retrieve_context(text, query, k=TOP_K):
+    """Return the top-``k`` chunks for ``query`` in document order.
+
+    Documents that fit in ``k`` chunks are returned whole. If no chunk
+    shares a term with the query, the opening chunks are used.
+    """
+    index = get_index(text)
+    if len(index.chunks) <= k:
+        return text
+    hits = index.search(query, k)
+    selected = sorted(chunk for chunk, _ in hits) or list(range(k))
+    return "\n\n[...]\n\n".join(index.chunks[chunk] for chunk in selected)
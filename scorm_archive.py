@@ -0,0 +1,70 @@
+"""SCORM zip archives written member by member, compressing only the members that compress."""
+import io
+import os
+import time
+import zipfile
+
+# Members that are already compressed (zip-based documents, compressed PDF streams, media) are stored as-is
+STORED_EXTENSIONS = frozenset({
+    ".pdf", ".docx", ".pptx", ".xlsx", ".zip", ".parquet",
+    ".jpeg", ".jpg", ".png", ".gif", ".mp3", ".mp4",
+})
+
+# Large members are fed to the zip in slices so deflate never holds a full compressed copy
+CHUNK_SIZE = 1 << 20
+
+
+# Function to choose how an archive member is compressed from its file name
+def member_compression(name):
+    return zipfile.ZIP_STORED if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+class ScormArchive:
+    """A zip archive written member by member into ``fileobj`` (an in-memory buffer by default).
+
+    Each member is stored or deflated according to ``member_compression``.
+    ``write`` streams bytes or text in slices; ``open`` returns a writable
+    member so documents can be saved straight into the archive without an
+    intermediate buffer. ``getvalue`` closes the archive and returns its
+    bytes; an in-memory buffer that is no longer written to hands over its
+    bytes without copying them.
+    """
+
+    def __init__(self, fileobj=None):
+        self.fileobj = io.BytesIO() if fileobj is None else fileobj
+        self._zip = zipfile.ZipFile(self.fileobj, "w")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _member_info(self, name, size=0):
+        info = zipfile.ZipInfo(name, date_time=time.localtime(time.time())[:6])
+        info.compress_type = member_compression(name)
+        info.external_attr = 0o600 << 16
+        info.file_size = size
+        return info
+
+    def open(self, name):
+        """Return a writable file object for the member ``name``."""
+        return self._zip.open(self._member_info(name), "w")
+
+    def write(self, name, data):
+        """Add the member ``name`` from bytes or text (encoded as UTF-8)."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        view = memoryview(data)
+        with self._zip.open(self._member_info(name, len(view)), "w") as member:
+            for start in range(0, len(view), CHUNK_SIZE):
+                member.write(view[start:start + CHUNK_SIZE])
+
+    def close(self):
+        """Write the central directory and return ``fileobj``."""
+        self._zip.close()
+        return self.fileobj
+
+    def getvalue(self):
+        """Close the archive and return the bytes of the in-memory buffer."""
+        return self.close().getvalue()
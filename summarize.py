@@ -0,0 +1,124 @@
+"""Map-reduce summarization for PDFs larger than the model context."""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from llm import chat_completion, estimate_tokens
+from metrics import submit
+
+SUMMARY_MODEL = "gpt-3.5-turbo"
+# Documents estimated above this many tokens don't fit in one prompt and are summarized with map-reduce
+MAP_REDUCE_MIN_TOKENS = int(os.environ.get("MAP_REDUCE_MIN_TOKENS", 12000))
+SUMMARY_CHUNK_TOKENS = int(os.environ.get("SUMMARY_CHUNK_TOKENS", 3000))
+SUMMARY_REDUCE_FANIN = int(os.environ.get("SUMMARY_REDUCE_FANIN", 6))
+SUMMARY_WORKERS = int(os.environ.get("SUMMARY_WORKERS", 8))
+
+SUMMARY_REQUEST_PATTERN = re.compile(
+    r"\b(summar\w*|overview|synopsis|gist|tl;?dr|key (points|takeaways)|highlights|main (points|ideas))\b",
+    re.IGNORECASE,
+)
+
+SYSTEM_PROMPT = (
+    "You are an expert in analyzing PDFs and providing highlights, summaries, analyses, and insights. "
+    "Only use the content of the uploaded PDF."
+)
+
+_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summarize")
+
+
+# Function to decide whether a question asks about the whole document rather than specific passages
+def is_summary_request(query):
+    return bool(SUMMARY_REQUEST_PATTERN.search(query))
+
+
+# Function to decide whether a summary request needs map-reduce; smaller documents are sent whole
+def needs_map_reduce(text, query):
+    return is_summary_request(query) and estimate_tokens(text) > MAP_REDUCE_MIN_TOKENS
+
+
+# Function to split text into chunks of at most ``max_tokens`` estimated tokens
+def split_by_tokens(text, max_tokens=SUMMARY_CHUNK_TOKENS):
+    chunks = []
+    current = []
+    current_tokens = 0
+    for word in text.split():
+        word_tokens = estimate_tokens(word + " ")
+        if current and current_tokens + word_tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current = []
+            current_tokens = 0
+        current.append(word)
+        current_tokens += word_tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+# Calls share llm's process-wide rate limiter with every other OpenAI call
+def _complete(prompt):
+    return chat_completion(
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+    )
+
+
+def _summarize_part(chunk, index, total, query):
+    return _complete(
+        f"This is part {index + 1} of {total} of a PDF. Summarize it concisely, keeping the key facts, "
+        f"figures and conclusions that matter for this request: {query}\n\nPart {index + 1}:\n{chunk}"
+    )
+
+
+def _combine(summaries, query):
+    joined = "\n\n".join(summaries)
+    return _complete(
+        "These are summaries of consecutive parts of a PDF. Merge them into one concise summary that keeps "
+        f"the key facts, figures and conclusions that matter for this request: {query}\n\n{joined}"
+    )
+
+
+# Function to summarize an oversize document by summarizing chunks and merging them in a tree
+def map_reduce_summarize(text, query, progress=None):
+    """Answer a summary request over ``text`` that does not fit in one prompt.
+
+    Chunks are summarized concurrently on a bounded worker pool behind the
+    shared OpenAI rate limiter, then partial summaries are merged
+    ``SUMMARY_REDUCE_FANIN`` at a time, level by level, until one remains.
+    Wall-clock time grows with the depth of that tree, not with page count.
+    ``progress(done, total, stage)`` is called as calls finish.
+    """
+    chunks = split_by_tokens(text)
+    total = len(chunks)
+    # Every level of the tree merges groups of partial summaries, down to a single one
+    remaining = total
+    while remaining > 1:
+        remaining = -(-remaining // SUMMARY_REDUCE_FANIN)
+        total += remaining
+    done = 0
+
+    def report(stage):
+        nonlocal done
+        done += 1
+        if progress is not None:
+            progress(done, total, stage)
+
+    futures = [submit(_executor, _summarize_part, chunk, i, len(chunks), query) for i, chunk in enumerate(chunks)]
+    summaries = []
+    for future in futures:
+        summaries.append(future.result())
+        report("Summarizing sections")
+
+    level = 1
+    while len(summaries) > 1:
+        groups = [summaries[i:i + SUMMARY_REDUCE_FANIN] for i in range(0, len(summaries), SUMMARY_REDUCE_FANIN)]
+        futures = [submit(_executor, _combine, group, query) for group in groups]
+        summaries = []
+        for future in futures:
+            summaries.append(future.result())
+            report(f"Merging summaries (level {level})")
+        level += 1
+
+    return summaries[0] if summaries else ""
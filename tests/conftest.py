@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Tests run from the repository root without installing it, like the benchmarks, and without the response cache
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LLM_CACHE_PATH", "")
@@ -0,0 +1,46 @@
+import json
+import time
+
+import batch
+
+
+def write_jobs(path, jobs):
+    path.write_text("".join(json.dumps(job) + "\n" for job in jobs), encoding="utf-8")
+
+
+def read_results(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_job_seconds_exclude_time_queued(tmp_path, monkeypatch):
+    def slow_job(job, out_dir):
+        time.sleep(0.2)
+        if job["query"] == "fails":
+            raise batch.JobError("failed")
+        return []
+
+    monkeypatch.setattr(batch, "run_job", slow_job)
+    write_jobs(tmp_path / "jobs.jsonl", [{"kind": "content", "query": query} for query in ("a", "b", "fails")])
+    counts = batch.run_batch(str(tmp_path / "jobs.jsonl"), str(tmp_path / "out"), concurrency=1)
+
+    assert counts == {"ok": 2, "error": 1}
+    results = read_results(tmp_path / "out" / "results.jsonl")
+    assert [result["status"] for result in results] == ["ok", "ok", "error"]
+    assert all(0.2 <= result["seconds"] < 0.35 for result in results)
+
+
+def test_failed_dataset_job_removes_partial_files(tmp_path, monkeypatch):
+    def failing_build(domain, query, rows, csv_file, parquet_file, arrow_file):
+        csv_file.write(b"name,value\n")
+        raise ConnectionError("connection reset")
+
+    def empty_build(domain, query, rows, csv_file, parquet_file, arrow_file):
+        return {"rows": 0}
+
+    job = {"kind": "dataset", "query": "drugs", "rows": 10, "formats": ["csv"]}
+    for build in (failing_build, empty_build):
+        monkeypatch.setattr(batch, "build_dataset", build)
+        write_jobs(tmp_path / "jobs.jsonl", [job])
+        counts = batch.run_batch(str(tmp_path / "jobs.jsonl"), str(tmp_path / "out"))
+        assert counts == {"ok": 0, "error": 1}
+        assert list((tmp_path / "out" / batch.job_id(job)).iterdir()) == []
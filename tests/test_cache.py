@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+import cache
+from cache import SQLiteCache, make_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_make_key_is_stable_and_order_independent_for_dicts():
+    assert make_key("gpt", {"a": 1, "b": 2}) == make_key("gpt", {"b": 2, "a": 1})
+    assert make_key("gpt", [1, 2]) != make_key("gpt", [2, 1])
+
+
+def test_sqlite_cache_expires_entries(tmp_path, clock):
+    store = SQLiteCache(str(tmp_path / "cache.sqlite3"), ttl=60)
+    store.set("key", "value")
+    clock[0] += 60
+    assert store.get("key") == "value"
+    clock[0] += 1
+    assert store.get("key") is None
+    assert store.stats() == {"hits": 1, "misses": 1, "entries": 0, "hit_rate": 0.5}
+
+
+def test_sqlite_cache_evicts_least_recently_used(tmp_path, clock):
+    store = SQLiteCache(str(tmp_path / "cache.sqlite3"), ttl=0, max_entries=2)
+    store.set("a", "1")
+    clock[0] += 1
+    store.set("b", "2")
+    clock[0] += 1
+    assert store.get("a") == "1"
+    clock[0] += 1
+    store.set("c", "3")
+    assert store.get("b") is None
+    assert (store.get("a"), store.get("c")) == ("1", "3")
+
+
+def test_sqlite_cache_is_shared_between_instances_and_threads(tmp_path):
+    path = str(tmp_path / "nested" / "cache.sqlite3")
+    writer = SQLiteCache(path, table="responses")
+
+    threads = [threading.Thread(target=writer.set, args=(f"key {n}", f"value {n}")) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reader = SQLiteCache(path, table="responses")
+    assert [reader.get(f"key {n}") for n in range(8)] == [f"value {n}" for n in range(8)]
+    assert writer.stats()["hits"] == 8
+
+
+def test_ttl_cache_expires_entries(clock):
+    store = cache.TTLCache(ttl=60)
+    store.set("key", "value")
+    clock[0] += 60
+    assert store.get("key") == "value"
+    clock[0] += 1
+    assert store.get("key") is None
+    assert store.stats() == {"hits": 1, "misses": 1, "entries": 0, "hit_rate": 0.5}
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    store = cache.TTLCache(ttl=0, max_entries=2)
+    store.set("a", 1)
+    store.set("b", 2)
+    assert store.get("a") == 1
+    store.set("c", 3)
+    assert store.get("b") is None
+    assert (store.get("a"), store.get("c")) == (1, 3)
+
+
+def test_ttl_cache_set_refreshes_an_entry(clock):
+    store = cache.TTLCache(ttl=60)
+    store.set("key", "old")
+    clock[0] += 50
+    store.set("key", "new")
+    clock[0] += 50
+    assert store.get("key") == "new"
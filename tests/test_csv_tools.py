@@ -0,0 +1,71 @@
+import pytest
+
+import csv_tools
+from csv_tools import CSVStreamParser, parse_csv_text, unique_column_names
+
+FENCED = (
+    "```csv\n"
+    "Drug,Notes,Dose\n"
+    "\n"
+    'Aspirin,"pain, fever",100mg\n'
+    'Ibuprofen,"line one\n'
+    'line two",200mg\n'
+    "Broken,row\n"
+    'Quote,"she said ""hi""",5mg\n'
+    "```\n"
+)
+
+EXPECTED_ROWS = [
+    ["Aspirin", "pain, fever", "100mg"],
+    ["Ibuprofen", "line one\nline two", "200mg"],
+    ["Quote", 'she said "hi"', "5mg"],
+]
+
+
+def test_quoted_and_multiline_fields_with_quarantine():
+    parser = parse_csv_text(FENCED)
+    assert parser.header == ["Drug", "Notes", "Dose"]
+    assert parser.rows == EXPECTED_ROWS
+    assert parser.quarantined == [(7, "Broken,row", "expected 3 fields, found 2")]
+
+
+@pytest.mark.parametrize("piece", [1, 2, 7, 1000])
+def test_rows_are_the_same_however_the_text_is_split(piece):
+    parser = CSVStreamParser()
+    completed = []
+    for start in range(0, len(FENCED), piece):
+        completed += parser.feed(FENCED[start:start + piece])
+    completed += parser.close()
+    assert completed == parser.rows == EXPECTED_ROWS
+    assert len(parser.quarantined) == 1
+
+
+def test_rows_are_returned_once_their_line_ends():
+    parser = CSVStreamParser()
+    assert parser.feed("name,dose\nAspirin,10") == []
+    assert parser.feed("0mg") == []
+    assert parser.feed("\nIbuprofen,200mg") == [["Aspirin", "100mg"]]
+    assert parser.close() == [["Ibuprofen", "200mg"]]
+
+
+def test_unterminated_quote_is_quarantined_at_close():
+    parser = parse_csv_text('name,dose\n"Aspirin,100mg\nIbuprofen,200mg\n')
+    assert parser.rows == []
+    assert parser.quarantined == [(3, '"Aspirin,100mg\nIbuprofen,200mg', "unexpected end of data")]
+
+
+def test_unterminated_quote_is_cut_off_after_max_row_chars(monkeypatch):
+    monkeypatch.setattr(csv_tools, "MAX_ROW_CHARS", 40)
+    parser = CSVStreamParser()
+    parser.feed('name,notes\nAspirin,"never closed\n' + "more text " * 5)
+    assert len(parser.quarantined) == 1
+    parser.feed('\n"Ibuprofen",fine\n')
+    parser.close()
+    assert parser.rows == [["Ibuprofen", "fine"]]
+
+
+def test_columns_with_duplicate_and_blank_names():
+    assert unique_column_names(["dose", "dose", " ", "dose"]) == ["dose", "dose.1", "column_3", "dose.2"]
+    parser = parse_csv_text("name,name\nAspirin,Bayer\nIbuprofen,Advil\n")
+    assert parser.columns() == {"name": ["Aspirin", "Ibuprofen"], "name.1": ["Bayer", "Advil"]}
+    assert CSVStreamParser().columns() == {}
@@ -0,0 +1,40 @@
+import datetime
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from dataset_builder import DatasetWriter
+
+SCHEMA = {
+    "columns": [
+        {"name": "name", "type": "string"},
+        {"name": "count", "type": "integer"},
+        {"name": "measured", "type": "date"},
+    ],
+    "key": ["name"],
+}
+
+
+def shard(start, rows=40):
+    return [(f"item {n}", n, datetime.date(2024, 1, 1)) for n in range(start, start + rows)]
+
+
+def test_shards_are_combined_into_row_groups():
+    csv_file, parquet_file, arrow_file = io.BytesIO(), io.BytesIO(), io.BytesIO()
+    writer = DatasetWriter(SCHEMA, csv_file, parquet_file, arrow_file, row_group_rows=100)
+    for start in range(0, 260, 40):
+        writer.write_rows(shard(start))
+    writer.close()
+
+    parquet = pq.ParquetFile(io.BytesIO(parquet_file.getvalue()))
+    assert [parquet.metadata.row_group(group).num_rows for group in range(parquet.num_row_groups)] == [100, 100, 80]
+    assert parquet.read().column("count").to_pylist() == list(range(280))
+
+    arrow = pa.ipc.open_file(io.BytesIO(arrow_file.getvalue()))
+    assert [arrow.get_batch(batch).num_rows for batch in range(arrow.num_record_batches)] == [100, 100, 80]
+
+    lines = csv_file.getvalue().decode("utf-8").splitlines()
+    assert lines[0] == "name,count,measured"
+    assert lines[1] == "item 0,0,2024-01-01"
+    assert len(lines) == 281
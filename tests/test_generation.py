@@ -0,0 +1,46 @@
+import pytest
+
+import generation
+from query_index import SimilarQueryIndex
+
+
+@pytest.fixture(autouse=True)
+def fresh_answer_index(monkeypatch):
+    monkeypatch.setattr(generation, "answer_index", SimilarQueryIndex())
+
+
+def fake_stream(tokens, error=None):
+    def stream_chat_completion(model, messages, **params):
+        yield from tokens
+        if error is not None:
+            raise error
+    return stream_chat_completion
+
+
+@pytest.mark.parametrize("stream_answer", [
+    generation.stream_gpt_response_content_gen,
+    generation.stream_gpt_response_csv,
+])
+def test_stream_failing_partway_is_not_reused(monkeypatch, stream_answer):
+    monkeypatch.setattr(generation, "stream_chat_completion", fake_stream(["Metformin ", "may cause "], ConnectionError("connection reset")))
+    assert "".join(stream_answer("Medical", "side effects of metformin")) == "Metformin may cause Error: connection reset"
+
+    monkeypatch.setattr(generation, "stream_chat_completion", fake_stream(["Nausea."]))
+    reuse = {}
+    assert "".join(stream_answer("Medical", "metformin side effects?", reuse)) == "Nausea."
+    assert reuse == {}
+
+
+def test_finished_stream_is_reused(monkeypatch):
+    monkeypatch.setattr(generation, "stream_chat_completion", fake_stream(["Nausea ", "and diarrhea."]))
+    "".join(generation.stream_gpt_response_content_gen("Medical", "side effects of metformin"))
+
+    monkeypatch.setattr(generation, "stream_chat_completion", fake_stream([], AssertionError("not reused")))
+    reuse = {}
+    assert "".join(generation.stream_gpt_response_content_gen("Medical", "metformin side effects?", reuse)) == "Nausea and diarrhea."
+    assert reuse["query"] == "side effects of metformin"
+
+
+def test_csv_response_without_code_fence(monkeypatch):
+    monkeypatch.setattr(generation, "get_response", lambda prompt: "```csv\nDrug,Dose\nAspirin,100mg\n```\n")
+    assert generation.fetch_gpt_response("Medical", "common drugs") == "Drug,Dose\nAspirin,100mg"
@@ -0,0 +1,73 @@
+import pytest
+from fpdf import FPDF
+
+import pdf_tools
+from pdf_tools import PDFTextCache, extract_text_parallel, iter_page_ranges
+
+
+def make_pdf(pages, label="Page"):
+    pdf = FPDF()
+    pdf.set_font("Arial", size=11)
+    for page in range(pages):
+        pdf.add_page()
+        pdf.multi_cell(190, 6, f"{label} {page} of the stability guidance.")
+    return pdf.output(dest="S").encode("latin-1")
+
+
+@pytest.fixture(scope="module")
+def pdf_bytes():
+    return make_pdf(9)
+
+
+def page_texts(pdf_bytes):
+    return [text for _, texts in sorted(iter_page_ranges(pdf_bytes, workers=1)) for text in texts]
+
+
+def test_serial_extraction_yields_every_page(pdf_bytes):
+    texts = page_texts(pdf_bytes)
+    assert len(texts) == 9
+    assert all(f"Page {page} of" in text for page, text in enumerate(texts))
+
+
+def test_process_pool_matches_serial_extraction(pdf_bytes, monkeypatch):
+    monkeypatch.setattr(pdf_tools, "PDF_PARALLEL_MIN_PAGES", 2)
+    monkeypatch.setattr(pdf_tools, "PDF_PAGES_PER_TASK", 2)
+    ranges = list(iter_page_ranges(pdf_bytes, workers=2))
+    assert sorted(first for first, _ in ranges) == [0, 2, 4, 6, 8]
+    assert extract_text_parallel(pdf_bytes, workers=2) == "".join(page_texts(pdf_bytes))
+
+
+def test_cache_resumes_an_interrupted_extraction(pdf_bytes, monkeypatch):
+    starts = []
+    real_iter_page_ranges = pdf_tools.iter_page_ranges
+
+    def spy(pdf_bytes, start=0, stop=None, workers=1):
+        starts.append(start)
+        return real_iter_page_ranges(pdf_bytes, start, stop, workers=1)
+
+    monkeypatch.setattr(pdf_tools, "iter_page_ranges", spy)
+    cache = PDFTextCache()
+    pages = cache.iter_pages(pdf_bytes)
+    first = [next(pages) for _ in range(4)]
+    pages.close()
+
+    progress = []
+    text = cache.extract_text(pdf_bytes, progress=lambda done, total: progress.append((done, total)))
+    assert text == "".join(page_texts(pdf_bytes))
+    assert text.startswith("".join(first))
+    assert starts == [0, 4]
+    assert progress[0] == (5, 9) and progress[-1] == (9, 9)
+
+    # Fully cached documents are served without extracting again
+    assert cache.extract_text(pdf_bytes) == text
+    assert starts == [0, 4]
+
+
+def test_cache_evicts_least_recently_used_documents():
+    documents = [make_pdf(3, label=name) for name in ("First", "Second", "Third")]
+    cache = PDFTextCache(max_bytes=1)
+    for document in documents:
+        cache.extract_text(document)
+    # Only the document read last is kept, even though it alone exceeds max_bytes
+    assert cache.stats()["documents"] == 1
+    assert "Third 0" in cache.extract_text(documents[2])
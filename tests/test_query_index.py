@@ -0,0 +1,73 @@
+import pytest
+
+from query_index import SimilarQueryIndex, query_terms
+
+
+@pytest.fixture
+def index():
+    return SimilarQueryIndex(threshold=0.85, ttl=0)
+
+
+def test_query_terms():
+    assert query_terms("What are the side effects of Metformin?") == ["side", "effect", "metformin"]
+
+
+@pytest.mark.parametrize("asked, rephrased", [
+    ("side effects of metformin", "Metformin side effects?"),
+    ("Why is metformin prescribed?", "why is metformin being prescribed"),
+    ("What is the dose of metformin for type 2 diabetes", "metformin dose for type 2 diabetes, what is it"),
+])
+def test_rephrasings_are_reused(index, asked, rephrased):
+    index.add("content", asked, "answer")
+    match = index.lookup("content", rephrased)
+    assert match is not None
+    assert match["answer"] == "answer"
+    assert match["query"] == asked
+    assert match["score"] >= 0.85
+
+
+@pytest.mark.parametrize("asked, other", [
+    ("Why is metformin prescribed", "How is metformin prescribed"),
+    ("Why is metformin prescribed", "When should metformin be prescribed"),
+    ("When should metformin be prescribed", "Who should be prescribed metformin"),
+    ("Should I take ibuprofen", "When should I take ibuprofen"),
+    ("Can I take ibuprofen", "Must I take ibuprofen"),
+    ("metformin for type 1 diabetes", "metformin for type 2 diabetes"),
+    ("effects of metformin on the kidney", "effects of metformin on the liver"),
+    ("aspirin dosage for adults", "ibuprofen dosage for adults"),
+    ("ibuprofen dosage for children", "ibuprofen dosage for adults"),
+])
+def test_different_questions_are_not_reused(index, asked, other):
+    index.add("content", asked, "answer")
+    assert index.lookup("content", other) is None
+
+
+def test_question_words_keep_separate_answers(index):
+    index.add("content", "Why is metformin prescribed", "why answer")
+    index.add("content", "How is metformin prescribed", "how answer")
+    assert index.lookup("content", "why is metformin prescribed?")["answer"] == "why answer"
+    assert index.lookup("content", "how is metformin prescribed?")["answer"] == "how answer"
+
+
+def test_scopes_are_separate(index):
+    index.add(("content", "medical"), "side effects of metformin", "answer")
+    assert index.lookup(("content", "pharma"), "side effects of metformin") is None
+    assert index.lookup(("csv", "medical"), "side effects of metformin") is None
+
+
+def test_expired_answers_are_not_reused(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("query_index.time.monotonic", lambda: now[0])
+    index = SimilarQueryIndex(ttl=60)
+    index.add("content", "side effects of metformin", "answer")
+    now[0] += 59
+    assert index.lookup("content", "metformin side effects") is not None
+    now[0] += 2
+    assert index.lookup("content", "metformin side effects") is None
+
+
+def test_stats_count_lookups_and_reuses(index):
+    index.add("content", "side effects of metformin", "answer")
+    index.lookup("content", "metformin side effects")
+    index.lookup("content", "aspirin dosage")
+    assert index.stats() == {"lookups": 2, "reuses": 1, "entries": 1, "reuse_rate": 0.5}
@@ -0,0 +1,105 @@
+import pytest
+
+import rate_limit
+from rate_limit import ModelRateLimiter, RateLimiter, parse_model_limits
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake monotonic clock; sleeping advances it and records the wait."""
+    now = [1000.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(rate_limit.time, "sleep", sleep)
+    return now, sleeps
+
+
+def test_parse_model_limits():
+    assert parse_model_limits("gpt-4=500/30000, gpt-3.5-turbo=3500/200000") == {
+        "gpt-4": (500, 30000),
+        "gpt-3.5-turbo": (3500, 200000),
+    }
+
+
+def test_malformed_entries_are_skipped(caplog):
+    limits = parse_model_limits("gpt-4=500/30000,broken,gpt-x=1/2/3,=1/2,gpt-y=a/1,gpt-z=0/100,")
+    assert limits == {"gpt-4": (500, 30000)}
+    assert len(caplog.records) == 5
+
+
+def test_bucket_allows_a_burst_then_waits_for_refill(clock):
+    now, sleeps = clock
+    bucket = RateLimiter(60, period=60.0)
+    for _ in range(60):
+        bucket.acquire()
+    assert sleeps == []
+    bucket.acquire()
+    assert sleeps == [pytest.approx(1.0)]
+    bucket.acquire(3)
+    assert sum(sleeps) == pytest.approx(4.0)
+
+
+def test_bucket_refill_is_capped_at_capacity(clock):
+    now, sleeps = clock
+    bucket = RateLimiter(10, period=1.0)
+    for _ in range(10):
+        bucket.acquire()
+    now[0] += 3600
+    for _ in range(10):
+        bucket.acquire()
+    assert sleeps == []
+    bucket.acquire()
+    assert sleeps == [pytest.approx(0.1)]
+
+
+def test_requests_larger_than_the_bucket_wait_for_a_full_bucket(clock):
+    now, sleeps = clock
+    bucket = RateLimiter(100, period=60.0)
+    bucket.acquire(100)
+    bucket.acquire(5000)
+    assert sleeps == [pytest.approx(60.0)]
+
+
+def test_set_limit_limit_available_and_drain(clock):
+    now, sleeps = clock
+    bucket = RateLimiter(100, period=60.0)
+    bucket.set_limit(10)
+    assert bucket.capacity == 10
+    bucket.limit_available(2)
+    bucket.acquire(2)
+    assert sleeps == []
+    bucket.drain()
+    bucket.acquire(1)
+    assert sleeps == [pytest.approx(6.0)]
+
+
+def test_model_limiter_follows_rate_limit_headers(clock):
+    now, sleeps = clock
+    limiter = ModelRateLimiter({"gpt-4": (500, 10000)})
+    limiter.update("gpt-4", {
+        "x-ratelimit-limit-requests": "60",
+        "x-ratelimit-remaining-requests": "1",
+        "x-ratelimit-limit-tokens": "not a number",
+    })
+    requests_bucket, tokens_bucket = limiter._model_buckets("gpt-4")
+    assert (requests_bucket.capacity, tokens_bucket.capacity) == (60, 10000)
+    limiter.acquire("gpt-4", 100)
+    assert sleeps == []
+    limiter.acquire("gpt-4", 100)
+    assert sleeps == [pytest.approx(1.0)]
+
+    limiter.penalize("gpt-4")
+    limiter.acquire("gpt-4", 100)
+    assert sleeps[-1] == pytest.approx(1.0)
+
+
+def test_unknown_models_get_the_default_limits(clock):
+    limiter = ModelRateLimiter({})
+    requests_bucket, tokens_bucket = limiter._model_buckets("some-model")
+    assert requests_bucket.capacity == rate_limit.DEFAULT_REQUESTS_PER_MINUTE
+    assert tokens_bucket.capacity == rate_limit.DEFAULT_TOKENS_PER_MINUTE
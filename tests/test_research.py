@@ -0,0 +1,15 @@
+from research import find_research_keywords
+
+
+def test_find_research_keywords_reports_nested_keywords():
+    assert find_research_keywords("A Research Paper on cancer research") == [
+        ("research", 2),
+        ("research paper", 2),
+        ("paper", 11),
+        ("cancer research", 20),
+        ("research", 27),
+    ]
+
+
+def test_find_research_keywords_without_keywords():
+    assert find_research_keywords("celebrity gossip") == []
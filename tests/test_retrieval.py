@@ -0,0 +1,73 @@
+import math
+
+import pytest
+
+from retrieval import BM25Index, chunk_text, get_index, retrieve_context, tokenize
+
+
+def reference_bm25(chunks, query, k1=1.5, b=0.75):
+    documents = [tokenize(chunk) for chunk in chunks]
+    average_length = sum(len(document) for document in documents) / len(documents)
+    scores = []
+    for document in documents:
+        score = 0.0
+        for term in tokenize(query):
+            frequency = document.count(term)
+            if not frequency:
+                continue
+            containing = sum(term in other for other in documents)
+            idf = math.log((len(documents) - containing + 0.5) / (containing + 0.5) + 1.0)
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * len(document) / average_length))
+        scores.append(score)
+    return scores
+
+
+def test_chunks_overlap_and_cover_every_word():
+    words = [f"w{n}" for n in range(100)]
+    chunks = chunk_text(" ".join(words), chunk_words=30, overlap=10)
+    assert [chunk.split()[0] for chunk in chunks] == ["w0", "w20", "w40", "w60", "w80"]
+    assert chunks[-1].split()[-1] == "w99"
+    assert chunk_text("", chunk_words=30, overlap=10) == [""]
+    assert chunk_text("a few words", chunk_words=30, overlap=10) == ["a few words"]
+
+
+def test_scores_match_the_bm25_formula():
+    chunks = [
+        "metformin lowers blood glucose in type 2 diabetes",
+        "metformin metformin dosage and renal function",
+        "insulin therapy for type 1 diabetes",
+        "exercise and diet",
+    ]
+    query = "Metformin dosage for diabetes"
+    expected = reference_bm25(chunks, query)
+    hits = BM25Index(chunks).search(query, k=4)
+    assert [chunk for chunk, _ in hits] == sorted(range(3), key=lambda chunk: -expected[chunk])
+    for chunk, score in hits:
+        assert score == pytest.approx(expected[chunk], rel=1e-5)
+
+
+def test_search_without_matching_terms():
+    index = BM25Index(["alpha beta", "gamma delta"])
+    assert index.search("omega") == []
+    assert index.search("") == []
+    assert BM25Index([]).search("alpha") == []
+
+
+def test_retrieve_context_returns_relevant_chunks_in_document_order():
+    sections = [f"section {n} " + "filler " * 40 for n in range(10)]
+    sections[7] = "section 7 warfarin interaction " + "filler " * 40
+    sections[2] = "section 2 warfarin dosing " + "filler " * 40
+    text = " ".join(sections)
+
+    context = retrieve_context(text, "warfarin", k=2)
+    assert context.count("[...]") == 1
+    assert context.index("warfarin dosing") < context.index("warfarin interaction")
+    assert get_index(text) is get_index(text)
+
+
+def test_retrieve_context_small_documents_and_no_hits():
+    assert retrieve_context("a short document", "anything", k=6) == "a short document"
+
+    text = " ".join(f"word{n}" for n in range(2000))
+    chunks = get_index(text).chunks
+    assert retrieve_context(text, "unrelated question", k=2) == "\n\n[...]\n\n".join(chunks[:2])
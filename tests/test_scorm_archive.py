@@ -0,0 +1,66 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+import scorm_archive
+from scorm_archive import ScormArchive, member_compression
+
+
+@pytest.mark.parametrize("name, compression", [
+    ("content.pdf", zipfile.ZIP_STORED),
+    ("items/01-intro/response.DOCX", zipfile.ZIP_STORED),
+    ("presentation.pptx", zipfile.ZIP_STORED),
+    ("shared/logo.jpeg", zipfile.ZIP_STORED),
+    ("data.parquet", zipfile.ZIP_STORED),
+    ("index.html", zipfile.ZIP_DEFLATED),
+    ("imsmanifest.xml", zipfile.ZIP_DEFLATED),
+    ("data.csv", zipfile.ZIP_DEFLATED),
+    ("README", zipfile.ZIP_DEFLATED),
+])
+def test_member_compression(name, compression):
+    assert member_compression(name) == compression
+
+
+def test_members_are_stored_or_deflated_by_name():
+    archive = ScormArchive()
+    archive.write("content.pdf", b"%PDF" + b"x" * 1000)
+    archive.write("index.html", "<p>café</p>" * 100)
+    with archive.open("response.docx") as member:
+        member.write(b"PK" + b"y" * 500)
+    data = archive.getvalue()
+
+    with zipfile.ZipFile(io.BytesIO(data)) as package:
+        assert package.testzip() is None
+        members = {info.filename: info for info in package.infolist()}
+        assert list(members) == ["content.pdf", "index.html", "response.docx"]
+        assert members["content.pdf"].compress_type == zipfile.ZIP_STORED
+        assert members["content.pdf"].compress_size == 1004
+        assert members["response.docx"].compress_type == zipfile.ZIP_STORED
+        assert members["index.html"].compress_type == zipfile.ZIP_DEFLATED
+        assert members["index.html"].compress_size < members["index.html"].file_size
+        assert package.read("index.html").decode("utf-8") == "<p>café</p>" * 100
+        assert package.read("response.docx") == b"PK" + b"y" * 500
+
+
+def test_large_members_are_written_in_chunks(monkeypatch):
+    monkeypatch.setattr(scorm_archive, "CHUNK_SIZE", 1000)
+    payload = os.urandom(10500)
+    archive = ScormArchive()
+    archive.write("data.csv", payload)
+    archive.write("media.mp4", memoryview(payload))
+    with zipfile.ZipFile(io.BytesIO(archive.getvalue())) as package:
+        assert package.read("data.csv") == payload
+        assert package.read("media.mp4") == payload
+
+
+def test_archive_writes_into_a_given_file(tmp_path):
+    path = tmp_path / "package.zip"
+    with open(path, "wb") as package_file:
+        with ScormArchive(package_file) as archive:
+            archive.write("imsmanifest.xml", "<manifest/>")
+            archive.write("empty.txt", b"")
+    with zipfile.ZipFile(path) as package:
+        assert package.read("imsmanifest.xml") == b"<manifest/>"
+        assert package.read("empty.txt") == b""
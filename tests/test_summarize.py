@@ -0,0 +1,15 @@
+from summarize import MAP_REDUCE_MIN_TOKENS, is_summary_request, needs_map_reduce
+
+
+def test_summary_requests():
+    assert is_summary_request("Summarize this PDF")
+    assert is_summary_request("What are the key points?")
+    assert not is_summary_request("What dose was used in the trial?")
+
+
+def test_only_summaries_too_large_for_one_prompt_use_map_reduce():
+    small = "word " * 4001
+    large = "word " * (MAP_REDUCE_MIN_TOKENS * 2)
+    assert not needs_map_reduce(small, "Summarize this PDF")
+    assert needs_map_reduce(large, "Summarize this PDF")
+    assert not needs_map_reduce(large, "What dose was used in the trial?")